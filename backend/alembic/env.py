@@ -18,6 +18,8 @@ sys.path.append(os.path.join(os.path.dirname(__file__), "../"))
 # 3. 导入 SQLAlchemy Base (这里需要导入所有定义了 Model 的文件，目前只有 Base)
 from app.db.base import Base
 from app.models.user import User  # 导入 User 模型以便 Alembic 识别
+from app.models.game_event import GameEvent  # 导入 GameEvent 模型以便 Alembic 识别
+from app.models.game_snapshot import GameSnapshot  # 导入 GameSnapshot 模型以便 Alembic 识别
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -0,0 +1,213 @@
+"""
+这个文件定义了 AI 座位的决策策略（Policy）：根据当前对局状态为某个玩家选择一个合法动作。
+策略是纯函数式的：不读时钟、不访问存储，随机性全部来自调用方传入的 rng，
+同一个策略既用于离线模拟器（见 services/simulator.py），也用于线上 AI 座位（见 services/ai_engine.py）。
+策略拿到的是完整状态（避免为每次决策构建脱敏视图），隐藏信息只能通过 known_evil / merlin_candidates
+（以及 GameBelief 的按观察者查询）读取，这些函数与 game_view 的视角规则一致。
+"""
+import random
+from typing import Dict, List, Optional, Set, Tuple, Type
+from app.core.belief import GameBelief, seat_mask
+from app.core.game_rules import GameRuleValidator
+from app.models.game_enums import GamePhase, ActionType, Character, VoteOption, MissionResult, EVIL_CHARACTERS
+from app.schemas.game import GameState, PlayerState
+
+# 决策结果：(action_type, payload)
+Decision = Tuple[ActionType, dict]
+
+
+class AIPolicy:
+    """
+    决策策略基类
+    """
+    name = "base"
+    # 是否需要调用方维护 GameBelief 并在决策时传入
+    uses_belief = False
+
+    def decide(self, game: GameState, player: PlayerState, rng: random.Random,
+               belief: Optional[GameBelief] = None) -> Decision:
+        """
+        为 player 选择当前阶段的动作（player 必须是当前阶段待行动的玩家）
+        :param game: 对局状态（策略只应使用该玩家可见的信息）
+        :param belief: 该局的信念状态（uses_belief 为 True 的策略使用，缺失时退化为不依赖信念的决策）
+        """
+        raise NotImplementedError
+
+
+class RandomPolicy(AIPolicy):
+    """
+    随机策略：在合法动作中均匀随机选择（好人任务只能投成功），用作基线与规则压测
+    """
+    name = "random"
+
+    def decide(self, game: GameState, player: PlayerState, rng: random.Random,
+               belief: Optional[GameBelief] = None) -> Decision:
+        if game.phase == GamePhase.SPEECH:
+            return ActionType.SPEAK, {}
+
+        if game.phase == GamePhase.TEAM_PROPOSAL:
+            team_size = GameRuleValidator.get_mission_team_size(game.round)
+            target_ids = rng.sample([p.user_id for p in game.players], team_size)
+            return ActionType.PROPOSE, {"target_ids": target_ids}
+
+        if game.phase == GamePhase.VOTE:
+            option = VoteOption.APPROVE if rng.random() < 0.5 else VoteOption.REJECT
+            return ActionType.VOTE, {"option": option}
+
+        if game.phase == GamePhase.MISSION:
+            result = MissionResult.SUCCESS
+            if player.character in EVIL_CHARACTERS and rng.random() < 0.5:
+                result = MissionResult.FAIL
+            return ActionType.MISSION, {"result": result}
+
+        if game.phase == GamePhase.ASSASSINATION:
+            candidates = [p.user_id for p in game.players if p.user_id != player.user_id]
+            return ActionType.ASSASSINATE, {"target_id": rng.choice(candidates)}
+
+        raise ValueError(f"当前阶段没有可执行的动作: {game.phase}")
+
+
+def known_evil(game: GameState, player: PlayerState) -> Set[int]:
+    """player 确定是坏人的其他玩家：坏人互知身份，梅林看得到所有坏人"""
+    if player.character in EVIL_CHARACTERS or player.character == Character.MERLIN:
+        return {p.user_id for p in game.players if p.character in EVIL_CHARACTERS and p.user_id != player.user_id}
+    return set()
+
+
+def merlin_candidates(game: GameState, player: PlayerState) -> Set[int]:
+    """派西维尔看到的梅林候选（梅林与莫甘娜，无法区分）"""
+    if player.character == Character.PERCIVAL:
+        return {p.user_id for p in game.players if p.character in (Character.MERLIN, Character.MORGANA)}
+    return set()
+
+
+class RuleBasedPolicy(AIPolicy):
+    """
+    规则型策略（无大模型）：
+    - 提名：好人带上自己和不确定是坏人的玩家；坏人带上自己，第 4 轮需要 2 张失败票时再带一名同伴
+    - 投票：好人否决有已知坏人的队伍，自己在队伍中或连续否决即将判负时赞成；坏人只赞成有坏人的队伍
+    - 任务：好人只能成功；坏人按座位顺序出足本轮判负所需的失败票，其余坏人投成功以免暴露
+    - 刺杀：在坏人之外的玩家中选择（派西维尔的候选优先排除不了，只排除同伴）
+    """
+    name = "rule"
+
+    # 好人在投票失败计数达到该值时无条件赞成（第 5 次否决坏人直接获胜）
+    FORCE_APPROVE_VOTE_TRACK = 4
+
+    def decide(self, game: GameState, player: PlayerState, rng: random.Random,
+               belief: Optional[GameBelief] = None) -> Decision:
+        if game.phase == GamePhase.SPEECH:
+            return ActionType.SPEAK, {}
+        if game.phase == GamePhase.TEAM_PROPOSAL:
+            return ActionType.PROPOSE, {"target_ids": self._propose(game, player, rng, belief)}
+        if game.phase == GamePhase.VOTE:
+            return ActionType.VOTE, {"option": self._vote(game, player, belief)}
+        if game.phase == GamePhase.MISSION:
+            return ActionType.MISSION, {"result": self._mission(game, player)}
+        if game.phase == GamePhase.ASSASSINATION:
+            return ActionType.ASSASSINATE, {"target_id": self._assassinate(game, player, rng, belief)}
+        raise ValueError(f"当前阶段没有可执行的动作: {game.phase}")
+
+    def _propose(self, game: GameState, player: PlayerState, rng: random.Random,
+                 belief: Optional[GameBelief]) -> List[int]:
+        team_size = GameRuleValidator.get_mission_team_size(game.round)
+        others = [p for p in game.players if p.user_id != player.user_id]
+        rng.shuffle(others)
+
+        if player.character in EVIL_CHARACTERS:
+            partners = [p.user_id for p in others if p.character in EVIL_CHARACTERS]
+            goods = [p.user_id for p in others if p.character not in EVIL_CHARACTERS]
+            evil_needed = 2 if game.round == 4 else 1
+            picked = partners[:evil_needed - 1]
+            return [player.user_id] + picked + goods[:team_size - 1 - len(picked)]
+
+        evil = known_evil(game, player)
+        trusted = [p.user_id for p in others if p.user_id not in evil]
+        suspected = [p.user_id for p in others if p.user_id in evil]
+        return ([player.user_id] + trusted + suspected)[:team_size]
+
+    def _vote(self, game: GameState, player: PlayerState, belief: Optional[GameBelief]) -> VoteOption:
+        team = set(game.proposed_team)
+        if player.character in EVIL_CHARACTERS:
+            has_evil = any(game.get_player(uid).character in EVIL_CHARACTERS for uid in team)
+            return VoteOption.APPROVE if has_evil else VoteOption.REJECT
+
+        if team & known_evil(game, player):
+            return VoteOption.REJECT
+        if game.vote_track >= self.FORCE_APPROVE_VOTE_TRACK:
+            return VoteOption.APPROVE
+        if player.user_id in team or game.leader_id == player.user_id:
+            return VoteOption.APPROVE
+        # 两名梅林候选同时在队伍中时至少有一名是莫甘娜
+        if len(team & merlin_candidates(game, player)) == 2:
+            return VoteOption.REJECT
+        return VoteOption.APPROVE if game.vote_track >= 2 else VoteOption.REJECT
+
+    def _mission(self, game: GameState, player: PlayerState) -> MissionResult:
+        if player.character not in EVIL_CHARACTERS:
+            return MissionResult.SUCCESS
+        evil_on_team = sorted(
+            (game.get_player(uid) for uid in game.proposed_team if game.get_player(uid).character in EVIL_CHARACTERS),
+            key=lambda p: p.seat_id
+        )
+        fails_needed = 2 if game.round == 4 else 1
+        if player in evil_on_team[:fails_needed]:
+            return MissionResult.FAIL
+        return MissionResult.SUCCESS
+
+    def _assassinate(self, game: GameState, player: PlayerState, rng: random.Random,
+                     belief: Optional[GameBelief]) -> int:
+        candidates = [p.user_id for p in game.players if p.character not in EVIL_CHARACTERS]
+        return rng.choice(candidates)
+
+
+class BeliefPolicy(RuleBasedPolicy):
+    """
+    基于信念的策略：在规则型策略的基础上，好人的提名与投票、刺客的刺杀目标使用 GameBelief 的后验
+    - 提名：包含自己、没有坏人的概率最高的队伍
+    - 投票：队伍干净的概率不低于 APPROVE_THRESHOLD 时赞成（连续否决即将判负时仍无条件赞成）
+    - 刺杀：投票行为最像梅林的好人
+    坏人的决策与规则型策略相同（坏人已知真相，不需要推断）。
+    """
+    name = "belief"
+    uses_belief = True
+
+    APPROVE_THRESHOLD = 0.5
+
+    def _propose(self, game: GameState, player: PlayerState, rng: random.Random,
+                 belief: Optional[GameBelief]) -> List[int]:
+        if belief is None or player.character in EVIL_CHARACTERS:
+            return super()._propose(game, player, rng, belief)
+        return belief.best_team(game, player, GameRuleValidator.get_mission_team_size(game.round))
+
+    def _vote(self, game: GameState, player: PlayerState, belief: Optional[GameBelief]) -> VoteOption:
+        if belief is None or player.character in EVIL_CHARACTERS:
+            return super()._vote(game, player, belief)
+        if game.vote_track >= self.FORCE_APPROVE_VOTE_TRACK:
+            return VoteOption.APPROVE
+        team_mask = seat_mask(game.get_player(uid).seat_id for uid in game.proposed_team)
+        clean = belief.clean_probabilities(belief.posterior(game, player), team_mask)
+        return VoteOption.APPROVE if clean >= self.APPROVE_THRESHOLD else VoteOption.REJECT
+
+    def _assassinate(self, game: GameState, player: PlayerState, rng: random.Random,
+                     belief: Optional[GameBelief]) -> int:
+        if belief is None:
+            return super()._assassinate(game, player, rng, belief)
+        candidates = [p for p in game.players if p.character not in EVIL_CHARACTERS]
+        return belief.merlin_guess(game, player, candidates).user_id
+
+
+# 按名称注册的策略（进程池中按名称创建，避免跨进程传递对象）
+POLICIES: Dict[str, Type[AIPolicy]] = {
+    RandomPolicy.name: RandomPolicy,
+    RuleBasedPolicy.name: RuleBasedPolicy,
+    BeliefPolicy.name: BeliefPolicy,
+}
+
+
+def get_policy(name: str) -> AIPolicy:
+    """按名称创建策略实例"""
+    try:
+        return POLICIES[name]()
+    except KeyError:
+        raise ValueError(f"未知的 AI 策略: {name}")
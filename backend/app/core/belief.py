@@ -0,0 +1,210 @@
+"""
+这个文件实现了 8 人局的坏人阵营信念（Belief）：固定配置下坏人阵营只有 C(8,3)=56 种可能，可以精确跟踪。
+- 公共信念：56 维对数似然向量，按公开信息（每次投票的赞成/反对、每次任务的失败票数）增量更新；
+- 观察者条件化：按观察者的角色知识（坏人/梅林知道真相、派西维尔知道梅林候选、好人知道自己是好人）
+  屏蔽不可能的假设后归一化，得到该观察者的后验；
+- 梅林嫌疑：每个假设下各座位的投票与「知道坏人的梅林」是否吻合（对数似然比），供刺客选择刺杀目标。
+座位 s 对应位掩码 1 << s，队伍用 8 位掩码表示；与队伍相关的量都预先算好，更新与查询都是 NumPy 数组运算。
+"""
+from itertools import combinations
+from math import comb
+from typing import Dict, List, Optional
+import numpy as np
+from app.core.game_history import mission_history, vote_history
+from app.models.game_enums import ActionType, Character, GamePhase, MissionResult, VoteOption, EVIL_CHARACTERS
+from app.schemas.game import GameState, PlayerState
+
+NUM_SEATS = 8
+NUM_EVIL = 3
+
+# 56 种坏人阵营假设（座位号三元组）及其位掩码
+HYPOTHESES = list(combinations(range(NUM_SEATS), NUM_EVIL))
+HYPOTHESIS_MASKS = np.array([sum(1 << s for s in team) for team in HYPOTHESES], dtype=np.uint8)
+# SEAT_EVIL[s, h]：假设 h 中座位 s 是否为坏人
+SEAT_EVIL = np.array([[(int(mask) >> s) & 1 for mask in HYPOTHESIS_MASKS] for s in range(NUM_SEATS)], dtype=bool)
+# EVIL_ON_TEAM[m, h]：假设 h 中队伍 m（8 位掩码）里的坏人数
+_POPCOUNT = np.array([bin(i).count("1") for i in range(1 << NUM_SEATS)], dtype=np.uint8)
+EVIL_ON_TEAM = _POPCOUNT[np.arange(1 << NUM_SEATS, dtype=np.uint8)[:, None] & HYPOTHESIS_MASKS[None, :]]
+# 按人数分组的所有队伍掩码
+TEAMS_OF_SIZE: Dict[int, np.ndarray] = {
+    size: np.array([m for m in range(1 << NUM_SEATS) if _POPCOUNT[m] == size], dtype=np.uint8)
+    for size in range(1, NUM_SEATS + 1)
+}
+
+# 似然模型参数
+# 坏人在任务中出失败票的概率
+EVIL_FAIL_PROB = 0.8
+# 投赞成票的概率：[投票者是否坏人, 队伍中是否有坏人]
+APPROVE_PROB = np.array([[0.6, 0.4], [0.3, 0.9]])
+# 梅林（知道坏人）对 [干净队伍, 有坏人的队伍] 投赞成票的概率；不知情的好人按 0.5 计
+MERLIN_APPROVE_PROB = np.array([0.7, 0.2])
+
+# FAIL_LIKELIHOOD[k, f]：队伍中有 k 名坏人时出现 f 张失败票的概率
+FAIL_LIKELIHOOD = np.array([
+    [comb(k, f) * EVIL_FAIL_PROB ** f * (1 - EVIL_FAIL_PROB) ** (k - f) if f <= k else 0.0
+     for f in range(NUM_SEATS + 1)]
+    for k in range(NUM_SEATS + 1)
+])
+
+with np.errstate(divide="ignore"):
+    _LOG_FAIL_LIKELIHOOD = np.log(FAIL_LIKELIHOOD)
+
+
+def seat_mask(seats) -> int:
+    """座位号集合 -> 8 位掩码"""
+    mask = 0
+    for s in seats:
+        mask |= 1 << s
+    return mask
+
+
+class GameBelief:
+    """
+    单局的信念状态（公共部分，按观察者查询时再条件化）
+    通过 observe 逐条输入已执行的动作；投票与任务在全部提交后才结算（只使用公开的汇总信息）
+    """
+    __slots__ = ("seat_of", "seq", "log_public", "merlin_score",
+                 "_team_mask", "_approve_mask", "_votes", "_mission_fails", "_mission_submitted")
+
+    def __init__(self, seat_of: Dict[int, int]):
+        # user_id -> 座位号
+        self.seat_of = seat_of
+        # 已输入的最后一个动作序号（由跟踪器维护）
+        self.seq = 0
+        # 每个假设的对数似然（未归一化）
+        self.log_public = np.zeros(len(HYPOTHESES))
+        # merlin_score[h, s]：假设 h 下座位 s 的投票更像梅林还是不知情好人（对数似然比之和）
+        self.merlin_score = np.zeros((len(HYPOTHESES), NUM_SEATS))
+        self._team_mask = 0
+        self._approve_mask = 0
+        self._votes = 0
+        self._mission_fails = 0
+        self._mission_submitted = 0
+
+    @classmethod
+    def from_game(cls, game: GameState) -> "GameBelief":
+        """为一局新对局创建均匀信念"""
+        return cls({p.user_id: p.seat_id for p in game.players})
+
+    @classmethod
+    def from_history(cls, game: GameState) -> "GameBelief":
+        """从对局的列式历史重建信念（与逐条输入该局所有动作的结果一致）"""
+        belief = cls.from_game(game)
+        belief.seq = game.seq
+        for team_mask, approve_mask in zip(*vote_history(game)):
+            belief.observe_votes(int(team_mask), int(approve_mask))
+        for _, team_mask, fails in mission_history(game):
+            belief.observe_mission(team_mask, fails)
+
+        # 进行中的投票/任务：恢复未结算的部分
+        if game.phase in (GamePhase.VOTE, GamePhase.MISSION):
+            belief._team_mask = game.seat_mask(game.proposed_team)
+        if game.phase == GamePhase.VOTE:
+            belief._votes = len(game.votes)
+            belief._approve_mask = seat_mask(
+                belief.seat_of[uid] for uid, option in game.votes.items() if option == VoteOption.APPROVE
+            )
+        elif game.phase == GamePhase.MISSION:
+            belief._mission_submitted = len(game.pending_mission_results)
+            belief._mission_fails = game.pending_mission_results.count(MissionResult.FAIL)
+        return belief
+
+    def copy(self) -> "GameBelief":
+        copied = GameBelief(self.seat_of)
+        copied.seq = self.seq
+        copied.log_public = self.log_public.copy()
+        copied.merlin_score = self.merlin_score.copy()
+        copied._team_mask = self._team_mask
+        copied._approve_mask = self._approve_mask
+        copied._votes = self._votes
+        copied._mission_fails = self._mission_fails
+        copied._mission_submitted = self._mission_submitted
+        return copied
+
+    # --- 增量更新 ---
+
+    def observe(self, user_id: int, action_type: ActionType, payload: dict):
+        """输入一条已执行的动作"""
+        if action_type == ActionType.PROPOSE:
+            self._team_mask = seat_mask(self.seat_of[uid] for uid in payload.get("target_ids", []))
+            self._approve_mask = 0
+            self._votes = 0
+        elif action_type == ActionType.VOTE:
+            if payload.get("option") == VoteOption.APPROVE:
+                self._approve_mask |= 1 << self.seat_of[user_id]
+            self._votes += 1
+            if self._votes == len(self.seat_of):
+                self.observe_votes(self._team_mask, self._approve_mask)
+        elif action_type == ActionType.MISSION:
+            self._mission_submitted += 1
+            if payload.get("result") == MissionResult.FAIL:
+                self._mission_fails += 1
+            if self._mission_submitted == _POPCOUNT[self._team_mask]:
+                self.observe_mission(self._team_mask, self._mission_fails)
+                self._mission_fails = 0
+                self._mission_submitted = 0
+
+    def observe_votes(self, team_mask: int, approve_mask: int):
+        """一次完整的投票：队伍掩码与赞成者掩码"""
+        team_has_evil = (EVIL_ON_TEAM[team_mask] > 0).astype(np.intp)
+        approved = ((approve_mask >> np.arange(NUM_SEATS)) & 1).astype(bool)
+        # p[s, h]：假设 h 下座位 s 投赞成票的概率
+        p = APPROVE_PROB[SEAT_EVIL.astype(np.intp), team_has_evil[None, :]]
+        self.log_public += np.log(np.where(approved[:, None], p, 1 - p)).sum(axis=0)
+
+        pm = MERLIN_APPROVE_PROB[team_has_evil]
+        self.merlin_score += np.log(np.where(approved[None, :], pm[:, None], 1 - pm[:, None]) / 0.5)
+
+    def observe_mission(self, team_mask: int, fails: int):
+        """一次任务结算：队伍掩码与失败票数"""
+        self.log_public += _LOG_FAIL_LIKELIHOOD[EVIL_ON_TEAM[team_mask], fails]
+
+    # --- 按观察者查询 ---
+
+    @staticmethod
+    def viewer_mask(game: GameState, viewer: PlayerState) -> np.ndarray:
+        """观察者的角色知识允许的假设（与 game_view 的视角规则一致）"""
+        if viewer.character in EVIL_CHARACTERS or viewer.character == Character.MERLIN:
+            truth = seat_mask(p.seat_id for p in game.players if p.character in EVIL_CHARACTERS)
+            return HYPOTHESIS_MASKS == truth
+        allowed = ~SEAT_EVIL[viewer.seat_id]
+        if viewer.character == Character.PERCIVAL:
+            # 梅林与莫甘娜中恰好一名是坏人
+            candidates = [p.seat_id for p in game.players if p.character in (Character.MERLIN, Character.MORGANA)]
+            allowed &= SEAT_EVIL[candidates[0]] != SEAT_EVIL[candidates[1]]
+        return allowed
+
+    def posterior(self, game: GameState, viewer: PlayerState) -> np.ndarray:
+        """观察者视角下 56 种假设的后验概率"""
+        log_p = np.where(self.viewer_mask(game, viewer), self.log_public, -np.inf)
+        top = log_p.max()
+        if not np.isfinite(top):
+            # 公开信息与角色知识矛盾（模型之外的行为），退化为只按角色知识
+            log_p = np.where(self.viewer_mask(game, viewer), 0.0, -np.inf)
+            top = 0.0
+        p = np.exp(log_p - top)
+        return p / p.sum()
+
+    def evil_probabilities(self, game: GameState, viewer: PlayerState) -> np.ndarray:
+        """观察者视角下每个座位是坏人的概率"""
+        return SEAT_EVIL.astype(float) @ self.posterior(game, viewer)
+
+    def clean_probabilities(self, posterior: np.ndarray, team_masks: np.ndarray) -> np.ndarray:
+        """每支队伍中没有坏人的概率"""
+        return (EVIL_ON_TEAM[team_masks] == 0).astype(float) @ posterior
+
+    def best_team(self, game: GameState, leader: PlayerState, size: int) -> List[int]:
+        """包含队长本人、没有坏人的概率最高的队伍（user_id 列表）"""
+        masks = TEAMS_OF_SIZE[size]
+        masks = masks[(masks >> leader.seat_id) & 1 == 1]
+        clean = self.clean_probabilities(self.posterior(game, leader), masks)
+        best = int(masks[int(np.argmax(clean))])
+        return [p.user_id for p in game.players_by_seat if (best >> p.seat_id) & 1]
+
+    def merlin_guess(self, game: GameState, assassin: PlayerState, candidates: List[PlayerState]) -> Optional[PlayerState]:
+        """刺客视角下投票最像梅林的候选"""
+        if not candidates:
+            return None
+        h = int(np.argmax(self.viewer_mask(game, assassin)))
+        scores = self.merlin_score[h, [p.seat_id for p in candidates]]
+        return candidates[int(np.argmax(scores))]
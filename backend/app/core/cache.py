@@ -0,0 +1,70 @@
+"""
+这个文件实现了进程内的通用缓存工具：带过期时间的 LRU 缓存（TTLCache）。
+用于缓存读多写少、允许短暂不一致的数据（如已登录用户），命中与未命中次数记入 metrics。
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Generic, Hashable, Optional, Tuple, TypeVar
+from app.core.metrics import metrics
+
+V = TypeVar("V")
+
+
+class TTLCache(Generic[V]):
+    """
+    带过期时间的 LRU 缓存
+    - 超过 max_size 时淘汰最久未使用的条目；
+    - 条目在 ttl 秒后过期（读取时惰性删除），单个条目可以指定更短的 ttl。
+    """
+
+    def __init__(self, max_size: int, ttl: float, name: str = None, clock: Callable[[], float] = time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._clock = clock
+        # key -> (过期时间, 值)
+        self._entries: "OrderedDict[Hashable, Tuple[float, V]]" = OrderedDict()
+        name = name or "cache"
+        self._hits = metrics.counter(f"{name}.hit")
+        self._misses = metrics.counter(f"{name}.miss")
+
+    def get(self, key: Hashable) -> Optional[V]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > self._clock():
+                self._entries.move_to_end(key)
+                self._hits.inc()
+                return entry[1]
+            del self._entries[key]
+        self._misses.inc()
+        return None
+
+    def set(self, key: Hashable, value: V, ttl: float = None):
+        """写入条目，ttl 为空时使用缓存默认的过期时间（只能比默认值更短）"""
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        self._entries[key] = (self._clock() + ttl, value)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: Hashable):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    @property
+    def hits(self) -> int:
+        return self._hits.value
+
+    @property
+    def misses(self) -> int:
+        return self._misses.value
+
+    def __contains__(self, key: Any) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and entry[0] > self._clock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -1,6 +1,6 @@
 # 这个文件是项目的全局配置管理，使用 pydantic-settings 从环境变量或 .env 文件加载配置，确保类型安全。
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import Optional
+from typing import List, Optional
 
 class Settings(BaseSettings):
     # App
@@ -18,10 +18,99 @@ class Settings(BaseSettings):
     def SQLALCHEMY_DATABASE_URL(self) -> str:
         return f"mysql+pymysql://{self.MYSQL_USER}:{self.MYSQL_PASSWORD}@{self.MYSQL_HOST}:{self.MYSQL_PORT}/{self.MYSQL_DATABASE}"
 
+    @property
+    def SQLALCHEMY_ASYNC_DATABASE_URL(self) -> str:
+        return f"mysql+aiomysql://{self.MYSQL_USER}:{self.MYSQL_PASSWORD}@{self.MYSQL_HOST}:{self.MYSQL_PORT}/{self.MYSQL_DATABASE}"
+
+    # 异步连接池
+    DB_POOL_SIZE: int = 10            # 常驻连接数
+    DB_MAX_OVERFLOW: int = 20         # 高峰期允许额外创建的连接数
+    DB_POOL_TIMEOUT: float = 5.0      # 连接池耗尽时等待连接的最长秒数，超时抛错而不是无限排队
+    DB_POOL_RECYCLE: int = 3600       # 连接回收时间（秒），避免使用被 MySQL 关闭的空闲连接
+    DB_CONNECT_TIMEOUT: int = 5       # 建立新连接的超时秒数
+
+    # 密码哈希（bcrypt）
+    BCRYPT_ROUNDS: int = 12               # 工作因子（cost），调整后旧哈希在下次登录成功时自动升级
+    PASSWORD_HASH_WORKERS: int = 4        # 专用哈希线程数，限制同时进行的 bcrypt 计算，不占用默认线程池
+
+    # 验证码与限流（Redis）
+    VERIFICATION_CODE_TTL_SECONDS: int = 300       # 验证码有效期
+    SEND_CODE_INTERVAL_SECONDS: int = 60           # 同一邮箱两次发送验证码的最小间隔
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_LOGIN_PER_MINUTE: int = 10          # 每个 IP 每分钟最多登录次数
+    RATE_LIMIT_CREATE_GAME_PER_MINUTE: int = 10    # 每个用户每分钟最多创建对局次数
+    RATE_LIMIT_ACTION_PER_MINUTE: int = 120        # 每个用户每分钟最多提交动作次数（进程内令牌桶，按 worker 计算）
+    RATE_LIMIT_OPERATOR_ACTION_PER_MINUTE: int = 6000  # AI 编排账号每分钟最多代 AI 座位提交的动作数（同时驱动多局）
+    RATE_LIMIT_LOCAL_MAX_KEYS: int = 100000        # 进程内令牌桶最多保留的用户数
+
+    # AI 座位
+    AI_OPERATOR_USER_IDS: List[int] = []    # 允许通过批量接口代 AI 座位提交动作的账号（AI 编排服务）
+    AI_BOT_USER_IDS: List[int] = []         # 机器人账号：可以被任何人设为 AI 座位（其他已注册的活跃账号只能由本人设为 AI 座位）
+    AI_ENGINE_ENABLED: bool = True          # 是否由进程内的 AI 引擎驱动 AI 座位
+    AI_POLICY: str = "belief"               # AI 座位使用的决策策略（见 app/core/ai_policy.py）
+    AI_TICK_SECONDS: float = 0.5            # AI 引擎的决策间隔（每个 tick 批量处理所有待决策的对局）
+    AI_MAX_BATCH_ACTIONS: int = 64          # 单局单个 tick 最多连续执行的 AI 动作数
+
+    # 动作提交幂等（Idempotency-Key）
+    IDEMPOTENCY_TTL_SECONDS: float = 600.0  # 同一 key 的响应保留时长（客户端重试窗口）
+    IDEMPOTENCY_CACHE_SIZE: int = 50000     # 最多保留的响应数
+
+    # 已登录用户缓存（get_current_user）
+    USER_CACHE_SIZE: int = 10000          # 最多缓存的用户数（同时也是 Token 缓存的条数上限）
+    USER_CACHE_TTL_SECONDS: float = 60.0  # 缓存有效期，其他 worker 上的用户修改最多延迟这么久生效
+
     # Redis
     REDIS_HOST: str = "localhost"
     REDIS_PORT: int = 6379
     REDIS_PASSWORD: Optional[str] = None
+
+    # Game Store
+    GAME_STORE_BACKEND: str = "memory"     # memory（单进程内存）| redis（多进程/多节点共享）
+    GAME_STORE_KEY_PREFIX: str = "game:"   # Redis 中对局状态的 key 前缀
+    GAME_STORE_TTL_SECONDS: int = 86400    # Redis 中对局状态的过期时间（每次写入时续期）
+    GAME_ACTOR_IDLE_SECONDS: float = 30.0  # 对局 Actor 空闲多久后退出
+    TIMEOUT_TICK_SECONDS: float = 1.0      # 超时调度器的检查间隔
+    GAME_VIEW_CACHE_SIZE: int = 10000      # 视角视图缓存最多保留的对局数
+    LONG_POLL_MAX_SECONDS: float = 30.0    # 快照长轮询的最长挂起时间
+    WS_SEND_QUEUE_SIZE: int = 64           # 每个 WebSocket 连接的发送队列长度
+
+    # 内存存储的对局驱逐与热重启（Redis 存储由 GAME_STORE_TTL_SECONDS 过期，本身在进程之外）
+    GAME_COLD_TIER: str = "memory"              # none（不驱逐）| memory（只保留编码后的字节）| file（写入 GAME_COLD_DIR）
+    GAME_COLD_DIR: str = "data/cold_games"      # file 冷存储的目录
+    GAME_COLD_MAX_BYTES: int = 256 * 1024 * 1024  # memory 冷存储的字节上限，超出时丢弃最早移入的对局（另按 GAME_STORE_TTL_SECONDS 过期）
+    GAME_EVICT_TICK_SECONDS: float = 30.0       # 驱逐检查间隔，同时刷新内存占用指标
+    GAME_FINISHED_GRACE_SECONDS: float = 300.0  # 已结束的对局在内存中保留多久（结算页、复盘）
+    GAME_IDLE_EVICT_SECONDS: float = 3600.0     # 进行中的对局空闲多久后移出内存
+    GAME_EVICT_BATCH: int = 2000                # 单次检查最多移出的对局数（冷存储写入是同步的）
+    GAME_CHECKPOINT_PATH: str = "data/games.snapshot"  # 热重启快照文件（关闭时写入、启动时恢复）
+    GAME_CHECKPOINT_SECONDS: float = 30.0       # 定期检查点间隔，限制崩溃时丢失的更新（0 表示只在关闭时写入）
+
+    # Event Bus（跨 worker 广播）
+    EVENT_BUS_BACKEND: str = "local"              # local（单进程）| redis（Redis pub/sub）
+    EVENT_BUS_CHANNEL_PREFIX: str = "game-events:" # 每局对局的频道前缀
+    EVENT_BUS_FLUSH_MS: float = 5.0               # 发布合并周期（毫秒），周期内同一局的多次更新只发布一次
+
+    # Event Log（game_events 写后落库）
+    EVENT_LOG_FLUSH_SECONDS: float = 0.5   # 定时刷盘间隔
+    EVENT_LOG_BATCH_SIZE: int = 500        # 缓冲区达到该条数时立即刷盘，同时也是单条 INSERT 的最大行数
+    EVENT_LOG_MAX_BUFFER: int = 100000     # 数据库不可用时缓冲区的最大条数，超出后丢弃最旧的事件
+    EVENT_LOG_MAX_RETRIES: int = 5         # 同一批次因非连接类错误连续失败的次数上限，超过后逐条写入并丢弃写不进去的行
+    GAME_SNAPSHOT_INTERVAL: int = 50       # 每隔多少个事件保存一次对局快照（game_snapshots）
+    EVENTS_PAGE_SIZE: int = 500            # 增量事件接口单次返回的最大事件数
+
+    # 对局分片（多个 worker 进程各自在内存中持有一部分对局）
+    SHARD_REGISTRY_BACKEND: str = "local"         # local（单进程，不分片）| redis（一致性哈希分片，见 shard_registry.py）
+    WORKER_ID: str = ""                           # worker 标识，每个进程唯一且重启后不变（为空时 redis 模式下随机生成）
+    WORKER_URL: str = ""                          # 本 worker 供其他 worker 转发请求的内部地址，如 http://10.0.0.5:8001
+    SHARD_KEY_PREFIX: str = "shard:"              # Redis 中成员与归属 key 的前缀
+    SHARD_HEARTBEAT_SECONDS: float = 2.0          # worker 心跳间隔
+    SHARD_WORKER_TTL_SECONDS: float = 10.0        # 超过该时间未心跳的 worker 移出哈希环
+    SHARD_VIRTUAL_NODES: int = 128                # 每个 worker 在哈希环上的虚拟节点数
+    SHARD_OWNER_CACHE_SIZE: int = 100000          # 进程内缓存的对局归属条数
+    SHARD_OWNER_CACHE_TTL_SECONDS: float = 300.0  # 对局归属缓存的有效期
+    SHARD_FORWARD: bool = True                    # 非本 worker 的请求：True 转发给归属 worker，False 返回 421 由前端代理重试
+    SHARD_FORWARD_TIMEOUT_SECONDS: float = 40.0   # 转发超时（需大于 LONG_POLL_MAX_SECONDS）
+    SHARD_FORWARD_SECRET: Optional[str] = None    # 转发请求签名（X-Shard-Forwarded）的共享密钥，所有 worker 必须一致；未设置时使用 SECRET_KEY
     
     # Email
     MAIL_USERNAME: str
@@ -4,23 +4,23 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from pydantic import ValidationError
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.config import settings
-from app.db.base import get_db
+from app.db.session import get_async_db
 from app.models.user import User
 from app.schemas.token import TokenPayload
+from app.services.user_cache import user_cache
 
 # 定义 OAuth2 模式，tokenUrl 指向登录接口（用于 Swagger UI）
 reusable_oauth2 = OAuth2PasswordBearer(
     tokenUrl=f"{settings.API_V1_STR}/auth/login"
 )
 
-async def get_current_user(
-    token: Annotated[str, Depends(reusable_oauth2)],
-    db: Session = Depends(get_db)
-) -> User:
+async def get_user_by_token(token: str, db: AsyncSession) -> User:
     """
-    鉴权中间件：验证 Token 并返回当前用户对象
+    校验 Token 并返回对应的用户对象（HTTP 与 WebSocket 共用）
+    已校验的 Token 与用户记录会被缓存（见 user_cache.py），稳定状态下不解码 Token、不查询数据库
+    :raises HTTPException: Token 无效、用户不存在或已停用
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -28,25 +28,41 @@ async def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    try:
-        # 1. 解码 Token
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
-        user_id: str = payload.get("sub")
-        if user_id is None:
+    # 1. 解码 Token（缓存未命中时）
+    user_id = user_cache.get_token_subject(token)
+    if user_id is None:
+        try:
+            payload = jwt.decode(
+                token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
+            )
+            sub: str = payload.get("sub")
+            if sub is None:
+                raise credentials_exception
+            token_data = TokenPayload(sub=int(sub))
+        except (JWTError, ValidationError):
             raise credentials_exception
-        token_data = TokenPayload(sub=int(user_id))
-    except (JWTError, ValidationError):
-        raise credentials_exception
+        user_id = token_data.sub
+        user_cache.set_token_subject(token, user_id, payload.get("exp"))
     
-    # 2. 查询用户
-    user = db.query(User).filter(User.id == token_data.sub).first()
+    # 2. 查询用户（缓存未命中时）
+    user = user_cache.get_user(user_id)
     if user is None:
-        raise credentials_exception
+        user = await db.get(User, user_id)
+        if user is None:
+            raise credentials_exception
+        user = user_cache.set_user(user)
     
     # 3. 检查用户状态
     if not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
         
     return user
+
+async def get_current_user(
+    token: Annotated[str, Depends(reusable_oauth2)],
+    db: AsyncSession = Depends(get_async_db)
+) -> User:
+    """
+    鉴权中间件：验证 Token 并返回当前用户对象
+    """
+    return await get_user_by_token(token, db)
@@ -0,0 +1,408 @@
+"""
+这个文件实现了 GameState 的紧凑二进制编码，用于外部存储（Redis）、对局快照与跨进程消息。
+8 人局的全部信息只有几十个字节，JSON 中绝大部分是重复的字段名和枚举字符串。
+- 第一个字节是格式版本：FORMAT_V1 为二进制格式；以 '{' 开头的数据按 JSON 解析（兼容旧数据）；
+- 二进制格式无法表达的状态（例如引用了不在对局中的玩家、历史数组长度异常）自动退化为 JSON，保证任何状态都能往返；
+- 玩家引用（队长、发言者、提名队伍、投票）编码为玩家在 players 列表中的下标，布尔标记与枚举打包为位。
+枚举按成员定义顺序编码，新成员只能追加在末尾。
+
+V1 布局（varint 为 LEB128，带符号整数先做 zigzag）：
+    u8 版本 | u8 标记 | game_id | varint version | varint seq | u8 phase | f64 phase_start_time
+    varint round | varint vote_track
+    u8 玩家数 | 每个玩家: zigzag user_id, u8 标记[, varint seat_id], u8 character[, username]
+    ref leader | ref speaker
+    u8 队伍人数 | ref * n | u8 已投票掩码 | u8 赞成掩码
+    u8 任务数 | u8 失败位 | u8 待结算数 | u8 失败位 | u8 winner[, str]
+    [varint 非空槽位掩码 | u8 * k 队伍 | u8 * k 赞成者 | u8 失败票数个数 m | u8 * m 失败票数]
+
+用法（与 model_dump_json 对比的微基准）：python -m app.core.game_codec
+"""
+import struct
+import uuid
+from typing import List, Optional, Tuple
+from app.models.game_enums import GamePhase, Character, Camp, MissionResult, VoteOption
+from app.schemas.game import GameState, PlayerState, HISTORY_ROUNDS, HISTORY_SLOTS
+
+FORMAT_V1 = 1
+_JSON_PREFIX = ord("{")
+
+_PHASES = list(GamePhase)
+_CHARACTERS = list(Character)
+_WINNERS = [None, Camp.GOOD, Camp.EVIL]
+_PHASE_CODE = {phase: i for i, phase in enumerate(_PHASES)}
+_CHARACTER_CODE = {character: i + 1 for i, character in enumerate(_CHARACTERS)}
+_CHARACTER_CODE[None] = 0
+_RAW_WINNER = 3
+
+# 头部标记
+_FLAG_UUID = 1          # game_id 是标准 UUID 字符串，按 16 字节存储
+_FLAG_HISTORY = 2       # 存在非默认的列式历史
+
+# 玩家标记
+_P_AI = 1
+_P_ALIVE = 2
+_P_SEEN_EVIL = 4
+_P_SEEN_MERLIN = 8
+_P_VOTED = 16
+_P_ACTED = 32
+_P_DEFAULT_NAME = 64    # username 为默认的 User_<id>，不单独存储
+_P_SEAT_IS_INDEX = 128  # seat_id 等于玩家在列表中的下标，不单独存储
+
+# 玩家引用：0 为 None，1..254 为 players 下标 + 1，255 后跟原始 user_id
+_REF_NONE = 0
+_REF_RAW = 255
+
+_F64 = struct.Struct("<d")
+
+
+class _Unencodable(Exception):
+    """状态超出二进制格式的表达范围，退化为 JSON"""
+
+
+# --- 编码 ---
+
+def _varint(out: bytearray, value: int):
+    if value < 0:
+        raise _Unencodable("negative varint")
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _zigzag(out: bytearray, value: int):
+    _varint(out, value * 2 if value >= 0 else -value * 2 - 1)
+
+
+def _string(out: bytearray, value: str):
+    data = value.encode("utf-8")
+    _varint(out, len(data))
+    out += data
+
+
+def _ref(out: bytearray, user_id: Optional[int], index_of: dict):
+    if user_id is None:
+        out.append(_REF_NONE)
+        return
+    index = index_of.get(user_id)
+    if index is None or index >= _REF_RAW - 1:
+        out.append(_REF_RAW)
+        _zigzag(out, user_id)
+    else:
+        out.append(index + 1)
+
+
+def _result_bits(results: List[MissionResult]) -> Tuple[int, int]:
+    if len(results) > 8:
+        raise _Unencodable("too many mission results")
+    bits = 0
+    for i, result in enumerate(results):
+        if result == MissionResult.FAIL:
+            bits |= 1 << i
+        elif result != MissionResult.SUCCESS:
+            raise _Unencodable("unknown mission result")
+    return len(results), bits
+
+
+def _encode_v1(game: GameState) -> bytes:
+    out = bytearray((FORMAT_V1, 0))
+    players = game.players
+    if len(players) > 8:
+        raise _Unencodable("more than 8 players")
+    index_of = {p.user_id: i for i, p in enumerate(players)}
+    if len(index_of) != len(players):
+        raise _Unencodable("duplicate user ids")
+
+    flags = 0
+    try:
+        game_uuid = uuid.UUID(game.game_id)
+    except ValueError:
+        game_uuid = None
+    if game_uuid is not None and str(game_uuid) == game.game_id:
+        flags |= _FLAG_UUID
+        out += game_uuid.bytes
+    else:
+        _string(out, game.game_id)
+
+    _varint(out, game.version)
+    _varint(out, game.seq)
+    out.append(_PHASE_CODE[game.phase])
+    out += _F64.pack(game.phase_start_time)
+    _varint(out, game.round)
+    _varint(out, game.vote_track)
+
+    out.append(len(players))
+    for i, p in enumerate(players):
+        _zigzag(out, p.user_id)
+        pflags = ((_P_AI if p.is_ai else 0) | (_P_ALIVE if p.is_alive else 0)
+                  | (_P_SEEN_EVIL if p.is_seen_as_evil else 0) | (_P_SEEN_MERLIN if p.is_seen_as_merlin else 0)
+                  | (_P_VOTED if p.has_voted else 0) | (_P_ACTED if p.has_acted else 0))
+        if p.username == f"User_{p.user_id}":
+            pflags |= _P_DEFAULT_NAME
+        if p.seat_id == i:
+            pflags |= _P_SEAT_IS_INDEX
+        out.append(pflags)
+        if not pflags & _P_SEAT_IS_INDEX:
+            _varint(out, p.seat_id)
+        out.append(_CHARACTER_CODE[p.character])
+        if not pflags & _P_DEFAULT_NAME:
+            _string(out, p.username)
+    _ref(out, game.leader_id, index_of)
+    _ref(out, game.speaker_id, index_of)
+
+    if len(game.proposed_team) > 255:
+        raise _Unencodable("team too large")
+    out.append(len(game.proposed_team))
+    for uid in game.proposed_team:
+        _ref(out, uid, index_of)
+
+    voted = approved = 0
+    for uid, option in game.votes.items():
+        index = index_of.get(uid)
+        if index is None:
+            raise _Unencodable("vote from non-player")
+        voted |= 1 << index
+        if option == VoteOption.APPROVE:
+            approved |= 1 << index
+        elif option != VoteOption.REJECT:
+            raise _Unencodable("unknown vote option")
+    out.append(voted)
+    out.append(approved)
+
+    out += bytes(_result_bits(game.mission_results))
+    out += bytes(_result_bits(game.pending_mission_results))
+    if game.pending_mission_count is not None:
+        # 只出现在脱敏视图中，视图不会被存储或跨进程传输
+        raise _Unencodable("masked view")
+
+    if game.winner in _WINNERS:
+        out.append(_WINNERS.index(game.winner))
+    else:
+        out.append(_RAW_WINNER)
+        _string(out, game.winner)
+
+    teams, approves, fails = game.team_history, game.approve_history, game.mission_fail_history
+    if len(teams) != HISTORY_SLOTS or len(approves) != HISTORY_SLOTS or len(fails) != HISTORY_ROUNDS:
+        raise _Unencodable("unexpected history shape")
+    # 只存储非空槽位（没有发生的提名全为 0）
+    slots = [i for i in range(HISTORY_SLOTS) if teams[i] or approves[i]]
+    fail_count = HISTORY_ROUNDS
+    while fail_count and not fails[fail_count - 1]:
+        fail_count -= 1
+    if slots or fail_count:
+        flags |= _FLAG_HISTORY
+        try:
+            _varint(out, sum(1 << i for i in slots))
+            out += bytes(teams[i] for i in slots)
+            out += bytes(approves[i] for i in slots)
+            out.append(fail_count)
+            out += bytes(fails[:fail_count])
+        except (TypeError, ValueError):
+            raise _Unencodable("history value out of range")
+
+    out[1] = flags
+    return bytes(out)
+
+
+def encode_game(game: GameState) -> bytes:
+    """编码对局状态（优先使用二进制格式，无法表达时退化为紧凑 JSON）"""
+    try:
+        return _encode_v1(game)
+    except _Unencodable:
+        return game.model_dump_json(exclude_defaults=True).encode("utf-8")
+
+
+# --- 解码 ---
+
+class _Reader:
+    __slots__ = ("data", "pos")
+
+    def __init__(self, data: bytes, pos: int):
+        self.data = data
+        self.pos = pos
+
+    def byte(self) -> int:
+        value = self.data[self.pos]
+        self.pos += 1
+        return value
+
+    def take(self, size: int) -> bytes:
+        chunk = self.data[self.pos:self.pos + size]
+        if len(chunk) != size:
+            raise ValueError("truncated game state")
+        self.pos += size
+        return chunk
+
+    def varint(self) -> int:
+        shift = result = 0
+        while True:
+            b = self.byte()
+            result |= (b & 0x7F) << shift
+            if b < 0x80:
+                return result
+            shift += 7
+
+    def zigzag(self) -> int:
+        value = self.varint()
+        return value >> 1 if not value & 1 else -(value >> 1) - 1
+
+    def string(self) -> str:
+        return self.take(self.varint()).decode("utf-8")
+
+    def ref(self, players: List[PlayerState]) -> Optional[int]:
+        tag = self.byte()
+        if tag == _REF_NONE:
+            return None
+        if tag == _REF_RAW:
+            return self.zigzag()
+        return players[tag - 1].user_id
+
+
+def _construct(cls, values: dict, private: Optional[dict]):
+    """
+    直接构造模型（字段齐全、不做校验），比 model_construct 快得多，是解码的热点
+    values 必须包含模型的全部字段
+    """
+    obj = cls.__new__(cls)
+    object.__setattr__(obj, "__dict__", values)
+    object.__setattr__(obj, "__pydantic_fields_set__", set(values))
+    object.__setattr__(obj, "__pydantic_extra__", None)
+    object.__setattr__(obj, "__pydantic_private__", private)
+    return obj
+
+
+def _results(count: int, bits: int) -> List[MissionResult]:
+    return [MissionResult.FAIL if bits >> i & 1 else MissionResult.SUCCESS for i in range(count)]
+
+
+def _decode_v1(data: bytes) -> GameState:
+    r = _Reader(data, 1)
+    flags = r.byte()
+    game_id = str(uuid.UUID(bytes=r.take(16))) if flags & _FLAG_UUID else r.string()
+    version = r.varint()
+    seq = r.varint()
+    phase = _PHASES[r.byte()]
+    phase_start_time = _F64.unpack(r.take(8))[0]
+    round_num = r.varint()
+    vote_track = r.varint()
+
+    players = []
+    for _ in range(r.byte()):
+        user_id = r.zigzag()
+        pflags = r.byte()
+        seat_id = len(players) if pflags & _P_SEAT_IS_INDEX else r.varint()
+        character = r.byte()
+        username = f"User_{user_id}" if pflags & _P_DEFAULT_NAME else r.string()
+        players.append(_construct(PlayerState, {
+            "user_id": user_id,
+            "username": username,
+            "seat_id": seat_id,
+            "is_ai": bool(pflags & _P_AI),
+            "character": _CHARACTERS[character - 1] if character else None,
+            "is_alive": bool(pflags & _P_ALIVE),
+            "is_seen_as_evil": bool(pflags & _P_SEEN_EVIL),
+            "is_seen_as_merlin": bool(pflags & _P_SEEN_MERLIN),
+            "has_voted": bool(pflags & _P_VOTED),
+            "has_acted": bool(pflags & _P_ACTED),
+        }, None))
+    leader_id = r.ref(players)
+    speaker_id = r.ref(players)
+
+    proposed_team = [r.ref(players) for _ in range(r.byte())]
+    voted = r.byte()
+    approved = r.byte()
+    votes = {
+        p.user_id: VoteOption.APPROVE if approved >> i & 1 else VoteOption.REJECT
+        for i, p in enumerate(players) if voted >> i & 1
+    }
+    mission_results = _results(r.byte(), r.byte())
+    pending_mission_results = _results(r.byte(), r.byte())
+    winner_tag = r.byte()
+    winner = r.string() if winner_tag == _RAW_WINNER else _WINNERS[winner_tag]
+
+    team_history = [0] * HISTORY_SLOTS
+    approve_history = [0] * HISTORY_SLOTS
+    mission_fail_history = [0] * HISTORY_ROUNDS
+    if flags & _FLAG_HISTORY:
+        occupied = r.varint()
+        slots = [i for i in range(HISTORY_SLOTS) if occupied >> i & 1]
+        for i, mask in zip(slots, r.take(len(slots))):
+            team_history[i] = mask
+        for i, mask in zip(slots, r.take(len(slots))):
+            approve_history[i] = mask
+        fail_count = r.byte()
+        mission_fail_history[:fail_count] = r.take(fail_count)
+
+    game = _construct(GameState, dict(
+        game_id=game_id,
+        version=version,
+        seq=seq,
+        phase=phase,
+        phase_start_time=phase_start_time,
+        round=round_num,
+        vote_track=vote_track,
+        leader_id=leader_id,
+        speaker_id=speaker_id,
+        proposed_team=proposed_team,
+        votes=votes,
+        players=players,
+        mission_results=mission_results,
+        pending_mission_results=pending_mission_results,
+        pending_mission_count=None,
+        winner=winner,
+        team_history=team_history,
+        approve_history=approve_history,
+        mission_fail_history=mission_fail_history,
+    ), {})
+    # 私有索引与计数器全部由 rebuild_indexes 设置
+    game.rebuild_indexes()
+    return game
+
+
+def decode_game(data: bytes) -> GameState:
+    """解码 encode_game 的结果（也接受旧的 JSON 数据）"""
+    if not data:
+        raise ValueError("empty game state")
+    if data[0] == _JSON_PREFIX:
+        return GameState.model_validate_json(data)
+    if data[0] == FORMAT_V1:
+        return _decode_v1(data)
+    raise ValueError(f"unknown game state format: {data[0]}")
+
+
+def _benchmark(iterations: int = 20000):
+    """与 model_dump_json / model_validate_json 对比编码大小与耗时"""
+    import random
+    import timeit
+    from app.core.ai_policy import RandomPolicy
+    from app.core.game_reducer import apply_action, new_game
+    from app.core.game_rules import TimeoutPolicy
+
+    rng = random.Random(0)
+    policy = RandomPolicy()
+    game = new_game(str(uuid.uuid4()), list(range(1, 9)), {}, now=1.7e9, rng=rng)
+    # 推进到中盘（第 3 轮之后的投票阶段），历史数组与投票都有内容
+    while not (game.round >= 3 and game.phase == GamePhase.VOTE) and game.phase != GamePhase.FINISHED:
+        for player in TimeoutPolicy.get_pending_players(game):
+            action_type, payload = policy.decide(game, player, rng)
+            apply_action(game, player.user_id, action_type, payload, 1.7e9)
+            game.seq += 1
+        game.version += 1
+
+    json_data = game.model_dump_json(exclude_defaults=True).encode("utf-8")
+    binary = encode_game(game)
+    assert decode_game(binary) == game
+
+    def per_call(fn) -> float:
+        return timeit.timeit(fn, number=iterations) / iterations * 1e6
+
+    print(f"state: round={game.round} phase={game.phase.value} seq={game.seq}")
+    print(f"json   : {len(json_data):5d} bytes  encode {per_call(lambda: game.model_dump_json(exclude_defaults=True)):6.2f} us"
+          f"  decode {per_call(lambda: GameState.model_validate_json(json_data)):6.2f} us")
+    print(f"binary : {len(binary):5d} bytes  encode {per_call(lambda: encode_game(game)):6.2f} us"
+          f"  decode {per_call(lambda: decode_game(binary)):6.2f} us")
+    print(f"ratio  : {len(json_data) / len(binary):.1f}x smaller")
+
+
+if __name__ == "__main__":
+    _benchmark()
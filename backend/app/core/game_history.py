@@ -0,0 +1,70 @@
+"""
+这个文件提供对局列式历史（GameState.team_history / approve_history / mission_fail_history）的查询。
+历史是按 (轮次, 第几次提名) 展开的 8 位座位掩码数组，查询都是对这些掩码的位运算（NumPy 向量化），
+不需要扫描事件流：例如「座位 3 赞成过多少支包含座位 5 的队伍」就是两列位的按位与再求和。
+"""
+from typing import List, Tuple
+import numpy as np
+from app.models.game_enums import GamePhase
+from app.schemas.game import GameState, HISTORY_ATTEMPTS
+
+NUM_SEATS = 8
+_SEAT_SHIFTS = np.arange(NUM_SEATS, dtype=np.uint8)
+
+
+def _bits(masks: np.ndarray) -> np.ndarray:
+    """掩码数组 (n,) -> 按座位展开的 0/1 矩阵 (n, 8)"""
+    return ((masks[:, None] >> _SEAT_SHIFTS) & 1).astype(np.int32)
+
+
+def vote_slots(game: GameState) -> np.ndarray:
+    """已结算投票的历史下标（按时间顺序）"""
+    teams = np.asarray(game.team_history)
+    slots = np.flatnonzero(teams)
+    if game.phase == GamePhase.VOTE:
+        # 当前这次投票还没有结算
+        slots = slots[slots != game.current_slot]
+    return slots
+
+
+def vote_history(game: GameState) -> Tuple[np.ndarray, np.ndarray]:
+    """已结算的投票：(队伍掩码, 赞成者掩码)，两个 uint8 数组按时间顺序对齐"""
+    slots = vote_slots(game)
+    return (np.asarray(game.team_history, dtype=np.uint8)[slots],
+            np.asarray(game.approve_history, dtype=np.uint8)[slots])
+
+
+def approval_matrix(game: GameState) -> np.ndarray:
+    """
+    approvals[voter, member]：座位 voter 赞成过多少支包含座位 member 的队伍
+    对角线即每个座位赞成过多少支包含自己的队伍
+    """
+    teams, approves = vote_history(game)
+    return _bits(approves).T @ _bits(teams)
+
+
+def team_counts(game: GameState) -> np.ndarray:
+    """counts[member]：座位 member 被提名进入（已结算投票的）队伍的次数"""
+    teams, _ = vote_history(game)
+    return _bits(teams).sum(axis=0)
+
+
+def approval_rate(game: GameState, voter_seat: int, member_seat: int) -> Tuple[int, int]:
+    """座位 voter_seat 对包含座位 member_seat 的队伍：(赞成次数, 投票次数)"""
+    teams, approves = vote_history(game)
+    with_member = (teams >> member_seat) & 1
+    approved = (approves >> voter_seat) & 1
+    return int((with_member & approved).sum()), int(with_member.sum())
+
+
+def mission_history(game: GameState) -> List[Tuple[int, int, int]]:
+    """已执行的任务：[(轮次, 队伍掩码, 失败票数)]"""
+    missions = []
+    for index in range(len(game.mission_results)):
+        round_num = index + 1
+        # 每轮最后一次提名就是投票通过、执行任务的队伍
+        start = game.history_slot(round_num, 0)
+        teams = game.team_history[start:start + HISTORY_ATTEMPTS]
+        attempt = max(i for i, mask in enumerate(teams) if mask)
+        missions.append((round_num, teams[attempt], game.mission_fail_history[index]))
+    return missions
@@ -0,0 +1,225 @@
+"""
+这个文件实现了对局状态的纯函数式 Reducer：把一个已校验（已记录）的动作应用到 GameState 上。
+不做规则校验、不抛 HTTP 异常、不读时钟也不产生任何副作用，
+既用于在线处理动作（GameService 校验通过后调用），也用于从快照 + 事件流回放对局，以及离线模拟器。
+"""
+import random
+from typing import Dict, Iterable, List
+from app.models.game_enums import GamePhase, Character, Camp, ActionType, MissionResult
+from app.schemas.game import GameState, PlayerState, GameActionRecord
+
+# 8人局标准配置：
+# 好人阵营 (5人): 梅林, 派西维尔, 忠臣 * 3
+# 坏人阵营 (3人): 莫甘娜, 刺客, 爪牙 * 1
+EIGHT_PLAYER_ROLES = [
+    Character.MERLIN,
+    Character.PERCIVAL,
+    Character.SERVANT, Character.SERVANT, Character.SERVANT,
+    Character.MORGANA,
+    Character.ASSASSIN,
+    Character.MINION
+]
+
+
+def new_game(game_id: str, player_ids: List[int], user_map: Dict[int, str], now: float,
+             rng: random.Random = None, ai_player_ids: Iterable[int] = ()) -> GameState:
+    """
+    生成对局初始状态：随机分配座位与角色，座位 0 的玩家担任首个队长并开始发言
+    :param now: 初始阶段的开始时间
+    :param rng: 随机数来源（默认使用 random 模块的全局实例，模拟器传入带种子的 Random）
+    :raises ValueError: 人数不是 8 人
+    """
+    rng = rng or random
+    ai_ids = set(ai_player_ids)
+
+    # 1. 随机分配座位
+    shuffled_ids = list(player_ids)
+    rng.shuffle(shuffled_ids)
+
+    # 目前仅支持 8 人局
+    if len(shuffled_ids) != 8:
+        raise ValueError(f"当前版本仅支持 8 人局，实际人数: {len(shuffled_ids)}")
+
+    # 2. 分配角色
+    roles = EIGHT_PLAYER_ROLES.copy()
+    rng.shuffle(roles)
+
+    players = [
+        PlayerState(
+            user_id=uid,
+            username=user_map.get(uid, f"User_{uid}"),
+            seat_id=seat_id,
+            is_ai=uid in ai_ids,
+            character=roles[seat_id]
+        )
+        for seat_id, uid in enumerate(shuffled_ids)
+    ]
+
+    initial_leader_id = players[0].user_id
+    return GameState(
+        game_id=game_id,
+        phase=GamePhase.SPEECH, # 初始进入发言阶段
+        phase_start_time=now,
+        players=players,
+        leader_id=initial_leader_id,
+        speaker_id=initial_leader_id # 队长开始发言
+    )
+
+
+def apply_action(game: GameState, user_id: int, action_type: ActionType, payload: dict, now: float) -> None:
+    """
+    执行动作（状态机流转），直接修改传入的 game
+    :param now: 动作生效时间，阶段切换时作为新的 phase_start_time
+    """
+    player = game.get_player(user_id)
+    if player is None:
+        return
+
+    # --- PROPOSE (提名) ---
+    if action_type == ActionType.PROPOSE:
+        target_ids = payload.get("target_ids", [])
+        game.proposed_team = target_ids
+        game.record_team_history()
+        # 进入投票阶段
+        game.phase = GamePhase.VOTE
+        game.phase_start_time = now
+        # 重置投票状态
+        game.reset_votes()
+
+    # --- VOTE (投票) ---
+    elif action_type == ActionType.VOTE:
+        option = payload.get("option")
+        game.record_vote(player, option)
+        
+        # 检查是否所有人都投了
+        if game.votes_cast >= len(game.players):
+            # 结算投票结果
+            game.record_vote_history()
+            if game.approve_votes > len(game.players) / 2:
+                # 投票通过 -> 进入任务阶段
+                game.phase = GamePhase.MISSION
+                game.vote_track = 0 # 重置投票失败计数
+                # 重置行动状态（用于记录谁执行了任务）
+                for p in game.players:
+                    p.has_acted = False
+            else:
+                # 投票失败
+                game.vote_track += 1
+                if game.vote_track >= 5:
+                    # 连续5次失败 -> 坏人直接获胜
+                    game.phase = GamePhase.FINISHED
+                    game.winner = Camp.EVIL
+                else:
+                    # 换下一个队长（按座位顺序）
+                    game.leader_id = game.next_player(game.leader_id).user_id
+                    # 回到发言阶段
+                    game.phase = GamePhase.SPEECH
+                    game.speaker_id = game.leader_id
+                    game.proposed_team = []
+            
+            game.phase_start_time = now
+
+    # --- MISSION (执行任务) ---
+    elif action_type == ActionType.MISSION:
+        result = payload.get("result")
+        # 只有在队伍里的人才能提交，这点已经在 validate_action 里校验过了
+        # 这里我们需要记录谁提交了，但不能记录具体是谁投了什么（匿名）
+        # 所以我们通常把结果存到一个临时列表里，等人齐了再 shuffle
+        # 结果暂存到 pending_mission_results，同时维护已提交人数与失败票数
+        game.record_mission_result(player, result)
+        
+        # 检查是否所有队员都提交了
+        team_size = len(game.proposed_team)
+        if game.mission_submitted >= team_size:
+            # 结算任务
+            fail_count = game.mission_fails
+            
+            # 判断失败条件
+            # 8人局：3-4-4-5-5
+            # 第4轮（5人）需要2个fail才失败，其他都是1个
+            is_failed = False
+            if game.round == 4:
+                if fail_count >= 2:
+                    is_failed = True
+            else:
+                if fail_count >= 1:
+                    is_failed = True
+            
+            final_result = MissionResult.FAIL if is_failed else MissionResult.SUCCESS
+            game.mission_results.append(final_result)
+            game.record_mission_history(fail_count)
+            
+            # 清理临时状态
+            game.reset_mission()
+            game.proposed_team = []
+            
+            # 检查游戏是否结束
+            fails_total = game.mission_results.count(MissionResult.FAIL)
+            success_total = game.mission_results.count(MissionResult.SUCCESS)
+            
+            if fails_total >= 3:
+                # 坏人 3 胜
+                game.phase = GamePhase.FINISHED
+                game.winner = Camp.EVIL
+            elif success_total >= 3:
+                # 好人 3 胜 -> 进入刺杀阶段
+                game.phase = GamePhase.ASSASSINATION
+            else:
+                # 继续下一轮
+                game.round += 1
+                # 换下一个队长（按座位顺序）
+                game.leader_id = game.next_player(game.leader_id).user_id
+                
+                game.phase = GamePhase.SPEECH
+                game.speaker_id = game.leader_id
+            
+            game.phase_start_time = now
+
+    # --- ASSASSINATE (刺杀) ---
+    elif action_type == ActionType.ASSASSINATE:
+        target_id = payload.get("target_id")
+        target = game.get_player(target_id)
+        
+        if target and target.character == Character.MERLIN:
+            game.winner = Camp.EVIL
+        else:
+            game.winner = Camp.GOOD
+            
+        game.phase = GamePhase.FINISHED
+        game.phase_start_time = now
+
+    # --- SPEAK (发言) ---
+    elif action_type == ActionType.SPEAK:
+        # 按座位顺序找到下一位发言者
+        next_player = game.next_player(user_id)
+
+        # 检查是否回到队长（转了一圈）
+        # 注意：leader_id 是本轮的队长
+        if next_player.user_id == game.leader_id:
+            # 发言结束，进入提名阶段
+            game.phase = GamePhase.TEAM_PROPOSAL
+            game.speaker_id = None
+        else:
+            # 轮到下一个人发言
+            game.speaker_id = next_player.user_id
+        
+        game.phase_start_time = now
+
+
+def apply_record(game: GameState, record: GameActionRecord) -> None:
+    """应用一条动作记录，并推进对局序号"""
+    apply_action(game, record.user_id, record.action_type, record.payload, record.ts)
+    game.seq = record.seq
+
+
+def replay(game: GameState, records: Iterable[GameActionRecord]) -> GameState:
+    """
+    从某一状态出发依次应用动作记录，返回回放后的状态（不修改传入的 game）
+    已经应用过的记录（seq 不大于当前序号）会被跳过
+    """
+    state = game.model_copy(deep=True)
+    for record in records:
+        if record.seq <= state.seq:
+            continue
+        apply_record(state, record)
+    return state
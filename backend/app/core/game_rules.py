@@ -7,6 +7,19 @@ from app.models.game_enums import GamePhase, ActionType, Character, Camp, VoteOp
 from app.schemas.game import GameState, PlayerState
 import time
 
+
+class GameRuleError(Exception):
+    """
+    规则校验失败（与 HTTP 无关，离线模拟器直接捕获）
+    status_code 沿用接口层的语义：400 动作不合法，403 无权执行
+    """
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
 class TimeoutPolicy:
     """
     超时与兜底策略
@@ -44,25 +57,18 @@ class TimeoutPolicy:
         elif game.phase == GamePhase.TEAM_PROPOSAL:
             # 提名阶段：默认顺位选择（包括自己在内向后顺延）
             # 1. 找到当前队长
-            leader = next((p for p in game.players if p.user_id == game.leader_id), None)
+            leader = game.get_player(game.leader_id)
             if not leader:
                 return None
             
             # 2. 获取本轮需要的人数
             required_count = GameRuleValidator.get_mission_team_size(game.round)
-            
-            # 3. 按座位号排序玩家
-            sorted_players = sorted(game.players, key=lambda p: p.seat_id)
-            total_players = len(sorted_players)
-            if total_players == 0:
-                return None
                 
-            # 4. 从队长开始往后选N个
+            # 3. 从队长开始按座位号往后选N个
             start_index = leader.seat_id
             target_ids = []
             for i in range(required_count):
-                idx = (start_index + i) % total_players
-                target_ids.append(sorted_players[idx].user_id)
+                target_ids.append(game.get_player_by_seat(start_index + i).user_id)
                 
             return {
                 "action_type": ActionType.PROPOSE,
@@ -76,24 +82,41 @@ class TimeoutPolicy:
             if not assassin:
                 return None
             
-            # 2. 按座位号排序
-            sorted_players = sorted(game.players, key=lambda p: p.seat_id)
-            total_players = len(sorted_players)
-            if total_players == 0:
-                return None
-                
-            # 3. 找到刺客的下一位
-            next_seat_idx = (assassin.seat_id + 1) % total_players
-            target_player = sorted_players[next_seat_idx]
+            # 2. 找到刺客的下一位（按座位号）
+            target_player = game.next_player(assassin.user_id)
             
             return {
                 "action_type": ActionType.ASSASSINATE,
                 "payload": {"target_id": target_player.user_id}
             }
 
-        # 其他阶段暂无自动兜底（如发言可能只是跳过）
+        elif game.phase == GamePhase.SPEECH:
+            # 发言阶段：超时视为跳过发言
+            return {
+                "action_type": ActionType.SPEAK,
+                "payload": {}
+            }
+
+        # 其他阶段暂无自动兜底
         return None
 
+    @staticmethod
+    def get_pending_players(game: GameState) -> List[PlayerState]:
+        """获取当前阶段尚未行动、需要执行兜底动作的玩家"""
+        if game.phase == GamePhase.VOTE:
+            return [p for p in game.players if not p.has_voted]
+        elif game.phase == GamePhase.MISSION:
+            return [p for p in game.players if p.user_id in game.proposed_team and not p.has_acted]
+        elif game.phase == GamePhase.TEAM_PROPOSAL:
+            leader = game.get_player(game.leader_id)
+            return [leader] if leader else []
+        elif game.phase == GamePhase.SPEECH:
+            speaker = game.get_player(game.speaker_id)
+            return [speaker] if speaker else []
+        elif game.phase == GamePhase.ASSASSINATION:
+            return [p for p in game.players if p.character == Character.ASSASSIN]
+        return []
+
 class GameRuleValidator:
     """
     游戏规则校验器
@@ -119,19 +142,31 @@ class GameRuleValidator:
     @staticmethod
     def validate_action(game: GameState, user_id: int, action_type: ActionType, payload: dict = None):
         """
-        统一校验入口
+        统一校验入口（接口层）
         :raises HTTPException: 如果校验失败，抛出 400/403 异常
         """
+        try:
+            GameRuleValidator.check_action(game, user_id, action_type, payload)
+        except GameRuleError as e:
+            raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+    @staticmethod
+    def check_action(game: GameState, user_id: int, action_type: ActionType, payload: dict = None):
+        """
+        校验动作是否合法（不依赖 HTTP，供 GameService 与离线模拟器共用）
+        :raises GameRuleError: 如果校验失败
+        """
+        payload = payload or {}
         # 1. 基础校验：玩家是否在游戏中
-        player = next((p for p in game.players if p.user_id == user_id), None)
+        player = game.get_player(user_id)
         if not player:
-            raise HTTPException(status_code=403, detail="玩家不在对局中")
+            raise GameRuleError(403, "玩家不在对局中")
 
         # 2. 根据动作类型分发校验
         if action_type == ActionType.PROPOSE:
             GameRuleValidator._validate_propose(game, player, payload)
         elif action_type == ActionType.VOTE:
-            GameRuleValidator._validate_vote(game, player)
+            GameRuleValidator._validate_vote(game, player, payload)
         elif action_type == ActionType.MISSION:
             GameRuleValidator._validate_mission(game, player, payload)
         elif action_type == ActionType.SPEAK:
@@ -139,54 +174,59 @@ class GameRuleValidator:
         elif action_type == ActionType.ASSASSINATE:
             GameRuleValidator._validate_assassinate(game, player, payload)
         else:
-            raise HTTPException(status_code=400, detail=f"未知的动作类型: {action_type}")
+            raise GameRuleError(400, f"未知的动作类型: {action_type}")
 
     @staticmethod
     def _validate_propose(game: GameState, player: PlayerState, payload: dict):
         """校验提名动作"""
         # 阶段必须是 TEAM_PROPOSAL
         if game.phase != GamePhase.TEAM_PROPOSAL:
-            raise HTTPException(status_code=400, detail="当前不在提名阶段")
+            raise GameRuleError(400, "当前不在提名阶段")
         
         # 必须是队长
         if game.leader_id != player.user_id:
-            raise HTTPException(status_code=403, detail="只有队长可以提名")
+            raise GameRuleError(403, "只有队长可以提名")
             
         # 校验人数（需结合规则配置）
         team_ids = payload.get("target_ids", [])
         if not team_ids or not isinstance(team_ids, list):
-            raise HTTPException(status_code=400, detail="提名队伍不能为空")
+            raise GameRuleError(400, "提名队伍不能为空")
         
         required_count = GameRuleValidator.get_mission_team_size(game.round)
         if len(team_ids) != required_count:
-             raise HTTPException(status_code=400, detail=f"第 {game.round} 轮任务需要提名 {required_count} 名玩家")
+             raise GameRuleError(400, f"第 {game.round} 轮任务需要提名 {required_count} 名玩家")
         
         # 校验提名的人是否在游戏中
-        all_player_ids = {p.user_id for p in game.players}
-        if not set(team_ids).issubset(all_player_ids):
-             raise HTTPException(status_code=400, detail="提名的玩家无效")
+        if not all(game.get_player(uid) for uid in team_ids):
+             raise GameRuleError(400, "提名的玩家无效")
 
     @staticmethod
-    def _validate_vote(game: GameState, player: PlayerState):
+    def _validate_vote(game: GameState, player: PlayerState, payload: dict):
         """校验投票动作"""
         if game.phase != GamePhase.VOTE:
-            raise HTTPException(status_code=400, detail="当前不在投票阶段")
+            raise GameRuleError(400, "当前不在投票阶段")
         
         if player.has_voted:
-            raise HTTPException(status_code=400, detail="您已经投过票了")
+            raise GameRuleError(400, "您已经投过票了")
+
+        if payload.get("option") not in tuple(VoteOption):
+            raise GameRuleError(400, "无效的投票选项")
 
     @staticmethod
     def _validate_mission(game: GameState, player: PlayerState, payload: dict):
         """校验执行任务动作"""
         if game.phase != GamePhase.MISSION:
-            raise HTTPException(status_code=400, detail="当前不在任务执行阶段")
+            raise GameRuleError(400, "当前不在任务执行阶段")
             
         # 必须在任务队伍中
         if player.user_id not in game.proposed_team:
-            raise HTTPException(status_code=403, detail="您不在执行队伍中")
+            raise GameRuleError(403, "您不在执行队伍中")
             
         if player.has_acted:
-            raise HTTPException(status_code=400, detail="您已经执行过任务了")
+            raise GameRuleError(400, "您已经执行过任务了")
+
+        if payload.get("result") not in tuple(MissionResult):
+            raise GameRuleError(400, "无效的任务结果")
 
         # 校验好人不能投失败（规则：好人只能投成功，坏人可选）
         # 注意：这里需要知道玩家身份。在真实逻辑中，PlayerState 应该包含身份信息。
@@ -196,26 +236,26 @@ class GameRuleValidator:
         result = payload.get("result")
         if player.character in [Character.MERLIN, Character.PERCIVAL, Character.SERVANT]:
              if result == "fail":
-                 raise HTTPException(status_code=400, detail="好人阵营只能投任务成功")
+                 raise GameRuleError(400, "好人阵营只能投任务成功")
 
     @staticmethod
     def _validate_speak(game: GameState, player: PlayerState):
         """校验发言动作"""
         if game.phase != GamePhase.SPEECH:
-            raise HTTPException(status_code=400, detail="当前不在发言阶段")
+            raise GameRuleError(400, "当前不在发言阶段")
             
         if game.speaker_id != player.user_id:
-            raise HTTPException(status_code=403, detail="当前未轮到您发言")
+            raise GameRuleError(403, "当前未轮到您发言")
 
     @staticmethod
     def _validate_assassinate(game: GameState, player: PlayerState, payload: dict):
         """校验刺杀动作"""
         if game.phase != GamePhase.ASSASSINATION:
-            raise HTTPException(status_code=400, detail="当前不在刺杀阶段")
+            raise GameRuleError(400, "当前不在刺杀阶段")
             
         if player.character != Character.ASSASSIN:
-            raise HTTPException(status_code=403, detail="只有刺客可以执行刺杀")
+            raise GameRuleError(403, "只有刺客可以执行刺杀")
             
         target_id = payload.get("target_id")
         if not target_id:
-            raise HTTPException(status_code=400, detail="必须指定刺杀目标")
+            raise GameRuleError(400, "必须指定刺杀目标")
@@ -0,0 +1,45 @@
+"""
+这个文件实现了一致性哈希环（Consistent Hash Ring），把 game_id 映射到 worker。
+- 每个 worker 在环上放置 virtual_nodes 个虚拟节点，使各 worker 分到的 key 数量接近均匀；
+- 增加或移除一个 worker 时，只有约 1/N 的 key 改变归属，其余 key 仍然落在原来的 worker 上；
+- 查找为对排好序的节点哈希做二分，O(log(N * virtual_nodes))。
+哈希使用 blake2b（与进程无关，所有 worker 对同一 key 计算出相同的位置；不能用内置 hash，它按进程随机化）。
+"""
+import bisect
+import hashlib
+from typing import Iterable, List, Optional
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """
+    一致性哈希环
+    节点集合不可变，成员变化时重新创建（成员变化很少，查找很频繁）
+    """
+
+    def __init__(self, nodes: Iterable[str] = (), virtual_nodes: int = 128):
+        self.nodes = frozenset(nodes)
+        self.virtual_nodes = virtual_nodes
+        points = sorted(
+            (_hash(f"{node}#{i}"), node)
+            for node in self.nodes
+            for i in range(virtual_nodes)
+        )
+        self._hashes: List[int] = [h for h, _ in points]
+        self._owners: List[str] = [node for _, node in points]
+
+    def owner(self, key: str) -> Optional[str]:
+        """key 所属的节点（顺时针方向第一个虚拟节点），环为空时返回 None"""
+        if not self._owners:
+            return None
+        index = bisect.bisect(self._hashes, _hash(key))
+        return self._owners[index % len(self._owners)]
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def __contains__(self, node: str) -> bool:
+        return node in self.nodes
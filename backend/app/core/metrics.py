@@ -0,0 +1,92 @@
+"""
+这个文件实现了进程内的轻量指标收集（计数器、仪表、耗时统计），通过 /metrics 接口以 JSON 形式导出，便于观察缓存命中率等运行状态。
+多 worker 部署时每个进程各自统计。
+"""
+from typing import Dict
+
+
+class Counter:
+    """单调递增计数器"""
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: int = 1):
+        self.value += amount
+
+
+class Gauge:
+    """当前值（对局数、内存占用等），每次统计时覆盖"""
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def set(self, value: float):
+        self.value = value
+
+
+class Summary:
+    """耗时/大小等观测值的汇总（次数、总和、最大值）"""
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def to_dict(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "avg": self.total / self.count if self.count else 0.0,
+            "max": self.max,
+        }
+
+
+class MetricsRegistry:
+    """
+    指标注册表
+    key: 指标名称（如 user_cache.hit），value: 指标对象；同名指标只创建一次
+    """
+
+    def __init__(self):
+        self._counters: Dict[str, Counter] = {}
+        self._gauges: Dict[str, Gauge] = {}
+        self._summaries: Dict[str, Summary] = {}
+
+    def counter(self, name: str) -> Counter:
+        counter = self._counters.get(name)
+        if counter is None:
+            counter = self._counters[name] = Counter()
+        return counter
+
+    def gauge(self, name: str) -> Gauge:
+        gauge = self._gauges.get(name)
+        if gauge is None:
+            gauge = self._gauges[name] = Gauge()
+        return gauge
+
+    def summary(self, name: str) -> Summary:
+        summary = self._summaries.get(name)
+        if summary is None:
+            summary = self._summaries[name] = Summary()
+        return summary
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """导出当前所有指标的值"""
+        return {
+            "counters": {name: c.value for name, c in sorted(self._counters.items())},
+            "gauges": {name: g.value for name, g in sorted(self._gauges.items())},
+            "summaries": {name: s.to_dict() for name, s in sorted(self._summaries.items())},
+        }
+
+
+# 全局指标注册表
+metrics = MetricsRegistry()
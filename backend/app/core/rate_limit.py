@@ -0,0 +1,110 @@
+# 这个文件定义了限流依赖项（按客户端 IP 或当前用户计数），用于登录、创建对局、提交动作等接口。
+# - 登录、创建对局：基于 Redis 的滑动窗口，所有 worker 共享计数；Redis 不可用时放行请求（只记录日志）。
+# - 提交动作：调用最频繁，使用进程内令牌桶，热路径上不访问 Redis（限额按 worker 计算；分片部署下同一局的动作都由归属 worker 处理）。
+import logging
+import math
+import time
+from typing import Callable, Tuple
+from fastapi import Depends, HTTPException, Request, status
+from redis.asyncio import Redis
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.deps import get_current_user
+from app.core.metrics import metrics
+from app.core.redis import get_redis
+from app.core.redis_scripts import sliding_window_hit
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """
+    滑动窗口限流器
+    窗口内同一身份的请求数超过 limit 时返回 429，并通过 Retry-After 告知需要等待的秒数
+    """
+
+    def __init__(self, name: str, limit: int, window_seconds: float = 60):
+        self.name = name
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self._rejected = metrics.counter(f"rate_limit.{name}.rejected")
+
+    async def hit(self, redis: Redis, identity: str):
+        if not settings.RATE_LIMIT_ENABLED or self.limit <= 0:
+            return
+        try:
+            allowed, value = await sliding_window_hit(
+                redis, f"rate_limit:{self.name}:{identity}", self.limit, self.window_seconds
+            )
+        except Exception:
+            logger.exception("rate limiter unavailable: %s", self.name)
+            return
+        if not allowed:
+            self._rejected.inc()
+            raise _too_many_requests(value / 1000)
+
+    async def by_ip(self, request: Request, redis: Redis = Depends(get_redis)):
+        """依赖项：按客户端 IP 限流（未登录接口）"""
+        client_ip = request.client.host if request.client else "unknown"
+        await self.hit(redis, client_ip)
+
+    async def by_user(self, current_user: User = Depends(get_current_user), redis: Redis = Depends(get_redis)):
+        """依赖项：按当前用户限流"""
+        await self.hit(redis, str(current_user.id))
+
+
+class TokenBucketLimiter:
+    """
+    进程内令牌桶限流器
+    每个身份一个容量为 limit 的桶，每 window_seconds 补满；桶空时返回 429（Retry-After 为补出一个令牌的时间）。
+    桶保存在 LRU 缓存中，长时间不用的桶（已经补满）过期后等同于新桶。
+    """
+
+    def __init__(self, name: str, limit: int, window_seconds: float = 60, max_keys: int = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self._clock = clock
+        # key: 身份, value: (剩余令牌数, 上次更新时间)
+        self._buckets: TTLCache[Tuple[float, float]] = TTLCache(
+            max_size=max_keys if max_keys is not None else settings.RATE_LIMIT_LOCAL_MAX_KEYS,
+            ttl=window_seconds,
+            name=f"rate_limit.{name}.bucket",
+            clock=clock
+        )
+        self._rejected = metrics.counter(f"rate_limit.{name}.rejected")
+
+    def hit(self, identity: str, cost: int = 1):
+        """消耗 cost 个令牌（批量请求按其中的动作数计），超过桶容量的请求按整桶计"""
+        if not settings.RATE_LIMIT_ENABLED or self.limit <= 0:
+            return
+        cost = min(cost, self.limit)
+        now = self._clock()
+        rate = self.limit / self.window_seconds
+        bucket = self._buckets.get(identity)
+        tokens = self.limit if bucket is None else min(self.limit, bucket[0] + (now - bucket[1]) * rate)
+        if tokens < cost:
+            self._buckets.set(identity, (tokens, now))
+            self._rejected.inc()
+            raise _too_many_requests((cost - tokens) / rate)
+        self._buckets.set(identity, (tokens - cost, now))
+
+    async def by_user(self, current_user: User = Depends(get_current_user)):
+        """依赖项：按当前用户限流"""
+        self.hit(str(current_user.id))
+
+
+def _too_many_requests(retry_after_seconds: float) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="请求太频繁，请稍后再试",
+        headers={"Retry-After": str(max(1, math.ceil(retry_after_seconds)))}
+    )
+
+
+login_rate_limit = RateLimiter("login", settings.RATE_LIMIT_LOGIN_PER_MINUTE)
+create_game_rate_limit = RateLimiter("create_game", settings.RATE_LIMIT_CREATE_GAME_PER_MINUTE)
+action_rate_limit = TokenBucketLimiter("action", settings.RATE_LIMIT_ACTION_PER_MINUTE)
+operator_action_rate_limit = TokenBucketLimiter("operator_action", settings.RATE_LIMIT_OPERATOR_ACTION_PER_MINUTE)
@@ -11,6 +11,14 @@ redis_pool = redis.ConnectionPool(
     encoding="utf-8"
 )
 
+# 二进制连接池（不做解码），用于存储对局状态等紧凑序列化数据
+redis_binary_pool = redis.ConnectionPool(
+    host=settings.REDIS_HOST,
+    port=settings.REDIS_PORT,
+    password=settings.REDIS_PASSWORD,
+    decode_responses=False
+)
+
 # 获取 Redis 客户端实例
 async def get_redis():
     """依赖注入获取 Redis 客户端"""
@@ -22,3 +30,6 @@ async def get_redis():
 
 # 全局单例客户端（用于非依赖注入场景）
 redis_client = redis.Redis(connection_pool=redis_pool)
+
+# 二进制全局客户端（返回 bytes）
+redis_binary_client = redis.Redis(connection_pool=redis_binary_pool)
@@ -0,0 +1,87 @@
+# 这个文件集中定义了需要原子执行的 Redis Lua 脚本（验证码发送/校验、滑动窗口限流），每个流程只需一次往返，并发请求之间不会出现竞态。
+# 脚本通过 EVALSHA 执行（首次调用或 Redis 重启后自动回退为 EVAL 加载）。
+import uuid
+from typing import Tuple
+from redis.asyncio import Redis
+from app.core.redis import redis_client
+
+# 发送验证码：发送频率限制 key 不存在时，同时写入验证码与频率限制（check-and-set）
+# KEYS[1] = 频率限制 key, KEYS[2] = 验证码 key
+# ARGV[1] = 验证码, ARGV[2] = 验证码有效期（秒）, ARGV[3] = 发送间隔（秒）
+# 返回 0 表示已写入；否则返回距离可再次发送的剩余秒数
+_SEND_CODE_SCRIPT = """
+local ttl = redis.call('TTL', KEYS[1])
+if ttl ~= -2 then
+    if ttl < 1 then
+        return 1
+    end
+    return ttl
+end
+redis.call('SET', KEYS[2], ARGV[1], 'EX', ARGV[2])
+redis.call('SET', KEYS[1], '1', 'EX', ARGV[3])
+return 0
+"""
+
+# 校验验证码：与期望值一致时删除并返回 1（compare-and-delete），验证码只能使用一次
+# KEYS[1] = 验证码 key, ARGV[1] = 用户提交的验证码
+_CONSUME_CODE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    redis.call('DEL', KEYS[1])
+    return 1
+end
+return 0
+"""
+
+# 滑动窗口限流：有序集合记录窗口内每次请求的时间（毫秒，取 Redis 服务器时间，避免多 worker 时钟偏差）
+# KEYS[1] = 限流 key
+# ARGV[1] = 窗口长度（毫秒）, ARGV[2] = 窗口内允许的请求数, ARGV[3] = 本次请求的唯一标识
+# 返回 {1, 剩余次数} 表示放行；{0, 需要等待的毫秒数} 表示被限流
+_SLIDING_WINDOW_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local window = tonumber(ARGV[1])
+local limit = tonumber(ARGV[2])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+local count = redis.call('ZCARD', KEYS[1])
+if count < limit then
+    redis.call('ZADD', KEYS[1], now, ARGV[3])
+    redis.call('PEXPIRE', KEYS[1], window)
+    return {1, limit - count - 1}
+end
+local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+return {0, tonumber(oldest[2]) + window - now}
+"""
+
+_send_code = redis_client.register_script(_SEND_CODE_SCRIPT)
+_consume_code = redis_client.register_script(_CONSUME_CODE_SCRIPT)
+_sliding_window = redis_client.register_script(_SLIDING_WINDOW_SCRIPT)
+
+
+def _code_key(email: str) -> str:
+    return f"verification_code:{email}"
+
+
+async def try_store_verification_code(redis: Redis, email: str, code: str, code_ttl: int, interval: int) -> int:
+    """
+    发送频率允许时写入验证码
+    :return: 0 表示已写入；否则为距离可再次发送的剩余秒数
+    """
+    return int(await _send_code(keys=[f"email_limit:{email}", _code_key(email)], args=[code, code_ttl, interval], client=redis))
+
+
+async def consume_verification_code(redis: Redis, email: str, code: str) -> bool:
+    """校验并删除验证码（只能使用一次）"""
+    return bool(await _consume_code(keys=[_code_key(email)], args=[code], client=redis))
+
+
+async def sliding_window_hit(redis: Redis, key: str, limit: int, window_seconds: float) -> Tuple[bool, int]:
+    """
+    记录一次请求并判断是否超出限流
+    :return: (是否放行, 放行时为窗口内剩余次数 / 限流时为需要等待的毫秒数)
+    """
+    allowed, value = await _sliding_window(
+        keys=[key],
+        args=[int(window_seconds * 1000), limit, uuid.uuid4().hex],
+        client=redis
+    )
+    return bool(allowed), int(value)
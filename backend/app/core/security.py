@@ -1,12 +1,29 @@
 # 这个文件是安全相关的工具函数，主要用于密码的哈希加密和验证，以及 JWT Token 的生成。
+# bcrypt 计算是 CPU 密集操作（每次数十毫秒），异步接口统一提交到专用的有界线程池执行，不阻塞事件循环，也不占用默认线程池。
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any, Union
+from typing import Any, Callable, Optional, Tuple, TypeVar, Union
+import bcrypt
 from jose import jwt
-from passlib.context import CryptContext
 from app.core.config import settings
+from app.core.metrics import metrics
 
-# 使用 bcrypt 算法进行密码哈希
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+T = TypeVar("T")
+
+# bcrypt 只使用密码的前 72 字节（与历史哈希的行为保持一致）
+_BCRYPT_MAX_BYTES = 72
+
+# 专用密码哈希线程池（bcrypt 计算期间释放 GIL，多个线程可以并行）
+_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash"
+)
+
+_hash_latency = metrics.summary("password.hash_ms")
+_verify_latency = metrics.summary("password.verify_ms")
+_rehash_counter = metrics.counter("password.rehash")
 
 def create_access_token(subject: Union[str, Any], expires_delta: timedelta | None = None) -> str:
     """
@@ -19,15 +36,68 @@ def create_access_token(subject: Union[str, Any], expires_delta: timedelta | Non
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    
+
     to_encode = {"exp": expire, "sub": str(subject)}
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
+def _encode_password(password: str) -> bytes:
+    return password.encode("utf-8")[:_BCRYPT_MAX_BYTES]
+
+def get_hash_rounds(hashed_password: str) -> Optional[int]:
+    """从 bcrypt 哈希（$2b$<cost>$...）中解析工作因子，格式不正确返回 None"""
+    parts = hashed_password.split("$")
+    if len(parts) < 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+def needs_rehash(hashed_password: str) -> bool:
+    """哈希的工作因子与当前配置不一致时需要升级"""
+    return get_hash_rounds(hashed_password) != settings.BCRYPT_ROUNDS
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """验证明文密码与哈希密码是否匹配"""
-    return pwd_context.verify(plain_password, hashed_password)
+    try:
+        return bcrypt.checkpw(_encode_password(plain_password), hashed_password.encode("utf-8"))
+    except ValueError:
+        # 哈希格式不正确
+        return False
 
 def get_password_hash(password: str) -> str:
     """生成密码的哈希值"""
-    return pwd_context.hash(password)
+    salt = bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)
+    return bcrypt.hashpw(_encode_password(password), salt).decode("utf-8")
+
+def verify_and_update(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    验证密码，验证通过且旧哈希的工作因子已过时时，顺便生成新的哈希
+    :return: (是否匹配, 新哈希；无需升级时为 None)
+    """
+    if not verify_password(plain_password, hashed_password):
+        return False, None
+    if needs_rehash(hashed_password):
+        return True, get_password_hash(plain_password)
+    return True, None
+
+def _timed(fn: Callable[..., T], *args) -> Tuple[T, float]:
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+async def _run_in_hash_executor(fn: Callable[..., T], *args) -> Tuple[T, float]:
+    """在专用线程池中执行，返回 (结果, 计算耗时毫秒)"""
+    return await asyncio.get_running_loop().run_in_executor(_hash_executor, _timed, fn, *args)
+
+async def hash_password_async(password: str) -> str:
+    """异步生成密码哈希（在专用线程池中执行）"""
+    hashed, elapsed_ms = await _run_in_hash_executor(get_password_hash, password)
+    _hash_latency.observe(elapsed_ms)
+    return hashed
+
+async def verify_and_update_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """异步验证密码并在需要时升级哈希（在专用线程池中执行）"""
+    (verified, new_hash), elapsed_ms = await _run_in_hash_executor(verify_and_update, plain_password, hashed_password)
+    _verify_latency.observe(elapsed_ms)
+    if new_hash is not None:
+        _rehash_counter.inc()
+    return verified, new_hash
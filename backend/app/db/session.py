@@ -0,0 +1,23 @@
+# 这个文件提供异步数据库引擎（aiomysql）、异步会话工厂和 FastAPI 依赖注入函数。请求处理中的数据库访问都通过异步会话完成，慢查询不会阻塞事件循环上的其他对局。
+# 连接池参数来自 Settings；同步引擎（app/db/base.py）只保留给 Alembic 迁移与离线脚本使用。
+from typing import AsyncIterator
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from app.core.config import settings
+
+async_engine = create_async_engine(
+    settings.SQLALCHEMY_ASYNC_DATABASE_URL,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=True,  # 自动重连
+    connect_args={"connect_timeout": settings.DB_CONNECT_TIMEOUT},
+)
+
+# expire_on_commit=False：提交后仍可直接读取对象属性（异步会话不能隐式懒加载）
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    """Dependency for FastAPI"""
+    async with AsyncSessionLocal() as db:
+        yield db
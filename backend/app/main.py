@@ -1,16 +1,85 @@
 # 这个文件是FastAPI应用的入口文件，负责初始化应用实例、配置中间件和路由。
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from app.routers import auth, game
+from app.routers import auth, game, ws
+from app.core.metrics import metrics
+from app.core.config import settings
+from app.db.session import async_engine
+from app.services.ai_engine import ai_engine
+from app.services.event_bus import event_bus
+from app.services.event_log import event_log
+from app.services.game_checkpoint import game_checkpointer
+from app.services.game_evictor import game_evictor
+from app.services.game_service import GameService
+from app.services.game_watch import game_watcher
+from app.services.room_hub import room_hub
+from app.services.shard_registry import shard_registry
+from app.services.shard_router import ShardRouter
+from app.services.timeout_scheduler import timeout_scheduler
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """应用生命周期：注册对局更新监听器，启动/停止后台任务"""
+    # 分片：登记本 worker 并获取当前成员（在接收请求之前）
+    await shard_registry.start()
+    # 热重启：在接收请求之前恢复上次关闭（或最近一次检查点）时的对局
+    restored_games = game_checkpointer.restore()
+    # 唤醒等待对局推进的长轮询请求
+    GameService.add_listener(game_watcher.on_game_updated)
+    # 向 WebSocket 房间推送增量
+    GameService.add_listener(room_hub.on_game_updated)
+    # 多 worker 部署时：将本地更新发布给其他 worker，并把其他 worker 的更新交给房间广播与长轮询
+    GameService.add_listener(event_bus.on_game_updated)
+    event_bus.add_handler(room_hub.on_game_updated)
+    event_bus.add_handler(game_watcher.on_game_updated)
+    await event_bus.start()
+    # 动作事件写后落库（game_events）
+    GameService.add_listener(event_log.on_game_updated)
+    event_log.start()
+    # 启动超时调度器（自动执行超时兜底动作）
+    timeout_scheduler.start()
+    # 启动 AI 引擎（批量为 AI 座位决策并提交动作）
+    if settings.AI_ENGINE_ENABLED:
+        ai_engine.start()
+    # 恢复的对局重新登记超时与 AI 决策（不通知其他监听器：不是新的更新）
+    for game in restored_games:
+        timeout_scheduler.on_game_updated(game, None)
+        ai_engine.on_game_updated(game, None)
+    # 已结束或空闲的对局移出内存（内存存储）
+    game_evictor.start()
+    # 定期写对局快照
+    game_checkpointer.start()
+    yield
+    await game_evictor.stop()
+    await ai_engine.stop()
+    await timeout_scheduler.stop()
+    # 不再有后台任务修改对局后写最后一次快照
+    await game_checkpointer.stop()
+    GameService.remove_listener(event_log.on_game_updated)
+    await event_log.stop()
+    await event_bus.stop()
+    GameService.remove_listener(event_bus.on_game_updated)
+    GameService.remove_listener(room_hub.on_game_updated)
+    GameService.remove_listener(game_watcher.on_game_updated)
+    # 事件日志落库完成后再关闭连接池
+    await async_engine.dispose()
+    await shard_registry.stop()
 
 app = FastAPI(
     title="Aivalon",
     description="Aivalon - AI-driven Avalon Game Platform",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 
+# 多 worker 分片：对局请求路由到持有该对局的 worker
+if shard_registry.enabled:
+    app.add_middleware(ShardRouter)
+
 # 注册路由
 app.include_router(auth.router, prefix="/api/v1/auth", tags=["auth"])
 app.include_router(game.router, prefix="/api/v1/games", tags=["games"])
+app.include_router(ws.router, tags=["realtime"])
 
 @app.get("/")
 async def root():
@@ -19,3 +88,8 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "ok"}
+
+@app.get("/metrics")
+async def read_metrics():
+    """进程内运行指标（缓存命中率等）"""
+    return metrics.snapshot()
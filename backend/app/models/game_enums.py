@@ -39,6 +39,9 @@ class Character(str, Enum):
     MORGANA = "morgana"     # 莫甘娜
     MINION = "minion"       # 爪牙
 
+# 坏人阵营的角色
+EVIL_CHARACTERS = frozenset({Character.ASSASSIN, Character.MORGANA, Character.MINION})
+
 class Camp(str, Enum):
     """
     阵营枚举
@@ -69,3 +72,14 @@ class ActionType(str, Enum):
     MISSION = "mission"         # 执行任务（成功/失败）
     ASSASSINATE = "assassinate" # 刺杀（刺客刺杀梅林）
     SPEAK = "speak"             # 发言（轮席发言）
+
+class VisibilityClass(str, Enum):
+    """
+    视角类别枚举
+    同一类别的观察者看到的对局快照完全相同（除了自己的座位），用于视图缓存与广播分组
+    """
+    EVIL = "evil"           # 坏人：互知身份
+    MERLIN = "merlin"       # 梅林：看到坏人标记
+    PERCIVAL = "percival"   # 派西维尔：看到梅林候选标记
+    GOOD = "good"           # 普通好人：看不到他人身份
+    REVEALED = "revealed"   # 对局结束：所有身份公开
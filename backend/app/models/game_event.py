@@ -0,0 +1,20 @@
+# 这个文件是对局事件数据库模型定义，映射到 game_events 表（追加写），每个成功应用的动作对应一条记录，按 game_id + seq 顺序回放。
+from sqlalchemy import BigInteger, Column, DateTime, Double, Integer, JSON, String, UniqueConstraint
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+class GameEvent(Base):
+    __tablename__ = "game_events"
+    __table_args__ = (
+        # 同一局内 seq 唯一，同时作为按局顺序回放/增量拉取的索引
+        UniqueConstraint("game_id", "seq", name="uq_game_events_game_seq"),
+    )
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    game_id = Column(String(36), nullable=False)
+    seq = Column(Integer, nullable=False)                 # 动作序号（与 GameState.seq 一致）
+    user_id = Column(Integer, nullable=True)              # 执行动作的玩家（系统事件为空）
+    action_type = Column(String(32), nullable=False)      # 动作类型
+    payload = Column(JSON, nullable=True)                 # 动作负载
+    ts = Column(Double, nullable=False)                   # 动作生效时间戳（用于精确回放 phase_start_time）
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
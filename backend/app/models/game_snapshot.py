@@ -0,0 +1,18 @@
+# 这个文件是对局快照数据库模型定义，映射到 game_snapshots 表。每隔固定数量的事件保存一次完整状态，回放时从最近的快照开始只需应用少量事件。
+from sqlalchemy import BigInteger, Column, DateTime, Integer, LargeBinary, String, UniqueConstraint
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+class GameSnapshot(Base):
+    __tablename__ = "game_snapshots"
+    __table_args__ = (
+        # 按局查找不大于某个 seq 的最近快照
+        UniqueConstraint("game_id", "seq", name="uq_game_snapshots_game_seq"),
+    )
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    game_id = Column(String(36), nullable=False)
+    seq = Column(Integer, nullable=False)                 # 快照对应的动作序号（0 为创建对局时的初始状态）
+    version = Column(Integer, nullable=False)             # 快照对应的存储版本号
+    state = Column(LargeBinary(length=16777215), nullable=False)  # 紧凑序列化的完整对局状态（MEDIUMBLOB）
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,14 +1,18 @@
 # 这个文件是认证相关的 API 路由处理，包含用户注册和登录接口。
 from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import EmailStr, BaseModel
-from app.db.base import get_db
+from app.db.session import get_async_db
 from app.models.user import User
 from app.schemas.user import UserCreate, UserLogin, UserResponse
 from app.schemas.token import Token
-from app.core.security import get_password_hash, verify_password, create_access_token
+from app.core.security import hash_password_async, verify_and_update_async, create_access_token
 from app.schemas.base import ResponseModel
 from app.core.redis import get_redis
+from app.core.redis_scripts import try_store_verification_code, consume_verification_code
+from app.core.rate_limit import login_rate_limit
+from app.core.config import settings
 from app.core.email import send_verification_email, generate_verification_code
 from app.core.deps import get_current_user
 from redis.asyncio import Redis
@@ -29,23 +33,23 @@ async def send_code(
     """
     email = email_data.email
     
-    # 1. 检查是否频繁发送 (60秒内)
-    if await redis.get(f"email_limit:{email}"):
+    # 1. 生成验证码
+    code = generate_verification_code()
+    
+    # 2. 检查发送频率并存入 Redis（一次原子操作：间隔内已发送过则不写入）
+    retry_after = await try_store_verification_code(
+        redis, email, code,
+        code_ttl=settings.VERIFICATION_CODE_TTL_SECONDS,
+        interval=settings.SEND_CODE_INTERVAL_SECONDS
+    )
+    if retry_after:
         raise HTTPException(
             status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-            detail="发送太频繁，请稍后再试"
+            detail="发送太频繁，请稍后再试",
+            headers={"Retry-After": str(retry_after)}
         )
     
-    # 2. 生成验证码
-    code = generate_verification_code()
-    
-    # 3. 存入 Redis (有效期 5 分钟)
-    await redis.set(f"verification_code:{email}", code, ex=300)
-    
-    # 4. 限制发送频率 (60秒)
-    await redis.set(f"email_limit:{email}", "1", ex=60)
-    
-    # 5. 异步发送邮件
+    # 3. 异步发送邮件
     background_tasks.add_task(send_verification_email, email, code)
     
     return ResponseModel(
@@ -57,25 +61,21 @@ async def send_code(
 @router.post("/register", response_model=ResponseModel[UserResponse])
 async def register(
     user_in: UserCreate, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     redis: Redis = Depends(get_redis)
 ):
     """
     用户注册接口
     """
-    # 0. 校验验证码
-    cached_code = await redis.get(f"verification_code:{user_in.email}")
-    if not cached_code or cached_code != user_in.verification_code:
+    # 0. 校验验证码（校验通过的同时删除，验证码只能使用一次）
+    if not await consume_verification_code(redis, user_in.email, user_in.verification_code):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="验证码错误或已过期"
         )
-    
-    # 验证通过后删除验证码
-    await redis.delete(f"verification_code:{user_in.email}")
 
     # 1. 检查用户名是否已存在
-    user = db.query(User).filter(User.username == user_in.username).first()
+    user = (await db.execute(select(User).where(User.username == user_in.username))).scalars().first()
     if user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -83,23 +83,23 @@ async def register(
         )
     
     # 2. 检查邮箱是否已存在
-    user = db.query(User).filter(User.email == user_in.email).first()
+    user = (await db.execute(select(User).where(User.email == user_in.email))).scalars().first()
     if user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="邮箱已存在"
         )
     
-    # 3. 创建新用户
+    # 3. 创建新用户（bcrypt 哈希在专用线程池中执行，不阻塞事件循环）
     db_user = User(
         username=user_in.username,
         email=user_in.email,
-        hashed_password=get_password_hash(user_in.password),
+        hashed_password=await hash_password_async(user_in.password),
         is_active=True
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     
     return ResponseModel(
         code=0,
@@ -107,25 +107,31 @@ async def register(
         data=db_user
     )
 
-@router.post("/login", response_model=ResponseModel[Token])
-def login(user_in: UserLogin, db: Session = Depends(get_db)):
+@router.post("/login", response_model=ResponseModel[Token], dependencies=[Depends(login_rate_limit.by_ip)])
+async def login(user_in: UserLogin, db: AsyncSession = Depends(get_async_db)):
     """
     用户登录接口（返回 JWT Token）
     """
     # 1. 查找用户
-    user = db.query(User).filter(User.username == user_in.username).first()
+    user = (await db.execute(select(User).where(User.username == user_in.username))).scalars().first()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="用户名或密码错误"
         )
     
-    # 2. 校验密码
-    if not verify_password(user_in.password, user.hashed_password):
+    # 2. 校验密码（bcrypt 在专用线程池中执行）
+    verified, new_hash = await verify_and_update_async(user_in.password, user.hashed_password)
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="用户名或密码错误"
         )
+
+    # 工作因子已调整：登录成功时透明升级旧哈希
+    if new_hash is not None:
+        user.hashed_password = new_hash
+        await db.commit()
     
     # 3. 生成 Token
     access_token = create_access_token(subject=user.id)
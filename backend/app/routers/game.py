@@ -1,26 +1,49 @@
 """
 这个文件定义了对局相关的路由接口。
 """
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.schemas.game import GameCreateRequest, GameCreateResponse, GameState, GameActionRequest
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.schemas.game import GameCreateRequest, GameCreateResponse, GameState, GameActionRequest, GameActionBatchRequest, GameEventsResponse
 from app.services.game_service import GameService
+from app.services.game_replay import game_replay
+from app.services.game_view import build_player_view, mask_event
+from app.services.game_watch import game_watcher
+from app.services.idempotency import IdempotentResponse, idempotency_cache
+from app.core.config import settings
 from app.core.deps import get_current_user
+from app.core.rate_limit import create_game_rate_limit, action_rate_limit, operator_action_rate_limit
 from app.models.user import User
-from app.db.base import get_db
+from app.db.session import get_async_db
 
 router = APIRouter()
 
-@router.post("/", response_model=GameCreateResponse)
+def _game_etag(game: GameState) -> str:
+    """对局快照的 ETag：同一版本的快照内容不变"""
+    return f'"{game.game_id}:{game.version}"'
+
+def _snapshot_response(game: GameState, user_id: int) -> Response:
+    """
+    构建快照响应
+    Service 层会处理脱敏逻辑，并缓存序列化后的 JSON，直接写入响应体（跳过 response_model 的二次校验与序列化）
+    """
+    return Response(
+        content=GameService.get_player_view_json(game, user_id),
+        media_type="application/json",
+        headers={"ETag": _game_etag(game), "Cache-Control": "no-cache"}
+    )
+
+@router.post("/", response_model=GameCreateResponse, dependencies=[Depends(create_game_rate_limit.by_user)])
 async def create_game(
     request: GameCreateRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     创建新对局。
     需要提供 player_ids 列表。
+    ai_player_ids 只能是机器人账号（AI_BOT_USER_IDS）、未注册的占位座位或创建者本人，不能把其他真人账号设为 AI 代打。
     """
     # 1. 验证玩家 ID 是否存在
     if not request.player_ids:
@@ -28,12 +51,29 @@ async def create_game(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Player IDs cannot be empty"
         )
+    if not set(request.ai_player_ids) <= set(request.player_ids):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="AI player IDs must be a subset of player IDs"
+        )
 
     # 2. 从数据库获取用户信息
-    users = db.query(User).filter(User.id.in_(request.player_ids)).all()
-    
+    result = await db.execute(
+        select(User.id, User.username, User.is_active).where(User.id.in_(request.player_ids))
+    )
+    rows = result.all()
+
     # 3. 构建 ID 到 用户名 的映射
-    user_map = {u.id: u.username for u in users}
+    user_map = {uid: username for uid, username, _ in rows}
+
+    # AI 座位不能是其他真人的活跃账号（否则 AI 引擎与编排账号会代替本人行动）
+    active_ids = {uid for uid, _, is_active in rows if is_active}
+    foreign_ids = (set(request.ai_player_ids) & active_ids) - set(settings.AI_BOT_USER_IDS) - {current_user.id}
+    if foreign_ids:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"Cannot assign AI seats to other users: {sorted(foreign_ids)}"
+        )
     
     # 4. 对于数据库中未找到的 ID（可能是测试用或已删除），使用默认名称填充
     missing_ids = set(request.player_ids) - set(user_map.keys())
@@ -41,61 +81,204 @@ async def create_game(
         user_map[uid] = f"User_{uid}"
 
     # 5. 调用 Service 创建对局
-    game_state = await GameService.create_game(request.player_ids, user_map)
+    game_state = await GameService.create_game(request.player_ids, user_map, request.ai_player_ids)
     
     return GameCreateResponse(
         game_id=game_state.game_id,
         initial_state=game_state
     )
 
-@router.get("/{game_id}", response_model=GameState)
+@router.get("/{game_id}", response_model=GameState, responses={304: {"description": "对局未变化"}})
 async def get_game_state(
     game_id: str,
+    wait_for_version: Optional[int] = Query(None, description="长轮询：挂起直到对局版本 >= 该值或超时"),
+    timeout: float = Query(settings.LONG_POLL_MAX_SECONDS, gt=0, le=settings.LONG_POLL_MAX_SECONDS, description="长轮询最长等待秒数"),
+    if_none_match: Optional[str] = Header(None),
     current_user: User = Depends(get_current_user)
 ):
     """
     获取对局快照（支持断线重连/刷新）。
     返回的数据已根据当前玩家身份进行脱敏。
+    - 响应带有 ETag（对局版本），携带 If-None-Match 且对局未变化时返回 304；
+    - 传入 wait_for_version 时进入长轮询，对局推进到该版本或超时后返回。
     """
-    # 1. 获取全局状态
-    game = GameService.get_game(game_id)
+    # 1. 获取全局状态并校验是否为对局玩家（在长轮询挂起之前，非玩家不能占用等待或观察版本推进的时机）
+    game = await GameService.get_game(game_id)
     if not game:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Game not found"
         )
+    if not game.get_player(current_user.id):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You are not a player in this game"
+        )
+
+    # 2. 长轮询时等待版本推进
+    if wait_for_version is not None and game.version < wait_for_version:
+        game = await game_watcher.wait_for_version(game_id, wait_for_version, timeout)
+        if not game:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Game not found"
+            )
+
+    # 3. 对局未变化 -> 304
+    etag = _game_etag(game)
+    if if_none_match == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
     
-    # 2. 获取视角视图
-    # Service 层会处理脱敏逻辑
-    player_view = GameService.get_player_view(game, current_user.id)
-    
-    return player_view
+    # 4. 获取视角视图
+    return _snapshot_response(game, current_user.id)
+
+async def _get_game_for_player(game_id: str, user_id: int) -> GameState:
+    """获取对局（存储中已过期的对局从快照与事件流重建），并校验当前用户是否为对局玩家"""
+    game = await GameService.get_game(game_id) or await game_replay.state_at(game_id)
+    if not game:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Game not found"
+        )
+    if not game.get_player(user_id):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You are not a player in this game"
+        )
+    return game
 
-@router.post("/{game_id}/action", response_model=GameState)
+@router.get("/{game_id}/events", response_model=GameEventsResponse)
+async def get_game_events(
+    game_id: str,
+    after: int = Query(0, ge=0, description="只返回序号大于该值的事件（客户端已持有的最后一个 seq）"),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    获取增量事件（断线重连追赶/回放）。
+    按 seq 升序返回，单次最多 EVENTS_PAGE_SIZE 条；任务牌结果不公开。
+    """
+    await _get_game_for_player(game_id, current_user.id)
+    events = await game_replay.get_events(game_id, after)
+    return GameEventsResponse(
+        game_id=game_id,
+        events=[mask_event(e) for e in events],
+        last_seq=events[-1].seq if events else after
+    )
+
+@router.get("/{game_id}/replay", response_model=GameState)
+async def get_game_replay(
+    game_id: str,
+    seq: int = Query(..., ge=0, description="回放到第 seq 个动作之后的状态（0 为开局）"),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    获取对局在某一历史时刻的快照（从最近的快照 + 事件流重建）。
+    返回的数据按当前玩家在该时刻的身份进行脱敏。
+    """
+    await _get_game_for_player(game_id, current_user.id)
+    state = await game_replay.state_at(game_id, seq)
+    if not state:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Game history not found"
+        )
+    return build_player_view(state, state.get_player(current_user.id))
+
+@router.post("/{game_id}/action", response_model=GameState, dependencies=[Depends(action_rate_limit.by_user)])
 async def submit_action(
     game_id: str,
     action: GameActionRequest,
+    idempotency_key: Optional[str] = Header(None, max_length=128, description="客户端生成的请求唯一标识，重试时携带相同的值"),
     current_user: User = Depends(get_current_user)
 ):
     """
     提交玩家动作（统一入口）。
     根据 action_type 和 payload 执行相应的业务逻辑。
+    携带 Idempotency-Key 时，同一 key 的重试直接返回第一次成功执行的结果（响应头 Idempotent-Replayed: true）。
     """
-    # 调用 Service 处理动作
-    # Service 层会负责：
-    # 1. 校验动作是否合法（规则引擎）
-    # 2. 更新游戏状态（状态机）
-    # 3. 返回更新后的全局状态（Service 返回的是全局状态）
-    
-    updated_state = await GameService.process_action(
-        game_id=game_id,
-        user_id=current_user.id,
-        action_type=action.action_type,
-        payload=action.payload
+    async def handler() -> IdempotentResponse:
+        # 调用 Service 处理动作
+        # Service 层会负责：
+        # 1. 校验动作是否合法（规则引擎）
+        # 2. 更新游戏状态（状态机）
+        # 3. 返回更新后的全局状态（Service 返回的是全局状态）
+        updated_state = await GameService.process_action(
+            game_id=game_id,
+            user_id=current_user.id,
+            action_type=action.action_type,
+            payload=action.payload
+        )
+
+        # 返回给前端时，同样需要进行视角脱敏
+        # 这样前端操作完后能立即拿到最新的、符合自己视角的快照
+        return IdempotentResponse(
+            fingerprint=fingerprint,
+            content=GameService.get_player_view_json(updated_state, current_user.id),
+            etag=_game_etag(updated_state)
+        )
+
+    fingerprint = action.model_dump_json()
+    headers = {}
+    if idempotency_key is None:
+        result = await handler()
+    else:
+        result, replayed = await idempotency_cache.run(
+            (current_user.id, game_id, idempotency_key), fingerprint, handler
+        )
+        if replayed:
+            headers["Idempotent-Replayed"] = "true"
+
+    return Response(
+        content=result.content,
+        media_type="application/json",
+        headers={"ETag": result.etag, "Cache-Control": "no-cache", **headers}
     )
-    
-    # 返回给前端时，同样需要进行视角脱敏
-    # 这样前端操作完后能立即拿到最新的、符合自己视角的快照
-    player_view = GameService.get_player_view(updated_state, current_user.id)
-    
-    return player_view
+
+@router.post("/{game_id}/actions/batch", response_model=GameState)
+async def submit_actions_batch(
+    game_id: str,
+    request: GameActionBatchRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    批量提交动作（AI 编排一次推进整个阶段）。
+    动作按顺序原子地执行：全部成功才生效，任一失败则整批不生效并返回该动作的错误。
+    - 玩家只能提交自己的动作；AI 编排账号（AI_OPERATOR_USER_IDS）可以代所有 AI 座位提交；
+    - 限流按动作数计（AI 编排账号使用单独的额度）；
+    - 返回批量执行后的状态：对局玩家返回本人视角，不在对局中的 AI 编排账号返回公开视角（从不返回完整状态）。
+    """
+    is_operator = current_user.id in settings.AI_OPERATOR_USER_IDS
+    limiter = operator_action_rate_limit if is_operator else action_rate_limit
+    limiter.hit(str(current_user.id), cost=len(request.actions))
+
+    game = await GameService.get_game(game_id)
+    if not game:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Game not found"
+        )
+
+    # 1. 权限校验
+    for action in request.actions:
+        if action.user_id == current_user.id:
+            continue
+        player = game.get_player(action.user_id)
+        if not (is_operator and player and player.is_ai):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"Not allowed to act for player {action.user_id}"
+            )
+
+    # 2. 一次 Actor 调用、一次写入完成整批动作
+    updated_state = await GameService.process_actions(
+        game_id,
+        [(action.user_id, action.action_type, action.payload) for action in request.actions]
+    )
+
+    if is_operator and not updated_state.get_player(current_user.id):
+        return Response(
+            content=GameService.get_public_view_json(updated_state),
+            media_type="application/json",
+            headers={"ETag": _game_etag(updated_state), "Cache-Control": "no-cache"}
+        )
+    return _snapshot_response(updated_state, current_user.id)
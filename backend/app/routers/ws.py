@@ -0,0 +1,94 @@
+"""
+这个文件定义了对局实时通信的 WebSocket 接口（/ws/games/{game_id}），消息格式遵循 protocol.py 中的 WSMesssage。
+"""
+import asyncio
+from fastapi import APIRouter, HTTPException, Query, WebSocket, WebSocketDisconnect, status
+from pydantic import ValidationError
+from app.core.deps import get_user_by_token
+from app.db.session import AsyncSessionLocal
+from app.schemas.game import GameActionRequest
+from app.schemas.protocol import WebSocketOpCode, WSMesssage
+from app.services.game_service import GameService
+from app.services.room_hub import room_hub
+
+router = APIRouter()
+
+async def _reject(websocket: WebSocket, reason: str):
+    """
+    拒绝连接：先接受再以 1008 关闭
+    握手阶段直接关闭会被服务器转成 HTTP 403，客户端拿不到关闭码与原因，无法区分鉴权失败与网络错误
+    """
+    await websocket.accept()
+    await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=reason)
+
+@router.websocket("/ws/games/{game_id}")
+async def game_socket(
+    websocket: WebSocket,
+    game_id: str,
+    token: str = Query(..., description="登录返回的 access_token（浏览器 WebSocket 无法设置请求头）")
+):
+    """
+    对局实时通道。
+    - 连接成功后下发 GAME_SNAPSHOT，之后推送 STATE_UPDATE 增量；
+    - 上行支持 JOIN_GAME（重新获取快照）、PLAYER_ACTION（提交动作）、HEARTBEAT（心跳）。
+    """
+    # 1. 鉴权（只在握手时查询一次用户，不在整个连接期间占用数据库会话）
+    try:
+        async with AsyncSessionLocal() as db:
+            user = await get_user_by_token(token, db)
+    except HTTPException:
+        await _reject(websocket, "Could not validate credentials")
+        return
+
+    # 2. 校验对局与玩家身份
+    game = await GameService.get_game(game_id)
+    if not game:
+        await _reject(websocket, "Game not found")
+        return
+    if not game.get_player(user.id):
+        await _reject(websocket, "You are not a player in this game")
+        return
+
+    await websocket.accept()
+    conn = room_hub.join(game, websocket, user.id)
+    sender = asyncio.create_task(conn.run_sender())
+
+    try:
+        while True:
+            raw = await websocket.receive_text()
+            try:
+                message = WSMesssage.model_validate_json(raw)
+            except ValidationError:
+                room_hub.send(conn, WebSocketOpCode.ERROR, {"detail": "消息格式错误"})
+                continue
+
+            if message.type == WebSocketOpCode.HEARTBEAT:
+                room_hub.send(conn, WebSocketOpCode.PONG)
+
+            elif message.type == WebSocketOpCode.JOIN_GAME:
+                game = await GameService.get_game(game_id)
+                if game:
+                    room_hub.resync(conn, game)
+
+            elif message.type == WebSocketOpCode.PLAYER_ACTION:
+                try:
+                    action = GameActionRequest.model_validate(message.payload or {})
+                    # 动作成功后由 room_hub 监听器统一广播，这里无需单独回包
+                    await GameService.process_action(
+                        game_id=game_id,
+                        user_id=user.id,
+                        action_type=action.action_type,
+                        payload=action.payload
+                    )
+                except ValidationError:
+                    room_hub.send(conn, WebSocketOpCode.ERROR, {"detail": "动作格式错误"})
+                except HTTPException as e:
+                    room_hub.send(conn, WebSocketOpCode.ERROR, {"status_code": e.status_code, "detail": e.detail})
+
+            else:
+                room_hub.send(conn, WebSocketOpCode.ERROR, {"detail": f"不支持的消息类型: {message.type.value}"})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        room_hub.leave(conn)
+        sender.cancel()
@@ -1,15 +1,21 @@
 """
 这个文件定义了对局状态的核心数据模型（Schema），用于状态机流转与前端通信。
 """
-from typing import List, Optional
-from pydantic import BaseModel
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, Field, PrivateAttr
 from app.models.game_enums import GamePhase, Character, VoteOption, MissionResult, ActionType
 
+# 列式历史的尺寸：最多 5 轮任务，每轮最多 5 次提名（第 5 次被否决时坏人直接获胜）
+HISTORY_ROUNDS = 5
+HISTORY_ATTEMPTS = 5
+HISTORY_SLOTS = HISTORY_ROUNDS * HISTORY_ATTEMPTS
+
 class PlayerState(BaseModel):
     """玩家在单局游戏中的状态"""
     user_id: int
     username: str
     seat_id: int            # 座位号 0-7
+    is_ai: bool = False     # 是否为 AI 座位（由 AI 编排批量代为提交动作）
     character: Optional[Character] = None # 角色（对本人可见，或结算后公开）
     is_alive: bool = True   # 是否存活（刺杀阶段用）
     
@@ -26,6 +32,8 @@ class GameState(BaseModel):
     对局核心状态快照
     """
     game_id: str
+    version: int = 0        # 存储版本号，每次成功写入存储后 +1（用于 compare-and-set）
+    seq: int = 0            # 最后一个已应用动作的序号（单调递增，由对局 Actor 分配）
     phase: GamePhase
     phase_start_time: float = 0.0 # 当前阶段开始时间戳
     
@@ -47,18 +55,195 @@ class GameState(BaseModel):
     # 历史记录
     mission_results: List[MissionResult] = [] # 每一轮任务的结果
     pending_mission_results: List[MissionResult] = [] # 当前轮次待结算的任务结果（临时存储）
+    pending_mission_count: Optional[int] = None # 脱敏视图中代替 pending_mission_results：本轮已提交的任务牌张数（完整状态中为 None）
     winner: Optional[str] = None         # 胜利阵营 (good/evil)
 
+    # 列式历史：按 (轮次, 第几次提名) 展开的定长数组，下标见 history_slot；写入均为 O(1)
+    # 队伍与赞成者都是 8 位座位掩码（座位 s 对应 1 << s），队伍掩码为 0 表示该次提名没有发生
+    team_history: List[int] = Field(default_factory=lambda: [0] * HISTORY_SLOTS)     # 每次提名的队伍
+    approve_history: List[int] = Field(default_factory=lambda: [0] * HISTORY_SLOTS)  # 每次投票的赞成者（结算后写入）
+    mission_fail_history: List[int] = Field(default_factory=lambda: [0] * HISTORY_ROUNDS) # 每轮任务的失败票数
+
+    # 内存索引与计数器（不参与序列化，加载/复制时根据字段重建，动作执行时增量维护）
+    _player_by_user: Dict[int, PlayerState] = PrivateAttr(default_factory=dict)
+    _players_by_seat: List[PlayerState] = PrivateAttr(default_factory=list)
+    _votes_cast: int = PrivateAttr(default=0)           # 本次投票已投票人数
+    _approve_votes: int = PrivateAttr(default=0)        # 本次投票赞成票数
+    _mission_submitted: int = PrivateAttr(default=0)    # 本轮任务已提交人数
+    _mission_fails: int = PrivateAttr(default=0)        # 本轮任务失败票数
+
     class Config:
         from_attributes = True
 
+    def model_post_init(self, __context: Any) -> None:
+        self.rebuild_indexes()
+
+    def model_copy(self, *, update: Optional[Dict[str, Any]] = None, deep: bool = False) -> "GameState":
+        # 复制后的索引需要指向新对象自己的 players
+        copied = super().model_copy(update=update, deep=deep)
+        copied.rebuild_indexes()
+        return copied
+
+    def __eq__(self, other: Any) -> bool:
+        # 只比较字段，内存索引与计数器属于派生数据
+        if not isinstance(other, GameState):
+            return NotImplemented
+        return self.__dict__ == other.__dict__
+
+    def __deepcopy__(self, memo: Optional[Dict[int, Any]] = None) -> "GameState":
+        copied = super().__deepcopy__(memo)
+        copied.rebuild_indexes()
+        return copied
+
+    def rebuild_indexes(self) -> None:
+        """根据当前字段重建玩家索引与计数器（O(玩家数)，仅在加载/复制时调用）"""
+        self._player_by_user = {p.user_id: p for p in self.players}
+        self._players_by_seat = sorted(self.players, key=lambda p: p.seat_id)
+        self._votes_cast = len(self.votes)
+        self._approve_votes = sum(1 for v in self.votes.values() if v == VoteOption.APPROVE)
+        self._mission_submitted = len(self.pending_mission_results)
+        self._mission_fails = sum(1 for r in self.pending_mission_results if r == MissionResult.FAIL)
+
+    # --- 玩家索引 ---
+
+    # 以下热点方法直接读写 __pydantic_private__，绕过 BaseModel.__getattr__ 对私有属性的慢路径
+
+    def get_player(self, user_id: int) -> Optional[PlayerState]:
+        """按 user_id 查找玩家"""
+        return self.__pydantic_private__["_player_by_user"].get(user_id)
+
+    def get_player_by_seat(self, seat_id: int) -> PlayerState:
+        """按座位号查找玩家"""
+        by_seat = self.__pydantic_private__["_players_by_seat"]
+        return by_seat[seat_id % len(by_seat)]
+
+    def next_player(self, user_id: int) -> PlayerState:
+        """按座位顺序获取下一位玩家（首尾相接）"""
+        private = self.__pydantic_private__
+        by_seat = private["_players_by_seat"]
+        return by_seat[(private["_player_by_user"][user_id].seat_id + 1) % len(by_seat)]
+
+    @property
+    def players_by_seat(self) -> List[PlayerState]:
+        """按座位号排序的玩家列表"""
+        return self._players_by_seat
+
+    # --- 投票计数 ---
+
+    @property
+    def votes_cast(self) -> int:
+        return self.__pydantic_private__["_votes_cast"]
+
+    @property
+    def approve_votes(self) -> int:
+        return self.__pydantic_private__["_approve_votes"]
+
+    def record_vote(self, player: PlayerState, option: VoteOption) -> None:
+        """记录一张投票并更新计数"""
+        self.votes[player.user_id] = option
+        player.has_voted = True
+        private = self.__pydantic_private__
+        private["_votes_cast"] += 1
+        if option == VoteOption.APPROVE:
+            private["_approve_votes"] += 1
+
+    def reset_votes(self) -> None:
+        """开始新一次投票"""
+        self.votes = {}
+        for p in self.players:
+            p.has_voted = False
+        self._votes_cast = 0
+        self._approve_votes = 0
+
+    # --- 任务计数 ---
+
+    @property
+    def mission_submitted(self) -> int:
+        return self.__pydantic_private__["_mission_submitted"]
+
+    @property
+    def mission_fails(self) -> int:
+        return self.__pydantic_private__["_mission_fails"]
+
+    def record_mission_result(self, player: PlayerState, result: MissionResult) -> None:
+        """记录一张任务牌并更新计数"""
+        self.pending_mission_results.append(result)
+        player.has_acted = True
+        private = self.__pydantic_private__
+        private["_mission_submitted"] += 1
+        if result == MissionResult.FAIL:
+            private["_mission_fails"] += 1
+
+    def reset_mission(self) -> None:
+        """清理本轮任务的临时状态"""
+        self.pending_mission_results = []
+        self._mission_submitted = 0
+        self._mission_fails = 0
+
+    # --- 列式历史 ---
+
+    @staticmethod
+    def history_slot(round_num: int, attempt: int) -> int:
+        """第 round_num 轮第 attempt 次提名（从 0 开始，即提名时的 vote_track）在历史数组中的下标"""
+        return (round_num - 1) * HISTORY_ATTEMPTS + attempt
+
+    @property
+    def current_slot(self) -> int:
+        """当前提名在历史数组中的下标"""
+        return self.history_slot(self.round, self.vote_track)
+
+    def seat_mask(self, user_ids: List[int]) -> int:
+        """玩家列表 -> 座位掩码"""
+        by_user = self.__pydantic_private__["_player_by_user"]
+        mask = 0
+        for uid in user_ids:
+            mask |= 1 << by_user[uid].seat_id
+        return mask
+
+    def record_team_history(self) -> None:
+        """记录本次提名的队伍"""
+        self.team_history[self.current_slot] = self.seat_mask(self.proposed_team)
+
+    def record_vote_history(self) -> None:
+        """投票结算时记录赞成者（须在 vote_track 变化之前调用）"""
+        by_user = self.__pydantic_private__["_player_by_user"]
+        mask = 0
+        for uid, option in self.votes.items():
+            if option == VoteOption.APPROVE:
+                mask |= 1 << by_user[uid].seat_id
+        self.approve_history[self.current_slot] = mask
+
+    def record_mission_history(self, fail_count: int) -> None:
+        """任务结算时记录本轮的失败票数（须在 round 变化之前调用）"""
+        self.mission_fail_history[self.round - 1] = fail_count
+
+class GameActionRecord(BaseModel):
+    """
+    已应用的动作记录（每个成功执行的动作对应一条）
+    """
+    game_id: str
+    seq: int                # 动作序号，与应用后 GameState.seq 一致
+    user_id: int            # 执行动作的玩家
+    action_type: ActionType
+    payload: dict = {}
+    ts: float               # 动作生效时间戳
+
 class GameCreateRequest(BaseModel):
     player_ids: List[int]
+    ai_player_ids: List[int] = []   # 其中由 AI 控制的座位（user_id）
 
 class GameCreateResponse(BaseModel):
     game_id: str
     initial_state: GameState
 
+class GameEventsResponse(BaseModel):
+    """
+    增量事件响应（断线重连/回放）
+    """
+    game_id: str
+    events: List[GameActionRecord]  # seq 升序
+    last_seq: int                   # 本次返回的最后一个事件序号，下次请求作为 after 传入
+
 class GameActionRequest(BaseModel):
     """
     统一动作请求
@@ -71,3 +256,15 @@ class GameActionRequest(BaseModel):
     # ASSASSINATE: {"target_id": 3}
     # SPEAK: {} (暂时为空，或包含语音/文本内容)
     payload: dict = {}
+
+class GameBatchAction(GameActionRequest):
+    """
+    批量提交中的单个动作（指定执行动作的玩家）
+    """
+    user_id: int
+
+class GameActionBatchRequest(BaseModel):
+    """
+    批量动作请求：按顺序原子地应用到同一局，任一动作失败则全部不生效
+    """
+    actions: List[GameBatchAction] = Field(..., min_length=1, max_length=64)
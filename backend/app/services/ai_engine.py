@@ -0,0 +1,149 @@
+"""
+这个文件实现了 AI 座位引擎：为所有对局中的 AI 座位批量决策，并通过 GameService 提交动作。
+- 对局更新时（监听器）只检查这一局是否有待行动的 AI 座位，有则登记到待决策集合；
+- 每个 tick 一次性取出所有待决策的对局，在状态副本上依次决策并推演，
+  直到轮到人类玩家或对局结束（例如连续的 AI 发言），然后每局一次 process_actions 原子提交；
+- 使用信念的策略在该局信念的副本上同步推演（见 belief_tracker.py），跟踪的信念只随真正提交的动作更新；
+- 开销只与待决策的对局/动作数相关，与对局总数、玩家总数无关。
+"""
+import asyncio
+import logging
+import random
+import time
+from typing import Dict, List, Optional
+from fastapi import HTTPException
+from app.core.ai_policy import AIPolicy, get_policy
+from app.core.config import settings
+from app.core.game_reducer import apply_action
+from app.core.game_rules import GameRuleError, GameRuleValidator, TimeoutPolicy
+from app.core.metrics import metrics
+from app.models.game_enums import GamePhase
+from app.schemas.game import GameState, GameActionRecord, PlayerState
+from app.services.belief_tracker import BeliefTracker, belief_tracker
+from app.services.game_service import GameService, PendingAction
+
+logger = logging.getLogger(__name__)
+
+
+def pending_ai_players(game: GameState) -> List[PlayerState]:
+    """当前阶段尚未行动的 AI 座位"""
+    if game.phase == GamePhase.FINISHED:
+        return []
+    return [p for p in TimeoutPolicy.get_pending_players(game) if p.is_ai]
+
+
+class AIEngine:
+    """
+    AI 座位引擎
+    """
+
+    def __init__(self, policy: AIPolicy = None, tick_seconds: float = None,
+                 max_batch_actions: int = None, rng: random.Random = None, beliefs: BeliefTracker = None):
+        self.policy = policy or get_policy(settings.AI_POLICY)
+        self.beliefs = beliefs or belief_tracker
+        self.tick_seconds = tick_seconds if tick_seconds is not None else settings.AI_TICK_SECONDS
+        self.max_batch_actions = max_batch_actions if max_batch_actions is not None else settings.AI_MAX_BATCH_ACTIONS
+        self.rng = rng or random.Random()
+        # 待决策的对局（dict 保持登记顺序，同一局只登记一次）
+        self._pending: Dict[str, None] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._decisions = metrics.counter("ai.decisions")
+        self._failures = metrics.counter("ai.submit_failed")
+        self._tick_ms = metrics.summary("ai.tick_ms")
+
+    def on_game_updated(self, game: GameState, record: Optional[GameActionRecord]):
+        """对局更新监听器：有 AI 座位待行动时登记该局"""
+        if pending_ai_players(game):
+            self._pending[game.game_id] = None
+
+    def plan(self, game: GameState, now: float) -> List[PendingAction]:
+        """
+        在状态副本上为 AI 座位连续决策，直到轮到人类玩家、对局结束或达到单批上限（每轮待行动的座位执行完后检查）
+        :raises GameRuleError: 策略给出了非法动作
+        """
+        state = game.model_copy(deep=True)
+        belief = self.beliefs.fork(game) if self.policy.uses_belief else None
+        actions: List[PendingAction] = []
+        while len(actions) < self.max_batch_actions:
+            players = pending_ai_players(state)
+            if not players:
+                break
+            for player in players:
+                action_type, payload = self.policy.decide(state, player, self.rng, belief)
+                GameRuleValidator.check_action(state, player.user_id, action_type, payload)
+                apply_action(state, player.user_id, action_type, payload, now)
+                if belief is not None:
+                    belief.observe(player.user_id, action_type, payload)
+                actions.append((player.user_id, action_type, payload))
+        return actions
+
+    async def run_tick(self, now: float = None):
+        """为本 tick 所有待决策的对局决策并提交（对局之间并发提交）"""
+        if not self._pending:
+            return
+        started = time.perf_counter()
+        now = now if now is not None else time.time()
+        game_ids = list(self._pending)
+        self._pending.clear()
+
+        games = await asyncio.gather(*[GameService.get_game(game_id) for game_id in game_ids])
+        batches = []
+        for game in games:
+            if game is None:
+                continue
+            try:
+                actions = self.plan(game, now)
+            except GameRuleError as e:
+                logger.error("ai policy produced an illegal action: game_id=%s policy=%s detail=%s",
+                             game.game_id, self.policy.name, e.detail)
+                continue
+            if actions:
+                batches.append((game.game_id, actions))
+                self._decisions.inc(len(actions))
+
+        await asyncio.gather(*[self._submit(game_id, actions) for game_id, actions in batches])
+        self._tick_ms.observe((time.perf_counter() - started) * 1000)
+
+    async def _submit(self, game_id: str, actions: List[PendingAction]):
+        try:
+            await GameService.process_actions(game_id, actions)
+        except HTTPException as e:
+            # 决策期间人类玩家已行动、超时兜底已执行或版本冲突：下个 tick 按最新状态重新决策
+            # （规划时已在同一状态上校验过，这里的失败只来自并发推进，不会反复失败）
+            self._failures.inc()
+            self._pending[game_id] = None
+            logger.info("ai actions retried next tick: game_id=%s detail=%s", game_id, e.detail)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.tick_seconds)
+            try:
+                await self.run_tick()
+            except Exception:
+                logger.exception("ai engine tick failed")
+
+    def start(self):
+        """注册监听器并启动后台 tick 任务"""
+        if self.policy.uses_belief:
+            GameService.add_listener(self.beliefs.on_game_updated)
+        GameService.add_listener(self.on_game_updated)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="ai-engine")
+
+    async def stop(self):
+        GameService.remove_listener(self.on_game_updated)
+        GameService.remove_listener(self.beliefs.on_game_updated)
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+
+# 全局 AI 引擎
+ai_engine = AIEngine()
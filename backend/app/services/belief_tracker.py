@@ -0,0 +1,52 @@
+"""
+这个文件维护进行中对局的信念状态（见 app/core/belief.py），供 AI 引擎决策使用。
+作为 GameService 的监听器，按动作记录逐条增量更新（投票/任务在全部提交后结算）；
+批量提交时每个动作都有对应的记录，更新与动作一一对应，与传入的最终状态无关。
+本进程没有跟踪到的对局（例如重启后），或收到其他 worker 的更新（没有动作记录）时，从对局的列式历史重建。
+对局结束后删除该局的信念。
+"""
+from typing import Dict, Optional
+from app.core.belief import GameBelief
+from app.models.game_enums import GamePhase
+from app.schemas.game import GameState, GameActionRecord
+
+
+class BeliefTracker:
+    """
+    信念跟踪器
+    key: game_id, value: 该局的信念状态
+    """
+
+    def __init__(self):
+        self._beliefs: Dict[str, GameBelief] = {}
+
+    def on_game_updated(self, game: GameState, record: Optional[GameActionRecord]):
+        """对局更新监听器"""
+        if game.phase == GamePhase.FINISHED:
+            self._beliefs.pop(game.game_id, None)
+            return
+        belief = self._beliefs.get(game.game_id)
+        if belief is None or (record is None and game.seq > belief.seq):
+            # 重建的信念已包含 game.seq 之前的所有动作（批量提交时后续记录的 seq 不大于它，会被跳过）
+            self._beliefs[game.game_id] = GameBelief.from_history(game)
+            return
+        if record is not None and record.seq > belief.seq:
+            belief.observe(record.user_id, record.action_type, record.payload)
+            belief.seq = record.seq
+
+    def get(self, game_id: str) -> Optional[GameBelief]:
+        return self._beliefs.get(game_id)
+
+    def fork(self, game: GameState) -> GameBelief:
+        """该局信念的副本（用于在状态副本上推演决策，不影响跟踪的信念）"""
+        belief = self._beliefs.get(game.game_id)
+        if belief is None or belief.seq != game.seq:
+            return GameBelief.from_history(game)
+        return belief.copy()
+
+    def __len__(self) -> int:
+        return len(self._beliefs)
+
+
+# 全局信念跟踪器
+belief_tracker = BeliefTracker()
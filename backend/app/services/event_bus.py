@@ -0,0 +1,220 @@
+"""
+这个文件实现了跨 worker 的对局事件总线，用于多进程部署时把对局更新广播给持有该局 WebSocket 连接的其他 worker。
+- LocalEventBus：单进程部署，本地监听器已完成广播，总线不做任何事情；
+- RedisEventBus：基于 Redis pub/sub，每局一个频道；只有持有该局订阅者（房间连接、长轮询）的 worker 才订阅。
+  同一刷新周期内同一局的多次更新合并为一条，所有对局的发布通过一次 pipeline 发出，
+  因此一次动作只产生一次 PUBLISH，与观战的连接数无关。
+"""
+import asyncio
+import logging
+import uuid
+from typing import Callable, Dict, List, Optional, Set
+from app.core.config import settings
+from app.schemas.game import GameState, GameActionRecord
+from app.services.game_store import RedisGameStore
+
+logger = logging.getLogger(__name__)
+
+# 远端更新处理器，签名与对局更新监听器一致（远端更新的 record 为 None）
+RemoteUpdateHandler = Callable[[GameState, Optional[GameActionRecord]], None]
+
+
+class EventBus:
+    """
+    事件总线接口
+    """
+
+    def __init__(self):
+        self._handlers: List[RemoteUpdateHandler] = []
+
+    def add_handler(self, handler: RemoteUpdateHandler):
+        """注册远端更新处理器（房间广播、长轮询唤醒等）"""
+        if handler not in self._handlers:
+            self._handlers.append(handler)
+
+    def remove_handler(self, handler: RemoteUpdateHandler):
+        if handler in self._handlers:
+            self._handlers.remove(handler)
+
+    def _dispatch(self, game: GameState):
+        for handler in list(self._handlers):
+            try:
+                handler(game, None)
+            except Exception:
+                logger.exception("event bus handler failed: game_id=%s", game.game_id)
+
+    def on_game_updated(self, game: GameState, record: Optional[GameActionRecord]):
+        """对局更新监听器：将本地应用的更新发布给其他 worker"""
+        raise NotImplementedError
+
+    def subscribe(self, game_id: str):
+        """登记本 worker 对某局更新的关注（引用计数）"""
+        raise NotImplementedError
+
+    def unsubscribe(self, game_id: str):
+        raise NotImplementedError
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+
+class LocalEventBus(EventBus):
+    """
+    单进程事件总线：所有对局更新都在本进程产生，本地监听器已经完成广播
+    """
+
+    def on_game_updated(self, game: GameState, record: Optional[GameActionRecord]):
+        pass
+
+    def subscribe(self, game_id: str):
+        pass
+
+    def unsubscribe(self, game_id: str):
+        pass
+
+
+class RedisEventBus(EventBus):
+    """
+    Redis pub/sub 事件总线
+    消息格式：<worker_id>|<紧凑序列化的对局状态>，worker 收到自己发布的消息时直接忽略。
+    """
+
+    def __init__(self, client=None, channel_prefix: str = None, flush_interval: float = None, worker_id: str = None):
+        super().__init__()
+        if client is None:
+            from app.core.redis import redis_binary_client
+            client = redis_binary_client
+        self._redis = client
+        self._channel_prefix = channel_prefix if channel_prefix is not None else settings.EVENT_BUS_CHANNEL_PREFIX
+        self._flush_interval = flush_interval if flush_interval is not None else settings.EVENT_BUS_FLUSH_MS / 1000
+        self.worker_id = (worker_id or uuid.uuid4().hex).encode("utf-8")
+
+        # 待发布的更新：同一局只保留最新版本
+        self._pending: Dict[str, GameState] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+
+        # 订阅引用计数与实际订阅状态
+        self._refs: Dict[str, int] = {}
+        self._subscribed: Set[str] = set()
+        self._dirty: Set[str] = set()
+        self._reconcile_task: Optional[asyncio.Task] = None
+        self._pubsub = None
+        self._listen_task: Optional[asyncio.Task] = None
+
+    def _channel(self, game_id: str) -> str:
+        return f"{self._channel_prefix}{game_id}"
+
+    # --- 发布 ---
+
+    def encode(self, game: GameState) -> bytes:
+        return self.worker_id + b"|" + RedisGameStore.serialize(game)
+
+    def on_game_updated(self, game: GameState, record: Optional[GameActionRecord]):
+        self._pending[game.game_id] = game
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_later())
+
+    async def _flush_later(self):
+        # 等待一个刷新周期，合并期间产生的所有更新
+        await asyncio.sleep(self._flush_interval)
+        await self.flush()
+
+    async def flush(self):
+        """将待发布的更新通过一次 pipeline 发出"""
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        try:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for game_id, game in pending.items():
+                    pipe.publish(self._channel(game_id), self.encode(game))
+                await pipe.execute()
+        except Exception:
+            logger.exception("event bus publish failed: %d games", len(pending))
+
+    # --- 订阅 ---
+
+    def subscribe(self, game_id: str):
+        self._refs[game_id] = self._refs.get(game_id, 0) + 1
+        if self._refs[game_id] == 1:
+            self._mark_dirty(game_id)
+
+    def unsubscribe(self, game_id: str):
+        count = self._refs.get(game_id, 0) - 1
+        if count > 0:
+            self._refs[game_id] = count
+            return
+        self._refs.pop(game_id, None)
+        self._mark_dirty(game_id)
+
+    def _mark_dirty(self, game_id: str):
+        self._dirty.add(game_id)
+        if self._reconcile_task is None or self._reconcile_task.done():
+            self._reconcile_task = asyncio.get_running_loop().create_task(self._reconcile())
+
+    async def _reconcile(self):
+        """将实际订阅状态与引用计数对齐（订阅/取消订阅都在这个任务中串行执行）"""
+        while self._dirty:
+            game_id = self._dirty.pop()
+            wanted = game_id in self._refs
+            try:
+                if wanted and game_id not in self._subscribed:
+                    if self._pubsub is None:
+                        self._pubsub = self._redis.pubsub()
+                    await self._pubsub.subscribe(self._channel(game_id))
+                    self._subscribed.add(game_id)
+                    if self._listen_task is None or self._listen_task.done():
+                        self._listen_task = asyncio.get_running_loop().create_task(self._listen())
+                elif not wanted and game_id in self._subscribed:
+                    await self._pubsub.unsubscribe(self._channel(game_id))
+                    self._subscribed.discard(game_id)
+            except Exception:
+                logger.exception("event bus subscription update failed: game_id=%s", game_id)
+
+    async def _listen(self):
+        while True:
+            try:
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("event bus receive failed")
+                await asyncio.sleep(1.0)
+                continue
+            if message is None or message.get("type") != "message":
+                continue
+            self.handle_message(message["data"])
+
+    def handle_message(self, data: bytes):
+        """处理收到的消息：忽略本 worker 发布的更新，其余交给远端更新处理器"""
+        origin, _, body = data.partition(b"|")
+        if origin == self.worker_id:
+            return
+        self._dispatch(RedisGameStore.deserialize(body))
+
+    async def stop(self):
+        await self.flush()
+        for task in (self._flush_task, self._reconcile_task, self._listen_task):
+            if task is not None:
+                task.cancel()
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+            self._pubsub = None
+        self._subscribed.clear()
+
+
+def create_event_bus(backend: str = None) -> EventBus:
+    """根据配置创建事件总线"""
+    backend = backend or settings.EVENT_BUS_BACKEND
+    if backend == "local":
+        return LocalEventBus()
+    if backend == "redis":
+        return RedisEventBus()
+    raise ValueError(f"未知的事件总线类型: {backend}")
+
+
+# 全局事件总线
+event_bus: EventBus = create_event_bus()
@@ -0,0 +1,215 @@
+"""
+这个文件实现了对局事件日志（game_events）与对局快照（game_snapshots）的写后落库（write-behind）。
+动作热路径只把事件追加到进程内缓冲区，后台任务按固定间隔或缓冲区达到 N 条时批量写入 MySQL（多行 INSERT），
+动作本身不再等待任何数据库提交。
+写入是幂等的（ON DUPLICATE KEY，重试已提交但未收到确认的批次不会报错）。连接类错误一直重试（受缓冲上限约束）；
+同一批次因其他错误连续失败 EVENT_LOG_MAX_RETRIES 次后逐条写入，仍然失败的行记录到错误日志后丢弃（dead letter），不再阻塞后续事件。
+创建对局时以及每隔 GAME_SNAPSHOT_INTERVAL 个事件额外记录一次完整快照，回放时从最近的快照开始（见 game_replay.py）。
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+from sqlalchemy.dialects.mysql import insert
+from sqlalchemy.exc import InterfaceError, OperationalError
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.db.session import async_engine
+from app.models.game_event import GameEvent
+from app.models.game_snapshot import GameSnapshot
+from app.schemas.game import GameState, GameActionRecord
+from app.services.game_store import RedisGameStore
+
+logger = logging.getLogger(__name__)
+
+# 批量写入函数：接收一批事件行与快照行，完成持久化
+RowWriter = Callable[[List[Dict[str, Any]], List[Dict[str, Any]]], Awaitable[None]]
+
+
+async def insert_event_rows(rows: List[Dict[str, Any]], snapshots: List[Dict[str, Any]]):
+    """默认写入函数：多行 INSERT，事件与快照在同一个事务中写入；(game_id, seq) 已存在的行保持不变"""
+    async with async_engine.begin() as conn:
+        if rows:
+            stmt = insert(GameEvent).values(rows)
+            await conn.execute(stmt.on_duplicate_key_update(seq=stmt.inserted.seq))
+        if snapshots:
+            stmt = insert(GameSnapshot).values(snapshots)
+            await conn.execute(stmt.on_duplicate_key_update(seq=stmt.inserted.seq))
+
+
+def _is_transient(exc: Exception) -> bool:
+    """数据库不可用一类的错误（重试可能成功），其余错误视为数据本身的问题"""
+    return isinstance(exc, (OperationalError, InterfaceError, ConnectionError, TimeoutError))
+
+
+class EventWriteBehind:
+    """
+    事件写后缓冲
+    """
+
+    def __init__(self, writer: RowWriter = None, flush_interval: float = None,
+                 batch_size: int = None, max_buffer: int = None, snapshot_interval: int = None,
+                 max_retries: int = None):
+        self._writer = writer or insert_event_rows
+        self.flush_interval = flush_interval if flush_interval is not None else settings.EVENT_LOG_FLUSH_SECONDS
+        self.batch_size = batch_size if batch_size is not None else settings.EVENT_LOG_BATCH_SIZE
+        self.max_buffer = max_buffer if max_buffer is not None else settings.EVENT_LOG_MAX_BUFFER
+        self.snapshot_interval = snapshot_interval if snapshot_interval is not None else settings.GAME_SNAPSHOT_INTERVAL
+        self.max_retries = max_retries if max_retries is not None else settings.EVENT_LOG_MAX_RETRIES
+        self._buffer: List[Dict[str, Any]] = []
+        self._snapshots: List[Dict[str, Any]] = []
+        # 已到达快照间隔、等待批量动作最后一个事件的对局
+        self._snapshot_due: Set[str] = set()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        self.dropped = 0  # 因缓冲区溢出被丢弃的事件数
+        self.dead_lettered = 0  # 无法写入而被丢弃的事件与快照数
+        self._failures = 0  # 当前批次因非连接类错误连续失败的次数
+
+    @staticmethod
+    def to_row(record: GameActionRecord) -> Dict[str, Any]:
+        """动作记录 -> game_events 行"""
+        data = record.model_dump(mode="json")
+        return {
+            "game_id": data["game_id"],
+            "seq": data["seq"],
+            "user_id": data["user_id"],
+            "action_type": data["action_type"],
+            "payload": data["payload"],
+            "ts": data["ts"],
+        }
+
+    @staticmethod
+    def to_snapshot_row(game: GameState) -> Dict[str, Any]:
+        """对局状态 -> game_snapshots 行"""
+        return {
+            "game_id": game.game_id,
+            "seq": game.seq,
+            "version": game.version,
+            "state": RedisGameStore.serialize(game),
+        }
+
+    def append(self, record: GameActionRecord):
+        """追加一条事件（O(1)，不等待落库）"""
+        self._buffer.append(self.to_row(record))
+        if len(self._buffer) > self.max_buffer:
+            # 数据库长时间不可用：丢弃最旧的事件，保护进程内存
+            overflow = len(self._buffer) - self.max_buffer
+            del self._buffer[:overflow]
+            self.dropped += overflow
+            logger.error("event log buffer overflow, dropped %d events", overflow)
+        if len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+
+    def append_snapshot(self, game: GameState):
+        """追加一份快照（立即序列化，之后对局对象的修改不影响快照内容）"""
+        self._snapshots.append(self.to_snapshot_row(game))
+        if len(self._snapshots) > self.max_buffer:
+            overflow = len(self._snapshots) - self.max_buffer
+            del self._snapshots[:overflow]
+            logger.error("event log snapshot buffer overflow, dropped %d snapshots", overflow)
+
+    def on_game_updated(self, game: GameState, record: Optional[GameActionRecord]):
+        """对局更新监听器：记录每个已应用的动作，创建对局时与每隔 snapshot_interval 个事件记录一次快照"""
+        if record is None:
+            # 创建对局：初始状态作为回放的起点（seq 0）
+            self.append_snapshot(game)
+            return
+        self.append(record)
+        if self.snapshot_interval > 0 and record.seq % self.snapshot_interval == 0:
+            self._snapshot_due.add(game.game_id)
+        # 批量提交时每个事件收到的都是最终状态，只在最后一个事件处记录快照（快照序号即最终序号）
+        if record.seq == game.seq and game.game_id in self._snapshot_due:
+            self._snapshot_due.discard(game.game_id)
+            self.append_snapshot(game)
+
+    def pending_events(self, game_id: str, after: int) -> List[Dict[str, Any]]:
+        """尚未落库的某局事件（seq > after），供增量拉取接口补齐数据库中还没有的部分"""
+        return [row for row in self._buffer if row["game_id"] == game_id and row["seq"] > after]
+
+    @property
+    def pending(self) -> int:
+        """尚未落库的事件数"""
+        return len(self._buffer)
+
+    @property
+    def pending_snapshots(self) -> int:
+        """尚未落库的快照数"""
+        return len(self._snapshots)
+
+    async def flush(self):
+        """将缓冲区中的事件分批写入数据库，写入失败的事件放回缓冲区等待下次重试"""
+        async with self._flush_lock:
+            while self._buffer or self._snapshots:
+                rows = self._buffer[:self.batch_size]
+                del self._buffer[:len(rows)]
+                snapshots = self._snapshots[:self.batch_size]
+                del self._snapshots[:len(snapshots)]
+                try:
+                    await self._writer(rows, snapshots)
+                    self._failures = 0
+                    continue
+                except Exception as exc:
+                    if not _is_transient(exc):
+                        self._failures += 1
+                    if _is_transient(exc) or self._failures < self.max_retries:
+                        logger.exception("event log flush failed, %d events and %d snapshots requeued",
+                                         len(rows), len(snapshots))
+                        self._buffer[:0] = rows
+                        self._snapshots[:0] = snapshots
+                        return
+                logger.error("event log batch failed %d times, writing rows one by one", self._failures)
+                self._failures = 0
+                if not await self._write_one_by_one(rows, snapshots):
+                    return
+
+    async def _write_one_by_one(self, rows: List[Dict[str, Any]], snapshots: List[Dict[str, Any]]) -> bool:
+        """
+        逐条写入反复失败的批次，找出无法写入的行
+        :return: 是否处理完整个批次（遇到连接类错误时剩余的行放回缓冲区，返回 False）
+        """
+        items = [([row], []) for row in rows] + [([], [snapshot]) for snapshot in snapshots]
+        for i, (item_rows, item_snapshots) in enumerate(items):
+            try:
+                await self._writer(item_rows, item_snapshots)
+            except Exception as exc:
+                if _is_transient(exc):
+                    rest = items[i:]
+                    self._buffer[:0] = [row for item_rows, _ in rest for row in item_rows]
+                    self._snapshots[:0] = [snapshot for _, item_snapshots in rest for snapshot in item_snapshots]
+                    return False
+                row = (item_rows or item_snapshots)[0]
+                logger.exception("event log dead-lettered %s: game_id=%s seq=%s row=%r",
+                                 "event" if item_rows else "snapshot", row["game_id"], row["seq"],
+                                 row if item_rows else {k: v for k, v in row.items() if k != "state"})
+                self.dead_lettered += 1
+                metrics.counter("event_log.dead_lettered").inc()
+        return True
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="event-log-writer")
+
+    async def stop(self):
+        """停止后台任务，并把剩余事件写入数据库"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+# 全局事件日志
+event_log = EventWriteBehind()
@@ -0,0 +1,101 @@
+"""
+这个文件实现了对局的 Actor 执行模型：每个活跃对局对应一个 asyncio 任务，按顺序消费该对局的动作邮箱（mailbox）。
+- 同一对局内的动作严格串行执行，无需全局锁；
+- 不同对局的 Actor 相互独立，可以完全并行推进；
+- Actor 空闲一段时间后自动退出，下次有动作时再按需创建。
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Tuple
+from app.core.config import settings
+
+# 邮箱中的一条消息：(待执行的协程函数, 用于回传结果的 Future)
+MailboxItem = Tuple[Callable[[], Awaitable[Any]], asyncio.Future]
+
+
+class GameActor:
+    """
+    单个对局的 Actor
+    """
+
+    def __init__(self, game_id: str, registry: "GameActorRegistry"):
+        self.game_id = game_id
+        self._registry = registry
+        self._mailbox: "asyncio.Queue[MailboxItem]" = asyncio.Queue()
+        self._task: asyncio.Task = None
+
+    def submit(self, handler: Callable[[], Awaitable[Any]]) -> asyncio.Future:
+        """投递一条消息，返回在 Actor 执行完成后被设置结果的 Future"""
+        loop = asyncio.get_running_loop()
+        if self._task is not None and self._task.get_loop() is not loop:
+            # 事件循环已更换（如测试中多次 asyncio.run），旧任务与邮箱均已失效
+            self._mailbox = asyncio.Queue()
+            self._task = None
+        future = loop.create_future()
+        self._mailbox.put_nowait((handler, future))
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name=f"game-actor:{self.game_id}")
+        return future
+
+    @property
+    def pending(self) -> int:
+        """邮箱中尚未处理的消息数"""
+        return self._mailbox.qsize()
+
+    async def _run(self):
+        """按顺序消费邮箱，空闲超时后退出"""
+        while True:
+            try:
+                handler, future = await asyncio.wait_for(
+                    self._mailbox.get(), timeout=self._registry.idle_timeout
+                )
+            except asyncio.TimeoutError:
+                # 等待期间没有新消息，注销自己（注销与投递都在事件循环线程上执行，不会丢消息）
+                if self._mailbox.empty():
+                    self._registry._remove(self)
+                    return
+                continue
+
+            # 调用方已放弃等待（如请求被取消）时依然执行，保证动作顺序与客户端提交一致
+            try:
+                result = await handler()
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(result)
+
+
+class GameActorRegistry:
+    """
+    对局 Actor 注册表
+    key: game_id, value: GameActor
+    """
+
+    def __init__(self, idle_timeout: float = None):
+        self.idle_timeout = idle_timeout if idle_timeout is not None else settings.GAME_ACTOR_IDLE_SECONDS
+        self._actors: Dict[str, GameActor] = {}
+
+    async def submit(self, game_id: str, handler: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        将 handler 投递到对应对局的邮箱，并等待其执行结果
+        :param game_id: 对局 ID
+        :param handler: 无参协程函数，在 Actor 任务中串行执行
+        :return: handler 的返回值（异常会原样抛出）
+        """
+        actor = self._actors.get(game_id)
+        if actor is None:
+            actor = GameActor(game_id, self)
+            self._actors[game_id] = actor
+        return await actor.submit(handler)
+
+    def _remove(self, actor: GameActor):
+        if self._actors.get(actor.game_id) is actor:
+            del self._actors[actor.game_id]
+
+    def __len__(self) -> int:
+        return len(self._actors)
+
+
+# 全局 Actor 注册表
+game_actors = GameActorRegistry()
@@ -0,0 +1,265 @@
+"""
+这个文件实现了内存对局存储的热重启（warm restart）：把进程内的对局写入本地快照文件，启动时在接收请求前恢复。
+- 定期检查点：后台任务每隔 GAME_CHECKPOINT_SECONDS 写一次快照，进程崩溃时最多丢失一个间隔内的更新；
+- 关闭时：停止后台任务与 AI 引擎后写最后一次快照；
+- 启动时：以 mmap 读取快照文件，内存中的对局解码后放回存储，冷存储（BytesColdTier）中的对局原样放回，不解码；
+  进行中对局的阶段开始时间顺延停机时长（恢复时间 - 快照时间），停机期间不计入玩家的行动时间，恢复后不会立即超时。
+编码在事件循环中完成（只重新编码版本号变化过的对局），文件写入在线程池中进行，写临时文件后原子替换。
+
+文件格式（小端）：
+    4s 魔数 AVGS | u8 格式版本 | u32 条目数 | f64 快照时间（V2 起；V1 以文件修改时间代替）
+    每个条目: u8 类型(0=内存, 1=冷存储) | u16 game_id 长度 | u32 数据长度 | game_id | 编码后的对局（game_codec）
+
+用法（恢复耗时的基准）：python -m app.services.game_checkpoint --games 50000
+"""
+import asyncio
+import gc
+import logging
+import mmap
+import os
+import struct
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+from app.core.config import settings
+from app.core.game_codec import decode_game, encode_game
+from app.core.metrics import metrics
+from app.models.game_enums import GamePhase
+from app.schemas.game import GameState
+from app.services.game_store import BytesColdTier, GameStore, MemoryGameStore, game_store
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"AVGS"
+FORMAT_V1 = 1
+FORMAT_V2 = 2
+_HEADER = struct.Struct("<4sBI")
+_SAVED_AT = struct.Struct("<d")
+_ENTRY = struct.Struct("<BHI")
+
+KIND_HOT = 0
+KIND_COLD = 1
+
+# 快照条目：(类型, game_id, 编码后的对局)
+CheckpointEntry = Tuple[int, str, bytes]
+
+
+def write_checkpoint(path: str, entries: List[CheckpointEntry], saved_at: float):
+    """写快照文件（先写临时文件再原子替换，写到一半崩溃不会破坏上一份快照）"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_V2, len(entries)))
+        f.write(_SAVED_AT.pack(saved_at))
+        for kind, game_id, data in entries:
+            raw_id = game_id.encode("utf-8")
+            f.write(_ENTRY.pack(kind, len(raw_id), len(data)))
+            f.write(raw_id)
+            f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def checkpoint_saved_at(path: str) -> float:
+    """快照写入的时间"""
+    with open(path, "rb") as f:
+        header = f.read(_HEADER.size + _SAVED_AT.size)
+    magic, version, _ = _HEADER.unpack_from(header, 0)
+    if magic == MAGIC and version == FORMAT_V2:
+        return _SAVED_AT.unpack_from(header, _HEADER.size)[0]
+    return os.path.getmtime(path)
+
+
+def read_checkpoint(path: str) -> Iterator[CheckpointEntry]:
+    """以 mmap 逐条读取快照文件"""
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            magic, version, count = _HEADER.unpack_from(mm, 0)
+            if magic != MAGIC or version not in (FORMAT_V1, FORMAT_V2):
+                raise ValueError(f"unsupported checkpoint file: {path}")
+            pos = _HEADER.size + (_SAVED_AT.size if version == FORMAT_V2 else 0)
+            for _ in range(count):
+                kind, id_size, data_size = _ENTRY.unpack_from(mm, pos)
+                pos += _ENTRY.size
+                game_id = mm[pos:pos + id_size].decode("utf-8")
+                pos += id_size
+                data = mm[pos:pos + data_size]
+                if len(data) != data_size:
+                    raise ValueError(f"truncated checkpoint file: {path}")
+                pos += data_size
+                yield kind, game_id, data
+
+
+class GameCheckpointer:
+    """
+    对局检查点（只对 MemoryGameStore 生效，Redis 存储本身就在进程之外）
+    """
+
+    def __init__(self, store: GameStore = None, path: str = None, interval_seconds: float = None):
+        self.store = store if store is not None else game_store
+        self.path = path if path is not None else settings.GAME_CHECKPOINT_PATH
+        self.interval_seconds = interval_seconds if interval_seconds is not None else settings.GAME_CHECKPOINT_SECONDS
+        # 编码缓存：game_id -> (版本号, 编码后的对局)，未变化的对局不重复编码
+        self._encoded: Dict[str, Tuple[int, bytes]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return isinstance(self.store, MemoryGameStore)
+
+    def collect(self) -> List[CheckpointEntry]:
+        """收集当前所有对局的编码（在事件循环中调用，与动作处理互斥）"""
+        store: MemoryGameStore = self.store
+        entries: List[CheckpointEntry] = []
+        encoded: Dict[str, Tuple[int, bytes]] = {}
+        for game in store.games():
+            cached = self._encoded.get(game.game_id)
+            if cached is None or cached[0] != game.version:
+                cached = (game.version, encode_game(game))
+            encoded[game.game_id] = cached
+            entries.append((KIND_HOT, game.game_id, cached[1]))
+        self._encoded = encoded
+        cold = store.cold
+        if isinstance(cold, BytesColdTier):
+            # 文件冷存储本身已经持久化，只有进程内的冷存储需要写入快照
+            entries.extend((KIND_COLD, game_id, data) for game_id, data in cold.items())
+        return entries
+
+    async def checkpoint(self) -> int:
+        """写一次快照，返回写入的对局数"""
+        if not self.enabled:
+            return 0
+        start = time.perf_counter()
+        entries = self.collect()
+        await asyncio.to_thread(write_checkpoint, self.path, entries, time.time())
+        metrics.summary("game_checkpoint.write_ms").observe((time.perf_counter() - start) * 1000)
+        metrics.gauge("game_checkpoint.games").set(len(entries))
+        return len(entries)
+
+    def restore(self, now: float = None) -> List[GameState]:
+        """
+        启动时从快照文件恢复（在接收请求之前调用）
+        :param now: 恢复时间（默认当前时间），用于计算停机时长
+        :return: 恢复到内存中的对局（调用方据此重新登记超时与 AI 决策）
+        """
+        if not self.enabled or not os.path.exists(self.path):
+            return []
+        store: MemoryGameStore = self.store
+        start = time.perf_counter()
+        now = now if now is not None else time.time()
+        downtime = 0.0
+        restored: List[GameState] = []
+        cold_count = 0
+        # 批量创建大量长期存活的对象时，分代 GC 会反复扫描已恢复的对局（约占一半耗时），恢复期间暂停
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            downtime = max(0.0, now - checkpoint_saved_at(self.path))
+            for kind, game_id, data in read_checkpoint(self.path):
+                if kind == KIND_COLD and store.cold is not None:
+                    store.cold.put(game_id, data)
+                    cold_count += 1
+                    continue
+                game = decode_game(data)
+                if downtime and game.phase != GamePhase.FINISHED and game.phase_start_time > 0:
+                    # 停机期间不计时（版本号不变，编码缓存中没有这局，下次检查点会重新编码）
+                    game.phase_start_time += downtime
+                else:
+                    self._encoded[game.game_id] = (game.version, data)
+                store.restore(game)
+                restored.append(game)
+        except Exception:
+            # 快照损坏不影响启动，已读出的部分保留
+            logger.exception("failed to read game checkpoint: %s", self.path)
+        finally:
+            if gc_enabled:
+                gc.enable()
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        metrics.summary("game_checkpoint.restore_ms").observe(elapsed_ms)
+        logger.info("restored %d live and %d cold games from %s in %.0f ms (downtime %.0f s)",
+                    len(restored), cold_count, self.path, elapsed_ms, downtime)
+        return restored
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                await self.checkpoint()
+            except Exception:
+                logger.exception("game checkpoint failed")
+
+    def start(self):
+        if not self.enabled or self.interval_seconds <= 0:
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="game-checkpoint")
+
+    async def stop(self):
+        """停止定期检查点并写最后一次快照"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.enabled:
+            count = await self.checkpoint()
+            logger.info("checkpointed %d games to %s", count, self.path)
+
+
+# 全局检查点
+game_checkpointer = GameCheckpointer()
+
+
+def _benchmark(games: int, path: str):
+    """生成 games 局进行到中盘的对局，测量写快照与恢复的耗时"""
+    import random
+    import uuid
+    from app.core.ai_policy import RandomPolicy
+    from app.core.game_reducer import apply_action, new_game
+    from app.core.game_rules import TimeoutPolicy
+    from app.models.game_enums import GamePhase
+
+    rng = random.Random(0)
+    policy = RandomPolicy()
+    store = MemoryGameStore()
+    for _ in range(games):
+        game = new_game(str(uuid.UUID(int=rng.getrandbits(128))), list(range(1, 9)), {}, now=1.7e9, rng=rng)
+        target = rng.randint(0, 100)
+        while game.seq < target and game.phase != GamePhase.FINISHED:
+            for player in TimeoutPolicy.get_pending_players(game):
+                action_type, payload = policy.decide(game, player, rng)
+                apply_action(game, player.user_id, action_type, payload, 1.7e9)
+                game.seq += 1
+        store.restore(game)
+
+    checkpointer = GameCheckpointer(store, path=path)
+    start = time.perf_counter()
+    asyncio.run(checkpointer.checkpoint())
+    write_s = time.perf_counter() - start
+    size = os.path.getsize(path)
+
+    restored_store = MemoryGameStore()
+    start = time.perf_counter()
+    restored = GameCheckpointer(restored_store, path=path).restore()
+    restore_s = time.perf_counter() - start
+    assert len(restored) == games
+
+    print(f"games   : {games}")
+    print(f"file    : {size / 1e6:.1f} MB ({size / games:.0f} bytes/game)")
+    print(f"write   : {write_s:.2f} s")
+    print(f"restore : {restore_s:.2f} s")
+
+
+if __name__ == "__main__":
+    import argparse
+    import tempfile
+
+    parser = argparse.ArgumentParser(description="对局快照写入/恢复耗时基准")
+    parser.add_argument("--games", type=int, default=50000)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        _benchmark(args.games, os.path.join(tmp, "games.snapshot"))
@@ -0,0 +1,84 @@
+"""
+这个文件实现了内存对局存储的驱逐任务：定期把已结束（超过宽限期）或长时间空闲的对局移入冷存储，
+使 worker 的内存只随进行中的对局数增长，而不是随历史上所有对局增长；被移出的对局再次访问时由存储透明加载。
+冷存储按自身的保留策略（见 BytesColdTier）丢弃过期的对局，也在每次检查时执行。
+每次检查同时刷新内存占用指标（/metrics 的 gauges）：
+- game_store.hot_games / game_store.cold_games：内存中与冷存储中的对局数；
+- game_store.hot_bytes / game_store.cold_bytes：内存占用估算与冷存储字节数；
+- game_store.hot_bytes_per_game / game_store.hot_bytes_max：单局内存占用的平均值与最大值。
+"""
+import asyncio
+import logging
+import time
+from typing import Optional
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.game_store import GameStore, MemoryGameStore, game_store
+
+logger = logging.getLogger(__name__)
+
+
+class GameEvictor:
+    """
+    对局驱逐任务（只对 MemoryGameStore 生效，Redis 存储由 TTL 过期）
+    """
+
+    def __init__(self, store: GameStore = None, tick_seconds: float = None, finished_grace_seconds: float = None,
+                 idle_seconds: float = None, batch: int = None):
+        self.store = store if store is not None else game_store
+        self.tick_seconds = tick_seconds if tick_seconds is not None else settings.GAME_EVICT_TICK_SECONDS
+        self.finished_grace_seconds = (finished_grace_seconds if finished_grace_seconds is not None
+                                       else settings.GAME_FINISHED_GRACE_SECONDS)
+        self.idle_seconds = idle_seconds if idle_seconds is not None else settings.GAME_IDLE_EVICT_SECONDS
+        self.batch = batch if batch is not None else settings.GAME_EVICT_BATCH
+        self._task: Optional[asyncio.Task] = None
+
+    def sweep(self, now: float = None) -> int:
+        """执行一次驱逐并刷新指标，返回移出的对局数"""
+        store = self.store
+        if not isinstance(store, MemoryGameStore):
+            return 0
+        now = now if now is not None else time.time()
+        evicted = store.evict(now, self.finished_grace_seconds, self.idle_seconds, self.batch)
+        if evicted:
+            metrics.counter("game_store.evicted").inc(evicted)
+        if store.cold is not None:
+            store.cold.trim(now)
+        store.account()
+
+        hot_games = len(store)
+        metrics.gauge("game_store.hot_games").set(hot_games)
+        metrics.gauge("game_store.hot_bytes").set(store.hot_bytes)
+        metrics.gauge("game_store.hot_bytes_per_game").set(store.hot_bytes / hot_games if hot_games else 0)
+        metrics.gauge("game_store.hot_bytes_max").set(store.max_game_bytes)
+        cold = store.cold
+        metrics.gauge("game_store.cold_games").set(len(cold) if cold is not None else 0)
+        metrics.gauge("game_store.cold_bytes").set(cold.total_bytes if cold is not None else 0)
+        return evicted
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.tick_seconds)
+            try:
+                self.sweep()
+            except Exception:
+                logger.exception("game evictor tick failed")
+
+    def start(self):
+        if not isinstance(self.store, MemoryGameStore):
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="game-evictor")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# 全局驱逐任务
+game_evictor = GameEvictor()
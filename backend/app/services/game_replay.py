@@ -0,0 +1,154 @@
+"""
+这个文件实现了基于事件溯源的对局回放：从不晚于目标序号的最近快照（game_snapshots）出发，
+用纯函数 Reducer（game_reducer.py）应用其后的少量事件（game_events），重建任意历史时刻或最新的对局状态。
+回放结果按 (game_id, seq) 缓存，同一时刻大量观战者/重连请求同一状态时只加载、回放一次。
+"""
+import asyncio
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.core.game_reducer import replay
+from sqlalchemy import select
+from app.db.session import AsyncSessionLocal
+from app.models.game_event import GameEvent
+from app.models.game_snapshot import GameSnapshot
+from app.schemas.game import GameState, GameActionRecord
+from app.services.event_log import event_log
+from app.services.game_store import RedisGameStore
+
+# 回放结果缓存的最大条数
+REPLAY_CACHE_SIZE = 1000
+
+
+def row_to_record(row: Dict[str, Any]) -> GameActionRecord:
+    """game_events 行 -> 动作记录"""
+    return GameActionRecord(
+        game_id=row["game_id"],
+        seq=row["seq"],
+        user_id=row["user_id"],
+        action_type=row["action_type"],
+        payload=row["payload"] or {},
+        ts=row["ts"]
+    )
+
+
+def restore(snapshot_state: bytes, snapshot_version: int, records: List[GameActionRecord]) -> GameState:
+    """
+    从快照与其后的事件重建对局状态
+    重建后的版本号按「每个事件一次写入」推算（批量提交的动作只写入一次，因此推算值可能偏大，但仍单调递增）
+    """
+    base = RedisGameStore.deserialize(snapshot_state)
+    state = replay(base, records)
+    state.version = snapshot_version + (state.seq - base.seq)
+    return state
+
+
+def _event_columns(event: GameEvent) -> Dict[str, Any]:
+    return {
+        "game_id": event.game_id,
+        "seq": event.seq,
+        "user_id": event.user_id,
+        "action_type": event.action_type,
+        "payload": event.payload,
+        "ts": event.ts,
+    }
+
+
+async def _load_events(game_id: str, after: int, until: Optional[int], limit: Optional[int]) -> List[Dict[str, Any]]:
+    """按 seq 顺序读取 (after, until] 区间内的事件"""
+    query = select(GameEvent).where(GameEvent.game_id == game_id, GameEvent.seq > after)
+    if until is not None:
+        query = query.where(GameEvent.seq <= until)
+    query = query.order_by(GameEvent.seq)
+    if limit is not None:
+        query = query.limit(limit)
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(query)
+        return [_event_columns(event) for event in result.scalars()]
+
+
+async def _load_snapshot(game_id: str, seq: Optional[int]) -> Optional[Tuple[int, int, bytes]]:
+    """读取不晚于 seq 的最近快照：(seq, version, state)"""
+    query = select(GameSnapshot.seq, GameSnapshot.version, GameSnapshot.state).where(GameSnapshot.game_id == game_id)
+    if seq is not None:
+        query = query.where(GameSnapshot.seq <= seq)
+    query = query.order_by(GameSnapshot.seq.desc()).limit(1)
+    async with AsyncSessionLocal() as db:
+        row = (await db.execute(query)).first()
+        return tuple(row) if row else None
+
+
+class GameReplay:
+    """
+    对局回放服务
+    """
+
+    def __init__(self, max_entries: int = REPLAY_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[Tuple[str, int], GameState]" = OrderedDict()
+        # 正在加载的回放任务，同一时刻的并发请求共享同一次加载
+        self._inflight: Dict[Tuple[str, Optional[int]], "asyncio.Future[Optional[GameState]]"] = {}
+
+    async def get_events(self, game_id: str, after: int = 0, limit: int = None) -> List[GameActionRecord]:
+        """
+        获取 seq > after 的事件（按 seq 升序）
+        数据库中的事件之后补上写后缓冲区中尚未落库的部分
+        """
+        limit = limit if limit is not None else settings.EVENTS_PAGE_SIZE
+        rows = await _load_events(game_id, after, None, limit)
+        last_seq = rows[-1]["seq"] if rows else after
+        if len(rows) < limit:
+            rows.extend(event_log.pending_events(game_id, last_seq))
+        return [row_to_record(row) for row in rows[:limit]]
+
+    async def _load(self, game_id: str, seq: Optional[int]) -> Optional[GameState]:
+        snapshot = await _load_snapshot(game_id, seq)
+        if snapshot is None:
+            return None
+        snapshot_seq, snapshot_version, snapshot_state = snapshot
+        rows = await _load_events(game_id, snapshot_seq, seq, None)
+        last_seq = rows[-1]["seq"] if rows else snapshot_seq
+        rows.extend(row for row in event_log.pending_events(game_id, last_seq)
+                    if seq is None or row["seq"] <= seq)
+        return restore(snapshot_state, snapshot_version, [row_to_record(row) for row in rows])
+
+    async def state_at(self, game_id: str, seq: Optional[int] = None) -> Optional[GameState]:
+        """
+        重建对局在 seq 时刻（应用完第 seq 个动作后）的状态；seq 为空时重建最新状态
+        :return: 对局不存在（没有任何快照）时返回 None；seq 超出已有事件时返回最新状态
+        返回的状态可能被多个请求共享，调用方不应修改
+        """
+        if seq is not None:
+            cached = self._cache.get((game_id, seq))
+            if cached is not None:
+                self._cache.move_to_end((game_id, seq))
+                return cached
+
+        key = (game_id, seq)
+        future = self._inflight.get(key)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            state = await self._load(game_id, seq)
+            future.set_result(state)
+        except Exception as e:
+            future.set_exception(e)
+            # 没有其他等待者时避免 "Future exception was never retrieved"
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+        # 只缓存确定的历史状态（最新状态会随对局推进而变化）
+        if state is not None and seq is not None and state.seq == seq:
+            self._cache[key] = state
+            if len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return state
+
+
+# 全局回放服务
+game_replay = GameReplay()
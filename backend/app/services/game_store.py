@@ -0,0 +1,427 @@
+"""
+这个文件实现了对局状态的存储层（Game Store），将对局状态的读写从业务逻辑中抽离出来。
+- MemoryGameStore：进程内字典存储，适合单 worker 开发环境；已结束或空闲的对局可移入冷存储（ColdTier），访问时透明加载。
+- RedisGameStore：Redis 存储，二进制编码（见 app/core/game_codec.py）+ 基于版本号的 compare-and-set 写入，支持多 worker / 多节点共享对局。
+"""
+import hashlib
+import os
+import re
+import sys
+import time
+from collections import OrderedDict
+from enum import Enum
+from typing import Dict, Iterator, Optional, Set, Tuple
+from pydantic import BaseModel
+from app.core.config import settings
+from app.core.game_codec import decode_game, encode_game
+from app.core.metrics import metrics
+from app.models.game_enums import GamePhase
+from app.schemas.game import GameState
+
+
+class GameStore:
+    """
+    对局存储接口
+    所有实现都需要保证 save 的 compare-and-set 语义：
+    只有当存储中的版本号等于 expected_version 时才写入，写入成功后 game.version = expected_version + 1。
+    """
+
+    async def get(self, game_id: str) -> Optional[GameState]:
+        """读取对局状态，不存在时返回 None"""
+        raise NotImplementedError
+
+    async def save(self, game: GameState, expected_version: int) -> bool:
+        """
+        按版本号条件写入对局状态
+        :param game: 待写入的对局状态
+        :param expected_version: 期望的当前存储版本（新建对局时为 0）
+        :return: 写入成功返回 True，版本冲突返回 False
+        """
+        raise NotImplementedError
+
+    async def delete(self, game_id: str) -> None:
+        """删除对局状态"""
+        raise NotImplementedError
+
+
+class ColdTier:
+    """
+    冷存储：保存被移出内存的对局（编码后的字节，见 app/core/game_codec.py）
+    读写都是同步的小数据量操作，调用方控制单次驱逐的数量
+    """
+
+    def put(self, game_id: str, data: bytes):
+        raise NotImplementedError
+
+    def get(self, game_id: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def delete(self, game_id: str):
+        raise NotImplementedError
+
+    def trim(self, now: float) -> int:
+        """按保留策略丢弃过期的对局，返回丢弃的数量（由驱逐任务定期调用）"""
+        return 0
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    @property
+    def total_bytes(self) -> int:
+        """冷存储中对局数据的总字节数"""
+        raise NotImplementedError
+
+
+class BytesColdTier(ColdTier):
+    """
+    进程内冷存储：只保留编码后的字节（约为对象形式的几十分之一）
+    仍占用进程内存，因此有保留上限：放入超过 ttl_seconds 的对局在 trim 时丢弃（与 Redis 存储的过期时间一致），
+    总字节数超过 max_bytes 时立即丢弃最早放入的对局。需要长期保留时使用 FileColdTier。
+    """
+
+    def __init__(self, ttl_seconds: float = None, max_bytes: int = None):
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.GAME_STORE_TTL_SECONDS
+        self.max_bytes = max_bytes if max_bytes is not None else settings.GAME_COLD_MAX_BYTES
+        # 按放入顺序排列（重新放入的对局移到末尾），最早放入的在最前
+        self._data: Dict[str, bytes] = {}
+        self._put_at: Dict[str, float] = {}
+        self._total_bytes = 0
+
+    def put(self, game_id: str, data: bytes, now: float = None):
+        self.delete(game_id)
+        self._data[game_id] = data
+        self._put_at[game_id] = now if now is not None else time.time()
+        self._total_bytes += len(data)
+        dropped = 0
+        while self._total_bytes > self.max_bytes and len(self._data) > 1:
+            self.delete(next(iter(self._data)))
+            dropped += 1
+        if dropped:
+            metrics.counter("game_store.cold_dropped").inc(dropped)
+
+    def get(self, game_id: str) -> Optional[bytes]:
+        return self._data.get(game_id)
+
+    def delete(self, game_id: str):
+        data = self._data.pop(game_id, None)
+        if data is not None:
+            del self._put_at[game_id]
+            self._total_bytes -= len(data)
+
+    def trim(self, now: float) -> int:
+        expired = []
+        for game_id, put_at in self._put_at.items():
+            if now - put_at < self.ttl_seconds:
+                break
+            expired.append(game_id)
+        for game_id in expired:
+            self.delete(game_id)
+        if expired:
+            metrics.counter("game_store.cold_dropped").inc(len(expired))
+        return len(expired)
+
+    def items(self) -> Iterator[Tuple[str, bytes]]:
+        return iter(self._data.items())
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+
+class FileColdTier(ColdTier):
+    """本地文件冷存储：每局一个文件，进程内存不随历史对局数增长"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        # key: game_id, value: 文件大小
+        self._sizes: Dict[str, int] = {}
+        self._total_bytes = 0
+
+    def _path(self, game_id: str) -> str:
+        # game_id 来自请求路径，不能直接作为文件名（路径穿越）
+        name = game_id if _SAFE_FILE_NAME.fullmatch(game_id) else "h-" + hashlib.sha256(game_id.encode()).hexdigest()
+        return os.path.join(self.directory, name + ".bin")
+
+    def put(self, game_id: str, data: bytes):
+        path = self._path(game_id)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        self._total_bytes += len(data) - self._sizes.get(game_id, 0)
+        self._sizes[game_id] = len(data)
+
+    def get(self, game_id: str) -> Optional[bytes]:
+        try:
+            with open(self._path(game_id), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def delete(self, game_id: str):
+        try:
+            os.remove(self._path(game_id))
+        except FileNotFoundError:
+            pass
+        self._total_bytes -= self._sizes.pop(game_id, 0)
+
+    def __len__(self) -> int:
+        return len(self._sizes)
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+
+_SAFE_FILE_NAME = re.compile(r"[0-9A-Za-z_-]{1,128}")
+
+
+def estimate_game_bytes(game: GameState) -> int:
+    """对局状态在进程内存中的占用估算（对象、字段字典、列表与私有索引的 sys.getsizeof 之和，共享对象只计一次）"""
+    seen = set()
+    stack = [game]
+    total = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, Enum) or obj is None or isinstance(obj, bool):
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        if isinstance(obj, BaseModel):
+            stack.append(obj.__dict__)
+            if obj.__pydantic_private__:
+                stack.append(obj.__pydantic_private__)
+        elif isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set)):
+            stack.extend(obj)
+    return total
+
+
+class MemoryGameStore(GameStore):
+    """
+    进程内存储
+    get 返回的是存储中的同一个对象，单进程下所有读写都作用于同一份状态。
+    配置冷存储后，已结束（超过宽限期）或长时间空闲的对局通过 evict 编码后移入冷存储，
+    再次访问时透明地加载回内存；内存中只保留进行中的对局。
+    """
+
+    def __init__(self, cold: ColdTier = None):
+        # key: game_id, value: GameState
+        self._games: Dict[str, GameState] = {}
+        self._cold = cold
+        # 最近访问时间，按访问顺序排列（最久未访问的在前）
+        self._touched: "OrderedDict[str, float]" = OrderedDict()
+        # 内存占用估算：game_id -> 字节数；写入过的对局在下次 account 时重新估算
+        self._sizes: Dict[str, int] = {}
+        self._dirty: Set[str] = set()
+        self.hot_bytes = 0
+
+    def _touch(self, game_id: str):
+        self._touched[game_id] = time.time()
+        self._touched.move_to_end(game_id)
+
+    def _load_cold(self, game_id: str) -> Optional[GameState]:
+        """从冷存储加载回内存"""
+        if self._cold is None:
+            return None
+        data = self._cold.get(game_id)
+        if data is None:
+            return None
+        game = decode_game(data)
+        self._games[game_id] = game
+        self._cold.delete(game_id)
+        self._dirty.add(game_id)
+        metrics.counter("game_store.cold_loaded").inc()
+        return game
+
+    async def get(self, game_id: str) -> Optional[GameState]:
+        game = self._games.get(game_id)
+        if game is None:
+            game = self._load_cold(game_id)
+            if game is None:
+                return None
+        self._touch(game_id)
+        return game
+
+    async def save(self, game: GameState, expected_version: int) -> bool:
+        current = self._games.get(game.game_id)
+        if current is None:
+            # 对局可能在读取之后被移入冷存储，版本号以冷存储中的为准
+            current = self._load_cold(game.game_id)
+        current_version = current.version if current is not None else 0
+        # 内存存储中 get 返回的是同一对象，因此 game 与 current 可能是同一个实例
+        if current is not game and current_version != expected_version:
+            return False
+        game.version = expected_version + 1
+        self._games[game.game_id] = game
+        self._touch(game.game_id)
+        self._dirty.add(game.game_id)
+        return True
+
+    async def delete(self, game_id: str) -> None:
+        self._games.pop(game_id, None)
+        self._touched.pop(game_id, None)
+        self._forget_size(game_id)
+        if self._cold is not None:
+            self._cold.delete(game_id)
+
+    def games(self) -> Iterator[GameState]:
+        """内存中的所有对局"""
+        return iter(self._games.values())
+
+    def restore(self, game: GameState):
+        """放回一局对局（热重启时从快照恢复，不做版本校验）"""
+        self._games[game.game_id] = game
+        self._touch(game.game_id)
+        self._dirty.add(game.game_id)
+
+    def evict(self, now: float, finished_grace_seconds: float, idle_seconds: float, limit: int) -> int:
+        """
+        把已结束且超过宽限期、或空闲超过 idle_seconds 的对局移入冷存储
+        只扫描最久未访问的一段（按访问顺序，遇到宽限期内访问过的对局即停止）
+        :return: 本次移出的对局数（最多 limit 个）
+        """
+        if self._cold is None:
+            return 0
+        horizon = now - min(finished_grace_seconds, idle_seconds)
+        evicted = []
+        for game_id, touched in self._touched.items():
+            if touched > horizon or len(evicted) >= limit:
+                break
+            idle = now - touched
+            if idle >= idle_seconds or (self._games[game_id].phase == GamePhase.FINISHED and idle >= finished_grace_seconds):
+                evicted.append(game_id)
+        for game_id in evicted:
+            game = self._games.pop(game_id)
+            del self._touched[game_id]
+            self._forget_size(game_id)
+            self._cold.put(game_id, encode_game(game))
+        return len(evicted)
+
+    def _forget_size(self, game_id: str):
+        self.hot_bytes -= self._sizes.pop(game_id, 0)
+        self._dirty.discard(game_id)
+
+    def account(self):
+        """重新估算上次统计之后写入过的对局的内存占用（只计算变化的对局）"""
+        for game_id in self._dirty:
+            game = self._games.get(game_id)
+            if game is None:
+                continue
+            size = estimate_game_bytes(game)
+            self.hot_bytes += size - self._sizes.get(game_id, 0)
+            self._sizes[game_id] = size
+        self._dirty.clear()
+
+    def memory_usage(self, game_id: str) -> Optional[int]:
+        """单局的内存占用估算（不在内存中时返回 None）"""
+        game = self._games.get(game_id)
+        return estimate_game_bytes(game) if game is not None else None
+
+    @property
+    def max_game_bytes(self) -> int:
+        return max(self._sizes.values(), default=0)
+
+    @property
+    def cold(self) -> Optional[ColdTier]:
+        return self._cold
+
+    def __len__(self) -> int:
+        return len(self._games)
+
+
+# Compare-and-set 写入脚本：版本号一致时写入新数据并续期
+# KEYS[1] = 对局 key
+# ARGV[1] = 期望版本号, ARGV[2] = 新版本号, ARGV[3] = 序列化数据, ARGV[4] = 过期秒数
+_CAS_SAVE_SCRIPT = """
+local current = redis.call('HGET', KEYS[1], 'v')
+if not current then current = '0' end
+if current ~= ARGV[1] then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'v', ARGV[2], 'd', ARGV[3])
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[4]))
+return 1
+"""
+
+
+class RedisGameStore(GameStore):
+    """
+    Redis 存储
+    每局对局存为一个 Hash：v = 版本号，d = 二进制编码后的状态（兼容旧的 JSON 数据）。
+    写入通过 Lua 脚本完成版本校验与写入，保证多 worker 并发写同一局时不会互相覆盖。
+    """
+
+    def __init__(self, client=None, key_prefix: str = None, ttl_seconds: int = None):
+        if client is None:
+            from app.core.redis import redis_binary_client
+            client = redis_binary_client
+        self._redis = client
+        self._key_prefix = key_prefix if key_prefix is not None else settings.GAME_STORE_KEY_PREFIX
+        self._ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.GAME_STORE_TTL_SECONDS
+        self._cas_save = self._redis.register_script(_CAS_SAVE_SCRIPT)
+
+    def _key(self, game_id: str) -> str:
+        return f"{self._key_prefix}{game_id}"
+
+    @staticmethod
+    def serialize(game: GameState) -> bytes:
+        """二进制编码（外部存储、快照与跨进程消息共用）"""
+        return encode_game(game)
+
+    @staticmethod
+    def deserialize(data: bytes) -> GameState:
+        return decode_game(data)
+
+    async def get(self, game_id: str) -> Optional[GameState]:
+        data = await self._redis.hget(self._key(game_id), "d")
+        if data is None:
+            return None
+        return self.deserialize(data)
+
+    async def save(self, game: GameState, expected_version: int) -> bool:
+        game.version = expected_version + 1
+        ok = await self._cas_save(
+            keys=[self._key(game.game_id)],
+            args=[expected_version, game.version, self.serialize(game), self._ttl_seconds]
+        )
+        if not ok:
+            # 写入失败时回滚版本号，调用方可重新读取后重试
+            game.version = expected_version
+            return False
+        return True
+
+    async def delete(self, game_id: str) -> None:
+        await self._redis.delete(self._key(game_id))
+
+
+def create_cold_tier(backend: str = None) -> Optional[ColdTier]:
+    """根据配置创建内存存储的冷存储（none 表示对局一直留在内存中）"""
+    backend = backend or settings.GAME_COLD_TIER
+    if backend == "none":
+        return None
+    if backend == "memory":
+        return BytesColdTier()
+    if backend == "file":
+        return FileColdTier(settings.GAME_COLD_DIR)
+    raise ValueError(f"未知的冷存储类型: {backend}")
+
+
+def create_game_store(backend: str = None) -> GameStore:
+    """根据配置创建存储实例"""
+    backend = backend or settings.GAME_STORE_BACKEND
+    if backend == "memory":
+        return MemoryGameStore(cold=create_cold_tier())
+    if backend == "redis":
+        return RedisGameStore()
+    raise ValueError(f"未知的对局存储类型: {backend}")
+
+
+# 全局存储实例
+game_store: GameStore = create_game_store()
@@ -0,0 +1,215 @@
+"""
+这个文件实现了对局快照的视角脱敏与视图缓存。
+一局游戏只存在少数几种不同的视角（坏人/梅林/派西维尔/普通好人/结算公开），
+因此按 (对局版本, 视角类别) 只计算一次脱敏视图，各玩家取视图后再单独补上自己的座位信息。
+序列化后的 JSON 字节同样按版本缓存，对局未变化时重复轮询只需一次字典查找。
+对局版本号变化后旧视图自动失效。
+"""
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from fastapi import HTTPException, status
+from pydantic import TypeAdapter
+from app.core.config import settings
+from app.models.game_enums import GamePhase, Character, VisibilityClass, ActionType, EVIL_CHARACTERS
+from app.schemas.game import GameState, PlayerState, GameActionRecord
+
+# 坏人可见的角色（通常是所有坏人，除了奥伯伦）
+# 在 MVP 8人局中，没有奥伯伦，所有坏人互见
+EVIL_VISIBLE_CHARACTERS = EVIL_CHARACTERS
+
+# 这些视角下观察者本人的身份本来就可见，无需单独补丁
+_SELF_VISIBLE_CLASSES = {VisibilityClass.EVIL, VisibilityClass.REVEALED}
+
+# 预编译的 GameState 序列化器
+_state_adapter = TypeAdapter(GameState)
+
+
+def get_visibility_class(game: GameState, viewer: PlayerState) -> VisibilityClass:
+    """根据对局阶段与观察者角色确定视角类别"""
+    if game.phase == GamePhase.FINISHED:
+        return VisibilityClass.REVEALED
+    if viewer.character in EVIL_CHARACTERS:
+        return VisibilityClass.EVIL
+    if viewer.character == Character.MERLIN:
+        return VisibilityClass.MERLIN
+    if viewer.character == Character.PERCIVAL:
+        return VisibilityClass.PERCIVAL
+    return VisibilityClass.GOOD
+
+
+def build_class_view(game: GameState, visibility: VisibilityClass) -> GameState:
+    """
+    构建某一视角类别的脱敏快照（不包含观察者本人座位的补丁）
+    """
+    masked_players = []
+    for p in game.players:
+        # 默认隐藏身份与视角标记
+        update = {"character": None, "is_seen_as_evil": False, "is_seen_as_merlin": False}
+
+        # 1. 游戏结束 -> 全部公开
+        if visibility == VisibilityClass.REVEALED:
+            update.pop("character")
+
+        # 2. 坏人视角：看到其他坏人
+        elif visibility == VisibilityClass.EVIL:
+            if p.character in EVIL_VISIBLE_CHARACTERS:
+                update.pop("character") # 坏人互知身份
+
+        # 3. 梅林视角：看到坏人（不知道具体身份，只显示坏人标记）
+        elif visibility == VisibilityClass.MERLIN:
+            if p.character in EVIL_CHARACTERS:
+                update["is_seen_as_evil"] = True
+
+        # 4. 派西维尔视角：看到梅林和莫甘娜（显示梅林标记）
+        elif visibility == VisibilityClass.PERCIVAL:
+            if p.character in {Character.MERLIN, Character.MORGANA}:
+                update["is_seen_as_merlin"] = True
+
+        masked_players.append(p.model_copy(update=update))
+
+    # model_copy 是浅复制：容器字段单独复制，视图（按版本缓存）不随之后对局对象的原地修改而改变
+    update = {
+        "players": masked_players,
+        "proposed_team": list(game.proposed_team),
+        "votes": dict(game.votes),
+        "mission_results": list(game.mission_results),
+        "pending_mission_results": list(game.pending_mission_results),
+        "team_history": list(game.team_history),
+        "approve_history": list(game.approve_history),
+        "mission_fail_history": list(game.mission_fail_history),
+    }
+    if visibility != VisibilityClass.REVEALED:
+        # 任务牌是匿名的：逐张暴露的结果配合事件流（谁在第几个提交）就能对应到具体玩家，进行中只公开张数
+        update["pending_mission_results"] = []
+        update["pending_mission_count"] = len(game.pending_mission_results)
+    return game.model_copy(update=update)
+
+
+def patch_self(view: GameState, viewer: PlayerState) -> GameState:
+    """在视角快照上补上观察者本人的身份（只复制观察者自己的座位）"""
+    players = list(view.players)
+    for i, p in enumerate(players):
+        if p.user_id == viewer.user_id:
+            players[i] = p.model_copy(update={"character": viewer.character})
+            break
+    return view.model_copy(update={"players": players})
+
+
+def get_public_visibility(game: GameState) -> VisibilityClass:
+    """不在对局中的观察者（如 AI 编排账号）的视角类别：只看到公开信息"""
+    return VisibilityClass.REVEALED if game.phase == GamePhase.FINISHED else VisibilityClass.GOOD
+
+
+def build_player_view(game: GameState, viewer: PlayerState) -> GameState:
+    """构建特定玩家视角的快照（不经过缓存，用于历史状态等不会重复请求的场景）"""
+    visibility = get_visibility_class(game, viewer)
+    view = build_class_view(game, visibility)
+    if visibility in _SELF_VISIBLE_CLASSES:
+        return view
+    return patch_self(view, viewer)
+
+
+def mask_event(record: GameActionRecord) -> GameActionRecord:
+    """
+    事件脱敏：任务牌是匿名的，对外只公开谁提交了任务，不公开提交的结果
+    """
+    if record.action_type == ActionType.MISSION:
+        return record.model_copy(update={"payload": {}})
+    return record
+
+
+class _GameViews:
+    """单局对局在某一版本下的视图与序列化结果"""
+    __slots__ = ("version", "views", "encoded")
+
+    def __init__(self, version: int):
+        self.version = version
+        # 视角类别 -> 脱敏快照
+        self.views: Dict[VisibilityClass, GameState] = {}
+        # (视角类别, 补丁座位的 user_id) -> JSON 字节；无需补丁时 user_id 为 None
+        self.encoded: Dict[Tuple[VisibilityClass, Optional[int]], bytes] = {}
+
+
+class GameViewCache:
+    """
+    视角视图缓存（LRU）
+    key: game_id, value: 该局当前版本的视图与序列化结果
+    """
+
+    def __init__(self, max_games: int = None):
+        self.max_games = max_games if max_games is not None else settings.GAME_VIEW_CACHE_SIZE
+        self._entries: "OrderedDict[str, _GameViews]" = OrderedDict()
+
+    def _get_entry(self, game: GameState) -> _GameViews:
+        entry = self._entries.get(game.game_id)
+        if entry is None or entry.version != game.version:
+            entry = _GameViews(game.version)
+            self._entries[game.game_id] = entry
+            if len(self._entries) > self.max_games:
+                self._entries.popitem(last=False)
+        else:
+            self._entries.move_to_end(game.game_id)
+        return entry
+
+    def _get_viewer(self, game: GameState, viewer_id: int) -> PlayerState:
+        viewer = game.get_player(viewer_id)
+        if not viewer:
+            # 如果观察者不在游戏中，直接报错
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="You are not a player in this game"
+            )
+        return viewer
+
+    def get_class_view(self, game: GameState, visibility: VisibilityClass) -> GameState:
+        """获取视角类别快照，同一版本同一类别只计算一次"""
+        views = self._get_entry(game).views
+        view = views.get(visibility)
+        if view is None:
+            view = build_class_view(game, visibility)
+            views[visibility] = view
+        return view
+
+    def get_player_view(self, game: GameState, viewer_id: int) -> GameState:
+        """获取特定玩家视角的快照"""
+        viewer = self._get_viewer(game, viewer_id)
+        visibility = get_visibility_class(game, viewer)
+        view = self.get_class_view(game, visibility)
+        if visibility in _SELF_VISIBLE_CLASSES:
+            return view
+        return patch_self(view, viewer)
+
+    def get_player_view_json(self, game: GameState, viewer_id: int) -> bytes:
+        """获取特定玩家视角快照的 JSON 字节，同一版本下每种 (视角类别, 补丁座位) 只编码一次"""
+        viewer = self._get_viewer(game, viewer_id)
+        visibility = get_visibility_class(game, viewer)
+        patched_id = None if visibility in _SELF_VISIBLE_CLASSES else viewer.user_id
+
+        encoded = self._get_entry(game).encoded
+        key = (visibility, patched_id)
+        data = encoded.get(key)
+        if data is None:
+            data = _state_adapter.dump_json(self.get_player_view(game, viewer_id))
+            encoded[key] = data
+        return data
+
+    def get_public_view_json(self, game: GameState) -> bytes:
+        """获取公开视角快照的 JSON 字节（不补丁任何座位）"""
+        visibility = get_public_visibility(game)
+        encoded = self._get_entry(game).encoded
+        key = (visibility, None)
+        data = encoded.get(key)
+        if data is None:
+            data = _state_adapter.dump_json(self.get_class_view(game, visibility))
+            encoded[key] = data
+        return data
+
+    def invalidate(self, game_id: str):
+        self._entries.pop(game_id, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# 全局视图缓存
+game_views = GameViewCache()
@@ -0,0 +1,71 @@
+"""
+这个文件实现了对局版本的等待与通知，用于快照接口的长轮询（long-poll）。
+请求挂起在对局对应的 asyncio.Event 上，对局版本推进（或超时）后再返回，避免客户端空转轮询。
+"""
+import asyncio
+import time
+from typing import Dict, Optional
+from app.schemas.game import GameState, GameActionRecord
+from app.services.event_bus import event_bus
+from app.services.game_service import GameService
+
+
+class GameVersionWatcher:
+    """
+    对局版本等待器
+    key: game_id, value: 等待该局下一次更新的 Event（每次通知后替换为新的 Event）
+    Event 按等待中的请求计数，最后一个请求离开（无论返回、超时还是取消）时删除，没有人等待的对局不占内存
+    """
+
+    def __init__(self):
+        self._events: Dict[str, asyncio.Event] = {}
+        # key: game_id, value: 等待中的请求数
+        self._waiters: Dict[str, int] = {}
+
+    def notify(self, game_id: str):
+        """唤醒所有等待该局更新的请求"""
+        event = self._events.pop(game_id, None)
+        if event is not None:
+            event.set()
+
+    def on_game_updated(self, game: GameState, record: Optional[GameActionRecord]):
+        """对局更新监听器"""
+        self.notify(game.game_id)
+
+    async def wait_for_version(self, game_id: str, min_version: int, timeout: float) -> Optional[GameState]:
+        """
+        等待对局版本达到 min_version
+        :return: 版本达到要求时的最新状态；超时则返回当时的最新状态；对局不存在返回 None
+        """
+        deadline = time.monotonic() + timeout
+        # 等待期间关注该局在其他 worker 上的更新
+        event_bus.subscribe(game_id)
+        self._waiters[game_id] = self._waiters.get(game_id, 0) + 1
+        try:
+            while True:
+                # 先登记 Event 再读取状态，避免在读取与等待之间错过通知
+                event = self._events.setdefault(game_id, asyncio.Event())
+                game = await GameService.get_game(game_id)
+                if game is None or game.version >= min_version:
+                    return game
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return game
+                try:
+                    await asyncio.wait_for(event.wait(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    return await GameService.get_game(game_id)
+        finally:
+            event_bus.unsubscribe(game_id)
+            self._waiters[game_id] -= 1
+            if not self._waiters[game_id]:
+                del self._waiters[game_id]
+                self._events.pop(game_id, None)
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+
+# 全局版本等待器
+game_watcher = GameVersionWatcher()
@@ -0,0 +1,84 @@
+"""
+这个文件实现了动作提交的幂等处理（Idempotency-Key）。
+同一用户在同一局中使用相同的 Idempotency-Key 重试时，直接返回第一次成功执行的响应（已脱敏、已序列化），
+不会再次校验、执行动作或脱敏；第一次请求仍在执行中时，重试请求等待它的结果。
+失败的请求不缓存，客户端可以用同一个 key 重试。
+动作在独立的任务中执行，不随请求结束：客户端断开（请求被取消）后动作照常完成并缓存结果，之后的重试直接拿到这个结果。
+
+缓存只在进程内，前提是同一局的所有请求都由同一个进程处理：单 worker 部署，
+或分片部署（见 shard_router.py）下由对局的归属 worker 处理（转发或 421 重试都不会在非归属 worker 上执行动作）。
+归属 worker 变化（下线后重新分配）时缓存不会迁移，变化前后跨越的重试可能再次执行。
+"""
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, Tuple
+from fastapi import HTTPException
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+
+class IdempotentResponse:
+    """缓存的响应：响应体与 ETag，以及用于识别「同一 key 用于不同请求」的请求指纹"""
+    __slots__ = ("fingerprint", "content", "etag")
+
+    def __init__(self, fingerprint: str, content: bytes, etag: str):
+        self.fingerprint = fingerprint
+        self.content = content
+        self.etag = etag
+
+
+class IdempotencyCache:
+    """
+    幂等响应缓存
+    key: (user_id, game_id, Idempotency-Key)，value: 第一次成功执行的响应
+    """
+
+    def __init__(self, max_size: int = None, ttl: float = None):
+        max_size = max_size if max_size is not None else settings.IDEMPOTENCY_CACHE_SIZE
+        ttl = ttl if ttl is not None else settings.IDEMPOTENCY_TTL_SECONDS
+        self._responses: TTLCache[IdempotentResponse] = TTLCache(max_size, ttl, name="idempotency")
+        # 正在执行的动作
+        self._inflight: Dict[Hashable, Tuple[str, "asyncio.Task[IdempotentResponse]"]] = {}
+
+    @staticmethod
+    def _check_fingerprint(expected: str, actual: str):
+        if expected != actual:
+            raise HTTPException(
+                status_code=422,
+                detail="Idempotency-Key 已用于不同的请求"
+            )
+
+    async def run(self, key: Hashable, fingerprint: str,
+                  handler: Callable[[], Awaitable[IdempotentResponse]]) -> Tuple[IdempotentResponse, bool]:
+        """
+        执行请求，或返回同一 key 已有的结果
+        :param fingerprint: 请求内容的指纹，同一 key 携带不同内容时返回 422
+        :return: (响应, 是否为重放的结果)
+        """
+        cached = self._responses.get(key)
+        if cached is not None:
+            self._check_fingerprint(cached.fingerprint, fingerprint)
+            return cached, True
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self._check_fingerprint(inflight[0], fingerprint)
+            return await asyncio.shield(inflight[1]), True
+
+        task = asyncio.ensure_future(handler())
+        self._inflight[key] = (fingerprint, task)
+        task.add_done_callback(lambda done: self._finish(key, done))
+        # 请求被取消时只取消等待，动作本身继续执行
+        return await asyncio.shield(task), False
+
+    def _finish(self, key: Hashable, task: "asyncio.Task[IdempotentResponse]"):
+        """动作结束：成功的结果转入缓存（失败的结果也在这里取出，没有等待者时不会告警）"""
+        self._inflight.pop(key, None)
+        if not task.cancelled() and task.exception() is None:
+            self._responses.set(key, task.result())
+
+    def __len__(self) -> int:
+        return len(self._responses)
+
+
+# 全局幂等缓存
+idempotency_cache = IdempotencyCache()
@@ -0,0 +1,222 @@
+"""
+这个文件实现了对局房间的 WebSocket 广播中心（Room Hub）。
+- 玩家加入房间时下发全量快照（GAME_SNAPSHOT），之后只推送增量（STATE_UPDATE）；
+- 增量按视角类别计算：同一类别的连接共享同一份增量消息，每个版本每个类别只计算、编码一次；
+- 每个连接有独立的有界发送队列，慢客户端队列溢出时丢弃积压消息并改发一次全量快照，不会拖慢房间内其他连接。
+"""
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+from fastapi import WebSocket
+from pydantic import TypeAdapter
+from app.core.config import settings
+from app.models.game_enums import VisibilityClass
+from app.schemas.game import GameState, GameActionRecord
+from app.schemas.protocol import WebSocketOpCode
+from app.services.event_bus import event_bus
+from app.services.game_view import game_views, get_visibility_class
+
+logger = logging.getLogger(__name__)
+
+_state_adapter = TypeAdapter(GameState)
+
+# 增量计算时忽略的字段（players 单独按座位比较）
+_DELTA_SKIP_FIELDS = {"players"}
+
+
+def encode_message(op: WebSocketOpCode, payload_json: bytes) -> str:
+    """构建 WSMesssage 信封，payload 直接嵌入已编码的 JSON（避免二次序列化）"""
+    return (
+        f'{{"type":"{op.value}","timestamp":{time.time()},"payload":'
+        + payload_json.decode("utf-8")
+        + "}"
+    )
+
+
+def compute_delta(prev: Dict[str, Any], curr: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    计算两份视角快照（model_dump(mode="json") 结果）之间的差异
+    :return: {"changes": {字段: 新值}, "players": {座位号: {字段: 新值}}}
+    """
+    changes = {
+        key: value for key, value in curr.items()
+        if key not in _DELTA_SKIP_FIELDS and prev.get(key) != value
+    }
+    players = {}
+    prev_players = prev.get("players", [])
+    for i, player in enumerate(curr["players"]):
+        before = prev_players[i] if i < len(prev_players) else {}
+        diff = {key: value for key, value in player.items() if before.get(key) != value}
+        if diff:
+            players[str(player["seat_id"])] = diff
+    return {"changes": changes, "players": players}
+
+
+class RoomConnection:
+    """
+    房间内的单个 WebSocket 连接
+    """
+
+    def __init__(self, websocket: WebSocket, game_id: str, user_id: int, queue_size: int):
+        self.websocket = websocket
+        self.game_id = game_id
+        self.user_id = user_id
+        self.visibility: Optional[VisibilityClass] = None
+        self.version = 0  # 客户端当前持有的快照版本
+        self._queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0  # 因队列溢出被丢弃的消息数
+
+    def try_send(self, message: str) -> bool:
+        """非阻塞入队，队列已满返回 False"""
+        try:
+            self._queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    def reset_queue(self):
+        """丢弃所有积压消息"""
+        while not self._queue.empty():
+            self._queue.get_nowait()
+            self.dropped += 1
+
+    async def run_sender(self):
+        """发送循环：按顺序将队列中的消息写入 WebSocket"""
+        while True:
+            message = await self._queue.get()
+            await self.websocket.send_text(message)
+
+
+class _Room:
+    """单个对局房间"""
+
+    def __init__(self):
+        self.connections: Set[RoomConnection] = set()
+        # 视角类别 -> (版本, 该版本的视角快照 dict)，作为计算增量的基准
+        self.last_views: Dict[VisibilityClass, Tuple[int, Dict[str, Any]]] = {}
+
+
+class RoomHub:
+    """
+    房间广播中心
+    key: game_id, value: 房间
+    """
+
+    def __init__(self, queue_size: int = None):
+        self.queue_size = queue_size if queue_size is not None else settings.WS_SEND_QUEUE_SIZE
+        self._rooms: Dict[str, _Room] = {}
+
+    def has_room(self, game_id: str) -> bool:
+        return game_id in self._rooms
+
+    def _class_view(self, room: _Room, game: GameState, visibility: VisibilityClass) -> Dict[str, Any]:
+        """获取视角快照 dict，并记录为该类别的增量基准"""
+        cached = room.last_views.get(visibility)
+        if cached is not None and cached[0] == game.version:
+            return cached[1]
+        view = _state_adapter.dump_python(game_views.get_class_view(game, visibility), mode="json")
+        if cached is None or cached[0] < game.version:
+            room.last_views[visibility] = (game.version, view)
+        return view
+
+    def _send_snapshot(self, conn: RoomConnection, game: GameState):
+        """下发全量快照，并将连接的基准更新到当前版本"""
+        player = game.get_player(conn.user_id)
+        conn.visibility = get_visibility_class(game, player)
+        conn.version = game.version
+        message = encode_message(WebSocketOpCode.GAME_SNAPSHOT, game_views.get_player_view_json(game, conn.user_id))
+        if not conn.try_send(message):
+            conn.reset_queue()
+            conn.try_send(message)
+
+    def join(self, game: GameState, websocket: WebSocket, user_id: int) -> RoomConnection:
+        """加入房间并下发全量快照"""
+        room = self._rooms.get(game.game_id)
+        if room is None:
+            room = self._rooms[game.game_id] = _Room()
+            # 本 worker 开始关注该局，接收其他 worker 上产生的更新
+            event_bus.subscribe(game.game_id)
+        conn = RoomConnection(websocket, game.game_id, user_id, self.queue_size)
+        room.connections.add(conn)
+        self._class_view(room, game, get_visibility_class(game, game.get_player(user_id)))
+        self._send_snapshot(conn, game)
+        return conn
+
+    def resync(self, conn: RoomConnection, game: GameState):
+        """客户端主动请求全量快照（如 JOIN_GAME 重发）"""
+        self._send_snapshot(conn, game)
+
+    def leave(self, conn: RoomConnection):
+        room = self._rooms.get(conn.game_id)
+        if room is None:
+            return
+        room.connections.discard(conn)
+        if not room.connections:
+            del self._rooms[conn.game_id]
+            event_bus.unsubscribe(conn.game_id)
+
+    def send(self, conn: RoomConnection, op: WebSocketOpCode, payload: Optional[Dict[str, Any]] = None):
+        """向单个连接发送一条消息（错误通知、心跳响应等），队列已满时丢弃"""
+        if not conn.try_send(encode_message(op, json.dumps(payload, ensure_ascii=False).encode("utf-8"))):
+            conn.dropped += 1
+
+    def broadcast(self, game: GameState, record: Optional[GameActionRecord] = None):
+        """
+        向房间内所有连接推送对局更新
+        同一 (旧视角类别, 新视角类别) 的连接共享同一条增量消息；基准版本不一致的连接改发全量快照
+        """
+        room = self._rooms.get(game.game_id)
+        if room is None:
+            return
+
+        # 按 (旧视角类别, 新视角类别) 分组
+        groups: Dict[Tuple[VisibilityClass, VisibilityClass], List[RoomConnection]] = {}
+        for conn in room.connections:
+            if conn.version >= game.version:
+                continue
+            new_visibility = get_visibility_class(game, game.get_player(conn.user_id))
+            groups.setdefault((conn.visibility, new_visibility), []).append(conn)
+
+        previous = dict(room.last_views)
+        for (old_visibility, new_visibility), conns in groups.items():
+            base = previous.get(old_visibility)
+            curr = self._class_view(room, game, new_visibility)
+            message = None
+            if base is not None:
+                delta = compute_delta(base[1], curr)
+                delta["version"] = game.version
+                delta["seq"] = game.seq
+                message = encode_message(
+                    WebSocketOpCode.STATE_UPDATE,
+                    json.dumps(delta, ensure_ascii=False).encode("utf-8")
+                )
+
+            for conn in conns:
+                if message is None or conn.version != base[0]:
+                    # 客户端基准与房间基准不一致，无法应用增量
+                    self._send_snapshot(conn, game)
+                    continue
+                if conn.try_send(message):
+                    conn.version = game.version
+                    conn.visibility = new_visibility
+                else:
+                    # 慢客户端：丢弃积压的增量，改发一次全量快照
+                    conn.reset_queue()
+                    self._send_snapshot(conn, game)
+
+    def on_game_updated(self, game: GameState, record: Optional[GameActionRecord]):
+        """对局更新监听器"""
+        self.broadcast(game, record)
+
+    @property
+    def connection_count(self) -> int:
+        return sum(len(room.connections) for room in self._rooms.values())
+
+    def __len__(self) -> int:
+        return len(self._rooms)
+
+
+# 全局房间广播中心
+room_hub = RoomHub()
@@ -0,0 +1,216 @@
+"""
+这个文件实现了对局分片的归属注册表（Shard Registry）：多个 worker 进程各自在内存中持有一部分对局，
+同一局的所有请求都必须由持有它的 worker 处理。
+- 成员：每个 worker 定期在 Redis 中心跳（有序集合，分数为心跳时间），超过 SHARD_WORKER_TTL_SECONDS 未心跳的 worker 被移除；
+- 放置：存活的 worker 组成一致性哈希环（见 app/core/hash_ring.py），worker 创建对局时选取哈希到自己的 game_id，
+  创建请求无需转发，之后的请求按哈希环即可找到它；
+- 归属：创建时在 Redis 中登记 game_id -> worker，成员变化（哈希环改变）后已有对局的归属保持不变；
+  归属 worker 下线后按新的哈希环重新分配（接管的 worker 从共享存储或自己的快照加载）。
+归属查询结果缓存在进程内（TTLCache），热路径上不访问 Redis。
+"""
+import asyncio
+import logging
+import time
+import uuid
+from typing import Dict, Optional
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.hash_ring import HashRing
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# 选取归属本 worker 的 game_id 的最大尝试次数（平均尝试次数等于 worker 数）
+MAX_GAME_ID_ATTEMPTS = 1000
+
+
+class ShardRegistry:
+    """
+    分片注册表接口
+    """
+    worker_id: str
+
+    @property
+    def enabled(self) -> bool:
+        """是否启用分片（未启用时所有对局都由本进程处理）"""
+        return False
+
+    def new_game_id(self) -> str:
+        """为本 worker 新建的对局生成 game_id"""
+        raise NotImplementedError
+
+    async def claim(self, game_id: str):
+        """登记本 worker 为对局的归属"""
+        raise NotImplementedError
+
+    async def owner(self, game_id: str) -> str:
+        """对局归属的 worker_id"""
+        raise NotImplementedError
+
+    def url_of(self, worker_id: str) -> Optional[str]:
+        """worker 的内部访问地址（转发请求用），未知时返回 None"""
+        raise NotImplementedError
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+
+class LocalShardRegistry(ShardRegistry):
+    """单进程部署：所有对局都属于本 worker"""
+
+    def __init__(self, worker_id: str = None):
+        self.worker_id = worker_id or settings.WORKER_ID or "local"
+
+    def new_game_id(self) -> str:
+        return str(uuid.uuid4())
+
+    async def claim(self, game_id: str):
+        pass
+
+    async def owner(self, game_id: str) -> str:
+        return self.worker_id
+
+    def url_of(self, worker_id: str) -> Optional[str]:
+        return None
+
+
+class RedisShardRegistry(ShardRegistry):
+    """
+    基于 Redis 的分片注册表
+    key 布局（前缀为 SHARD_KEY_PREFIX）：workers = 存活 worker 的有序集合，urls = worker -> 内部地址，owner:<game_id> = 归属 worker
+    """
+
+    def __init__(self, client=None, worker_id: str = None, url: str = None, key_prefix: str = None,
+                 heartbeat_seconds: float = None, worker_ttl_seconds: float = None, virtual_nodes: int = None):
+        if client is None:
+            from app.core.redis import redis_client
+            client = redis_client
+        self._redis = client
+        self.worker_id = worker_id or settings.WORKER_ID or uuid.uuid4().hex
+        self.url = url if url is not None else settings.WORKER_URL
+        self._key_prefix = key_prefix if key_prefix is not None else settings.SHARD_KEY_PREFIX
+        self.heartbeat_seconds = heartbeat_seconds if heartbeat_seconds is not None else settings.SHARD_HEARTBEAT_SECONDS
+        self.worker_ttl_seconds = worker_ttl_seconds if worker_ttl_seconds is not None else settings.SHARD_WORKER_TTL_SECONDS
+        self.virtual_nodes = virtual_nodes if virtual_nodes is not None else settings.SHARD_VIRTUAL_NODES
+
+        # 存活的 worker：worker_id -> 内部地址（始终包含本 worker）
+        self._members: Dict[str, str] = {self.worker_id: self.url}
+        self.ring = HashRing(self._members, self.virtual_nodes)
+        # 归属缓存：game_id -> worker_id
+        self._owners: TTLCache[str] = TTLCache(
+            max_size=settings.SHARD_OWNER_CACHE_SIZE,
+            ttl=settings.SHARD_OWNER_CACHE_TTL_SECONDS,
+            name="shard.owner"
+        )
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return True
+
+    def _key(self, name: str) -> str:
+        return f"{self._key_prefix}{name}"
+
+    # --- 成员 ---
+
+    async def heartbeat(self, now: float = None):
+        """登记本 worker 的心跳，移除过期的 worker，并按最新成员重建哈希环"""
+        now = now if now is not None else time.time()
+        workers_key, urls_key = self._key("workers"), self._key("urls")
+        async with self._redis.pipeline(transaction=False) as pipe:
+            pipe.zadd(workers_key, {self.worker_id: now})
+            pipe.hset(urls_key, self.worker_id, self.url)
+            pipe.zremrangebyscore(workers_key, "-inf", now - self.worker_ttl_seconds)
+            pipe.zrange(workers_key, 0, -1)
+            pipe.hgetall(urls_key)
+            *_, alive, urls = await pipe.execute()
+        stale = set(urls) - set(alive)
+        if stale:
+            await self._redis.hdel(urls_key, *stale)
+        self.apply_members({worker_id: urls.get(worker_id, "") for worker_id in alive})
+
+    def apply_members(self, members: Dict[str, str]):
+        """更新成员（成员集合变化时重建哈希环）"""
+        members = dict(members)
+        members[self.worker_id] = self.url
+        if set(members) != self.ring.nodes:
+            logger.info("shard ring changed: %s -> %s", sorted(self.ring.nodes), sorted(members))
+            self.ring = HashRing(members, self.virtual_nodes)
+        self._members = members
+        metrics.gauge("shard.workers").set(len(members))
+
+    def url_of(self, worker_id: str) -> Optional[str]:
+        return self._members.get(worker_id) or None
+
+    # --- 归属 ---
+
+    def new_game_id(self) -> str:
+        for _ in range(MAX_GAME_ID_ATTEMPTS):
+            game_id = str(uuid.uuid4())
+            if self.ring.owner(game_id) == self.worker_id:
+                return game_id
+        # 不会发生（本 worker 总在环上）；退化为普通 UUID，归属由 claim 登记
+        return str(uuid.uuid4())
+
+    async def claim(self, game_id: str):
+        await self._redis.set(self._key(f"owner:{game_id}"), self.worker_id, ex=settings.GAME_STORE_TTL_SECONDS)
+        self._owners.set(game_id, self.worker_id)
+
+    async def owner(self, game_id: str) -> str:
+        owner = self._owners.get(game_id)
+        if owner is not None and owner in self._members:
+            return owner
+        owner = await self._redis.get(self._key(f"owner:{game_id}"))
+        if owner is None or owner not in self._members:
+            # 未登记（例如其他 worker 还没有完成创建）或归属 worker 已下线：按哈希环
+            owner = self.ring.owner(game_id)
+        self._owners.set(game_id, owner)
+        return owner
+
+    # --- 生命周期 ---
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds)
+            try:
+                await self.heartbeat()
+            except Exception:
+                logger.exception("shard registry heartbeat failed")
+
+    async def start(self):
+        """登记本 worker（在接收请求之前完成一次心跳，拿到当前的成员）"""
+        await self.heartbeat()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="shard-registry")
+
+    async def stop(self):
+        """注销本 worker，其他 worker 在下一次心跳时把它移出哈希环"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self._redis.zrem(self._key("workers"), self.worker_id)
+            await self._redis.hdel(self._key("urls"), self.worker_id)
+        except Exception:
+            logger.exception("shard registry deregistration failed")
+
+
+def create_shard_registry(backend: str = None) -> ShardRegistry:
+    """根据配置创建分片注册表"""
+    backend = backend or settings.SHARD_REGISTRY_BACKEND
+    if backend == "local":
+        return LocalShardRegistry()
+    if backend == "redis":
+        return RedisShardRegistry()
+    raise ValueError(f"未知的分片注册表类型: {backend}")
+
+
+# 全局分片注册表
+shard_registry: ShardRegistry = create_shard_registry()
@@ -0,0 +1,190 @@
+"""
+这个文件实现了按对局分片的请求路由（ASGI 中间件），配合 shard_registry.py 使用。
+对 /api/v1/games/{game_id}... 与 /ws/games/{game_id} 的请求先查询对局的归属 worker：
+- 归属本 worker：直接处理，HTTP 响应带上 X-Game-Owner 头，前端代理可据此把后续请求直接发往归属 worker；
+- 归属其他 worker 且开启转发（SHARD_FORWARD）：把请求原样转发到对方的内部地址，并把响应原样返回；
+- 否则返回 421 Misdirected Request（带 X-Game-Owner 头），由前端代理按头部重试。
+WebSocket 无法在进程之间转发，发到非归属 worker 的连接先接受再关闭（close code 4421，reason 为归属 worker；
+握手阶段直接关闭会被服务器转成 HTTP 403，客户端拿不到这两项），
+WebSocket 应由前端代理按 game_id 做一致性哈希路由，或连接到 X-Game-Owner 指向的 worker。
+转发的请求带有 X-Shard-Forwarded 头，收到转发请求的 worker 一律在本地处理（成员变化期间两边的哈希环可能短暂不一致，避免来回转发）。
+该头部由转发的 worker 签名（worker_id:时间戳:HMAC，密钥为 SHARD_FORWARD_SECRET），签名无效或过期的头部被移除并按普通请求路由，
+客户端不能借此绕过分片路由。
+"""
+import hashlib
+import hmac
+import logging
+import re
+import time
+from typing import Optional
+from urllib.parse import unquote
+import httpx
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.shard_registry import ShardRegistry, shard_registry
+
+logger = logging.getLogger(__name__)
+
+OWNER_HEADER = b"x-game-owner"
+FORWARDED_HEADER = b"x-shard-forwarded"
+WS_CLOSE_MISDIRECTED = 4421
+
+# 转发签名的有效期（秒）
+FORWARD_SIGNATURE_MAX_AGE = 60
+
+# 不转发的逐跳头部
+_HOP_HEADERS = {b"host", b"connection", b"keep-alive", b"transfer-encoding", b"upgrade"}
+
+
+class ShardRouter:
+    """
+    分片路由中间件
+    """
+
+    def __init__(self, app, registry: ShardRegistry = None, forward: bool = None, client: httpx.AsyncClient = None,
+                 secret: str = None):
+        self.app = app
+        self.registry = registry if registry is not None else shard_registry
+        self.forward = forward if forward is not None else settings.SHARD_FORWARD
+        self._client = client
+        self._secret = (secret or settings.SHARD_FORWARD_SECRET or settings.SECRET_KEY).encode("utf-8")
+        self._game_path = re.compile(rf"^{re.escape(settings.API_V1_STR)}/games/([^/]+)")
+        self._ws_path = re.compile(r"^/ws/games/([^/]+)")
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """转发用的连接池（进程内共用，随进程退出）"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=settings.SHARD_FORWARD_TIMEOUT_SECONDS)
+        return self._client
+
+    def _game_id(self, scope) -> Optional[str]:
+        pattern = self._game_path if scope["type"] == "http" else self._ws_path
+        match = pattern.match(scope["path"])
+        return unquote(match.group(1)) if match else None
+
+    def _signature(self, worker_id: str, timestamp: str, method: str, path: str) -> str:
+        message = f"{worker_id}:{timestamp}:{method}:{path}".encode("utf-8")
+        return hmac.new(self._secret, message, hashlib.sha256).hexdigest()
+
+    def sign_forward(self, scope, now: float = None) -> bytes:
+        """本 worker 转发请求时的 X-Shard-Forwarded 头部"""
+        worker_id = self.registry.worker_id
+        timestamp = str(int(now if now is not None else time.time()))
+        signature = self._signature(worker_id, timestamp, scope.get("method", ""), scope["path"])
+        return f"{worker_id}:{timestamp}:{signature}".encode("utf-8")
+
+    def verify_forward(self, value: bytes, scope, now: float = None) -> bool:
+        """X-Shard-Forwarded 头部是否由持有共享密钥的 worker 签发且未过期"""
+        try:
+            worker_id, timestamp, signature = value.decode("utf-8").rsplit(":", 2)
+            age = (now if now is not None else time.time()) - int(timestamp)
+        except ValueError:
+            return False
+        if abs(age) > FORWARD_SIGNATURE_MAX_AGE:
+            return False
+        expected = self._signature(worker_id, timestamp, scope.get("method", ""), scope["path"])
+        return hmac.compare_digest(expected, signature)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket") or not self.registry.enabled:
+            await self.app(scope, receive, send)
+            return
+        game_id = self._game_id(scope)
+        if game_id is None:
+            await self.app(scope, receive, send)
+            return
+
+        forwarded = False
+        values = [value for name, value in scope["headers"] if name == FORWARDED_HEADER]
+        if values:
+            forwarded = len(values) == 1 and self.verify_forward(values[0], scope)
+            if not forwarded:
+                metrics.counter("shard.forward_rejected").inc()
+            # 无论是否有效都不交给下游（也不会被再次转发出去）
+            scope = dict(scope)
+            scope["headers"] = [(name, value) for name, value in scope["headers"] if name != FORWARDED_HEADER]
+
+        owner = await self.registry.owner(game_id)
+        if owner == self.registry.worker_id or forwarded:
+            if scope["type"] == "http":
+                send = _with_owner_header(send, self.registry.worker_id)
+            await self.app(scope, receive, send)
+            return
+
+        if scope["type"] == "websocket":
+            metrics.counter("shard.ws_rejected").inc()
+            await receive()  # websocket.connect
+            await send({"type": "websocket.accept"})
+            await send({"type": "websocket.close", "code": WS_CLOSE_MISDIRECTED, "reason": owner})
+            return
+
+        url = self.registry.url_of(owner)
+        if not self.forward or not url:
+            metrics.counter("shard.misdirected").inc()
+            await _send_plain(send, 421, b'{"detail":"Game is owned by another worker"}', owner)
+            return
+        await self._forward(scope, receive, send, url, owner)
+
+    async def _forward(self, scope, receive, send, url: str, owner: str):
+        """把请求转发到归属 worker，并把响应原样（包括压缩编码）返回"""
+        body = b""
+        more_body = True
+        while more_body:
+            message = await receive()
+            body += message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+        headers = [(name, value) for name, value in scope["headers"] if name not in _HOP_HEADERS]
+        headers.append((FORWARDED_HEADER, self.sign_forward(scope)))
+        target = url.rstrip("/") + scope.get("raw_path", scope["path"].encode("utf-8")).decode("latin-1")
+        if scope.get("query_string"):
+            target += "?" + scope["query_string"].decode("latin-1")
+
+        start = time.perf_counter()
+        request = self.client.build_request(scope["method"], target, headers=headers, content=body)
+        try:
+            response = await self.client.send(request, stream=True)
+        except httpx.HTTPError:
+            logger.exception("shard forward failed: owner=%s url=%s", owner, target)
+            metrics.counter("shard.forward_failed").inc()
+            await _send_plain(send, 502, b'{"detail":"Game owner is unreachable"}', owner)
+            return
+        try:
+            response_headers = [
+                (name, value) for name, value in response.headers.raw if name.lower() not in _HOP_HEADERS
+            ]
+            await send({"type": "http.response.start", "status": response.status_code, "headers": response_headers})
+            async for chunk in response.aiter_raw():
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b""})
+        finally:
+            await response.aclose()
+        metrics.counter("shard.forwarded").inc()
+        metrics.summary("shard.forward_ms").observe((time.perf_counter() - start) * 1000)
+
+
+def _with_owner_header(send, owner: str):
+    """在本地处理的 HTTP 响应上加 X-Game-Owner 头"""
+    owner_value = owner.encode("utf-8")
+
+    async def wrapped(message):
+        if message["type"] == "http.response.start":
+            message = dict(message)
+            message["headers"] = list(message.get("headers", [])) + [(OWNER_HEADER, owner_value)]
+        await send(message)
+
+    return wrapped
+
+
+async def _send_plain(send, status_code: int, body: bytes, owner: str):
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("latin-1")),
+            (OWNER_HEADER, owner.encode("utf-8")),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
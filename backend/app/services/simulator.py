@@ -0,0 +1,205 @@
+"""
+这个文件实现了离线对局模拟器：不经过 HTTP、存储与对局 Actor，
+直接用 GameRuleValidator.check_action 校验、game_reducer.apply_action 执行，和线上共用同一份规则与状态机。
+时钟与随机数均可注入（默认使用虚拟时钟和带种子的 Random），同样的参数总是得到同样的结果。
+多局对局按批次分给进程池并行执行，汇总各阵营、各角色的胜率，用于校验规则、AI 策略与平衡性。
+
+用法：python -m app.services.simulator --games 100000 --policy random --workers 8
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional
+from app.core.ai_policy import AIPolicy, get_policy
+from app.core.belief import GameBelief
+from app.core.game_reducer import apply_action, new_game
+from app.core.game_rules import GameRuleError, GameRuleValidator, TimeoutPolicy
+from app.models.game_enums import GamePhase, Camp, Character, MissionResult, EVIL_CHARACTERS
+from app.schemas.game import GameState
+
+# 模拟对局的玩家
+SIM_PLAYER_IDS = list(range(1, 9))
+# 单局最多执行的动作数（正常对局远小于该值，超过说明状态机无法结束）
+MAX_ACTIONS_PER_GAME = 2000
+# 每个进程任务执行的对局数
+DEFAULT_CHUNK_SIZE = 1000
+# 报告中保留的错误样例数
+MAX_ERROR_SAMPLES = 5
+
+
+class SimulationError(Exception):
+    """对局无法正常结束（策略给出非法动作、没有待行动的玩家或动作数超限）"""
+
+
+def play_game(policy: AIPolicy, rng: random.Random, clock: Callable[[], float] = None,
+              game_id: str = "sim", max_actions: int = MAX_ACTIONS_PER_GAME) -> GameState:
+    """
+    模拟一局完整的对局，所有座位由 policy 决策
+    :param clock: 时钟（默认每个动作前进 1 秒的虚拟时钟）
+    :return: 结束状态（phase 为 FINISHED）
+    :raises SimulationError: 对局无法正常结束
+    """
+    if clock is None:
+        ticks = itertools.count()
+        clock = lambda: float(next(ticks))
+
+    game = new_game(game_id, SIM_PLAYER_IDS, {}, now=clock(), rng=rng)
+    belief = GameBelief.from_game(game) if policy.uses_belief else None
+    while game.phase != GamePhase.FINISHED:
+        pending = TimeoutPolicy.get_pending_players(game)
+        if not pending:
+            raise SimulationError(f"阶段 {game.phase.value} 没有待行动的玩家")
+        # 同一阶段的待行动玩家依次行动，最后一位行动后阶段结算
+        for player in pending:
+            action_type, payload = policy.decide(game, player, rng, belief)
+            try:
+                GameRuleValidator.check_action(game, player.user_id, action_type, payload)
+            except GameRuleError as e:
+                raise SimulationError(f"{policy.name} 在 {game.phase.value} 阶段给出非法动作: {e.detail}")
+            apply_action(game, player.user_id, action_type, payload, clock())
+            game.seq += 1
+            if belief is not None:
+                belief.observe(player.user_id, action_type, payload)
+        if game.seq > max_actions:
+            raise SimulationError(f"超过 {max_actions} 个动作仍未结束")
+    return game
+
+
+def game_ending(game: GameState) -> str:
+    """对局的结束方式"""
+    if game.winner == Camp.GOOD:
+        return "merlin_survived"
+    if game.mission_results.count(MissionResult.FAIL) >= 3:
+        return "missions_failed"
+    if game.vote_track >= 5:
+        return "vote_track"
+    return "assassination"
+
+
+class SimulationReport:
+    """
+    模拟结果汇总（可跨进程合并）
+    """
+
+    def __init__(self, policy: str = ""):
+        self.policy = policy
+        self.games = 0
+        self.actions = 0
+        self.errors = 0
+        self.error_samples: List[str] = []
+        self.camp_wins: Counter = Counter()
+        self.endings: Counter = Counter()
+        self.role_games: Counter = Counter()
+        self.role_wins: Counter = Counter()
+
+    def record(self, game: GameState):
+        """记录一局已结束的对局"""
+        self.games += 1
+        self.actions += game.seq
+        self.camp_wins[game.winner] += 1
+        self.endings[game_ending(game)] += 1
+        for player in game.players:
+            camp = Camp.EVIL if player.character in EVIL_CHARACTERS else Camp.GOOD
+            self.role_games[player.character] += 1
+            if camp == game.winner:
+                self.role_wins[player.character] += 1
+
+    def record_error(self, error: Exception):
+        """记录一局无法正常结束的对局"""
+        self.errors += 1
+        if len(self.error_samples) < MAX_ERROR_SAMPLES:
+            self.error_samples.append(str(error))
+
+    def merge(self, other: "SimulationReport"):
+        self.games += other.games
+        self.actions += other.actions
+        self.errors += other.errors
+        self.error_samples.extend(other.error_samples[:MAX_ERROR_SAMPLES - len(self.error_samples)])
+        self.camp_wins.update(other.camp_wins)
+        self.endings.update(other.endings)
+        self.role_games.update(other.role_games)
+        self.role_wins.update(other.role_wins)
+
+    def win_rate(self, camp: Camp) -> float:
+        return self.camp_wins[camp] / self.games if self.games else 0.0
+
+    def role_win_rate(self, character: Character) -> float:
+        games = self.role_games[character]
+        return self.role_wins[character] / games if games else 0.0
+
+    def to_dict(self) -> Dict:
+        return {
+            "policy": self.policy,
+            "games": self.games,
+            "errors": self.errors,
+            "error_samples": self.error_samples,
+            "avg_actions": self.actions / self.games if self.games else 0.0,
+            "win_rate": {camp.value: self.win_rate(camp) for camp in Camp},
+            "endings": {ending: count / self.games for ending, count in sorted(self.endings.items())} if self.games else {},
+            "role_win_rate": {character.value: self.role_win_rate(character) for character in Character},
+        }
+
+
+def simulate_games(policy_name: str, games: int, seed: int) -> SimulationReport:
+    """在当前进程中顺序模拟 games 局（进程池的任务单元，参数都可以跨进程传递）"""
+    policy = get_policy(policy_name)
+    rng = random.Random(seed)
+    report = SimulationReport(policy_name)
+    for _ in range(games):
+        try:
+            report.record(play_game(policy, rng))
+        except SimulationError as e:
+            report.record_error(e)
+    return report
+
+
+def run_simulation(games: int, policy: str = "random", workers: Optional[int] = None,
+                   seed: int = 0, chunk_size: int = DEFAULT_CHUNK_SIZE) -> SimulationReport:
+    """
+    模拟 games 局对局并汇总结果
+    :param workers: 进程数（默认 CPU 核数，1 表示在当前进程执行）
+    :param seed: 随机种子，第 i 个批次使用 seed + i
+    """
+    get_policy(policy)  # 尽早报告未知的策略名
+    chunks = [min(chunk_size, games - start) for start in range(0, games, chunk_size)]
+    seeds = [seed + i for i in range(len(chunks))]
+    report = SimulationReport(policy)
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1 or len(chunks) <= 1:
+        for size, chunk_seed in zip(chunks, seeds):
+            report.merge(simulate_games(policy, size, chunk_seed))
+        return report
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as pool:
+        for partial in pool.map(simulate_games, [policy] * len(chunks), chunks, seeds):
+            report.merge(partial)
+    return report
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="离线对局模拟器")
+    parser.add_argument("--games", type=int, default=10000, help="模拟的对局数")
+    parser.add_argument("--policy", default="random", help="所有座位使用的 AI 策略")
+    parser.add_argument("--workers", type=int, default=None, help="进程数（默认 CPU 核数）")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="每个进程任务的对局数")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    report = run_simulation(args.games, args.policy, args.workers, args.seed, args.chunk_size)
+    elapsed = time.perf_counter() - started
+
+    result = report.to_dict()
+    result["seconds"] = round(elapsed, 3)
+    result["games_per_second"] = round(report.games / elapsed, 1) if elapsed > 0 else None
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
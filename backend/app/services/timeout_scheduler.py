@@ -0,0 +1,143 @@
+"""
+这个文件实现了对局超时调度器：在阶段开始时登记截止时间，到期后自动执行 TimeoutPolicy 给出的兜底动作。
+- 使用最小堆保存截止时间，登记为 O(log n)，取消为 O(1)（惰性删除，弹出时跳过已失效的条目）；
+- 每个 tick 一次性弹出所有到期对局并批量触发，开销只与到期对局数相关，与总对局数无关；
+- 同一局所有未行动玩家的兜底动作作为一个批次提交（GameService.process_actions），只读写一次存储、只广播一次。
+"""
+import asyncio
+import heapq
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+from fastapi import HTTPException
+from app.core.config import settings
+from app.core.game_rules import TimeoutPolicy
+from app.models.game_enums import GamePhase
+from app.schemas.game import GameState, GameActionRecord
+from app.services.game_service import GameService, PendingAction
+
+logger = logging.getLogger(__name__)
+
+
+class TimeoutScheduler:
+    """
+    超时调度器
+    """
+
+    def __init__(self, tick_seconds: float = None, timeout_seconds: float = None):
+        self.tick_seconds = tick_seconds if tick_seconds is not None else settings.TIMEOUT_TICK_SECONDS
+        self.timeout_seconds = timeout_seconds if timeout_seconds is not None else TimeoutPolicy.TIMEOUT_SECONDS
+        # 最小堆：(截止时间, game_id, 登记令牌)
+        self._heap: List[Tuple[float, str, int]] = []
+        # 每局当前有效的登记：game_id -> (阶段开始时间, 登记令牌)
+        self._armed: Dict[str, Tuple[float, int]] = {}
+        self._next_token = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def arm(self, game_id: str, phase_start_time: float):
+        """为对局登记截止时间（覆盖该局之前的登记）"""
+        current = self._armed.get(game_id)
+        if current is not None and current[0] == phase_start_time:
+            return
+        self._next_token += 1
+        self._armed[game_id] = (phase_start_time, self._next_token)
+        heapq.heappush(self._heap, (phase_start_time + self.timeout_seconds, game_id, self._next_token))
+        self._maybe_compact()
+
+    def cancel(self, game_id: str):
+        """取消对局的登记，堆中的旧条目在弹出时被跳过"""
+        self._armed.pop(game_id, None)
+
+    def pop_due(self, now: float) -> List[str]:
+        """弹出所有已到期且仍然有效的对局"""
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            _, game_id, token = heapq.heappop(self._heap)
+            current = self._armed.get(game_id)
+            if current is not None and current[1] == token:
+                del self._armed[game_id]
+                due.append(game_id)
+        return due
+
+    def _maybe_compact(self):
+        """失效条目过多时重建堆，避免频繁取消导致堆无限增长"""
+        if len(self._heap) > 2 * len(self._armed) + 1024:
+            self._heap = [
+                (start + self.timeout_seconds, game_id, token)
+                for game_id, (start, token) in self._armed.items()
+            ]
+            heapq.heapify(self._heap)
+
+    def on_game_updated(self, game: GameState, record: Optional[GameActionRecord]):
+        """对局更新监听器：阶段开始时间变化时重新登记，对局结束时取消"""
+        if game.phase == GamePhase.FINISHED:
+            self.cancel(game.game_id)
+        elif game.phase_start_time > 0:
+            self.arm(game.game_id, game.phase_start_time)
+
+    async def fire_due(self, now: float = None):
+        """触发所有到期对局的兜底动作（同一批次内的对局并发处理）"""
+        now = now if now is not None else time.time()
+        due = self.pop_due(now)
+        if due:
+            await asyncio.gather(*[self._fire(game_id, now) for game_id in due])
+
+    async def _fire(self, game_id: str, now: float):
+        game = await GameService.get_game(game_id)
+        if not game or game.phase == GamePhase.FINISHED:
+            return
+        if not TimeoutPolicy.is_timed_out(game, now):
+            # 阶段已在其他地方推进（如其他 worker），按最新的阶段开始时间重新登记
+            self.arm(game_id, game.phase_start_time)
+            return
+
+        # 批次是原子的：有玩家恰好在超时触发前行动时整批失败，按最新状态重新计算一次
+        for _ in range(2):
+            actions: List[PendingAction] = []
+            for player in TimeoutPolicy.get_pending_players(game):
+                action = TimeoutPolicy.get_default_action(game, player)
+                if action is not None:
+                    actions.append((player.user_id, action["action_type"], action["payload"]))
+            if not actions:
+                return
+            try:
+                await GameService.process_actions(game_id, actions)
+                return
+            except HTTPException as e:
+                logger.info("timeout default actions skipped: game_id=%s users=%s detail=%s",
+                            game_id, [user_id for user_id, _, _ in actions], e.detail)
+            game = await GameService.get_game(game_id)
+            if not game or game.phase == GamePhase.FINISHED or not TimeoutPolicy.is_timed_out(game, now):
+                # 阶段已推进，新的阶段由监听器重新登记
+                return
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.tick_seconds)
+            try:
+                await self.fire_due()
+            except Exception:
+                logger.exception("timeout scheduler tick failed")
+
+    def start(self):
+        """注册监听器并启动后台 tick 任务"""
+        GameService.add_listener(self.on_game_updated)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="timeout-scheduler")
+
+    async def stop(self):
+        GameService.remove_listener(self.on_game_updated)
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def __len__(self) -> int:
+        return len(self._armed)
+
+
+# 全局超时调度器
+timeout_scheduler = TimeoutScheduler()
@@ -0,0 +1,72 @@
+"""
+这个文件实现了已登录用户的进程内缓存，位于 get_current_user 之前：
+- 用户缓存：user_id -> 用户记录（不含密码哈希），对局轮询/动作等高频接口在稳定状态下不再查询数据库；
+- Token 缓存：token -> user_id，已校验过签名的 Token 在过期前不再重复解码。
+用户被修改或删除时（SQLAlchemy after_update / after_delete 事件）或调用 invalidate 时立即失效；
+其他 worker 上的修改依赖 TTL 兜底，最多延迟 USER_CACHE_TTL_SECONDS 生效。
+"""
+import time
+from typing import Optional
+from sqlalchemy import event
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.models.user import User
+
+
+class UserCache:
+    """
+    已登录用户缓存
+    """
+
+    def __init__(self, max_size: int = None, ttl: float = None):
+        max_size = max_size if max_size is not None else settings.USER_CACHE_SIZE
+        ttl = ttl if ttl is not None else settings.USER_CACHE_TTL_SECONDS
+        self._users: TTLCache[User] = TTLCache(max_size, ttl, name="user_cache")
+        self._tokens: TTLCache[int] = TTLCache(max_size, ttl, name="token_cache")
+
+    @staticmethod
+    def _detach(user: User) -> User:
+        """复制为与数据库会话无关的对象（不保留密码哈希）"""
+        return User(
+            id=user.id,
+            username=user.username,
+            email=user.email,
+            is_active=user.is_active,
+            created_at=user.created_at
+        )
+
+    def get_user(self, user_id: int) -> Optional[User]:
+        return self._users.get(user_id)
+
+    def set_user(self, user: User) -> User:
+        """缓存用户并返回缓存中的副本"""
+        cached = self._detach(user)
+        self._users.set(user.id, cached)
+        return cached
+
+    def get_token_subject(self, token: str) -> Optional[int]:
+        """已校验 Token 对应的 user_id"""
+        return self._tokens.get(token)
+
+    def set_token_subject(self, token: str, user_id: int, expires_at: Optional[float]):
+        """缓存已校验的 Token，缓存时间不超过 Token 自身的过期时间（Unix 时间戳）"""
+        self._tokens.set(token, user_id, ttl=None if expires_at is None else expires_at - time.time())
+
+    def invalidate(self, user_id: int):
+        """用户被停用、修改资料或删除时调用"""
+        self._users.delete(user_id)
+
+    def clear(self):
+        self._users.clear()
+        self._tokens.clear()
+
+
+# 全局用户缓存
+user_cache = UserCache()
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_user(mapper, connection, target: User):
+    """通过 ORM 修改/删除用户时自动失效缓存"""
+    user_cache.invalidate(target.id)
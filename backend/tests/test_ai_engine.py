@@ -0,0 +1,113 @@
+import asyncio
+import random
+from fastapi import HTTPException
+from app.core.ai_policy import RuleBasedPolicy
+from app.core.game_reducer import new_game
+from app.core.game_rules import TimeoutPolicy
+from app.models.game_enums import ActionType, Character, GamePhase, MissionResult, VoteOption, EVIL_CHARACTERS
+from app.services.ai_engine import AIEngine, pending_ai_players
+from app.services.game_service import GameService
+from app.services.simulator import simulate_games
+
+def _game_in_phase(phase, team_roles):
+    game = new_game("g", list(range(1, 9)), {}, now=0.0, rng=random.Random(0))
+    by_role = {}
+    for p in game.players:
+        by_role.setdefault(p.character, []).append(p.user_id)
+    game.phase = phase
+    game.round = 4
+    game.proposed_team = [by_role[role].pop() for role in team_roles]
+    return game, {p.user_id: p for p in game.players}
+
+def test_rule_policy_uses_role_knowledge():
+    policy = RuleBasedPolicy()
+    rng = random.Random(0)
+
+    # 第 4 轮需要 2 张失败票：队伍中座位靠前的两名坏人投失败，其余坏人投成功
+    game, players = _game_in_phase(GamePhase.MISSION, [Character.MERLIN, Character.MORGANA, Character.ASSASSIN,
+                                                       Character.MINION, Character.SERVANT])
+    results = {uid: policy.decide(game, players[uid], rng)[1]["result"] for uid in game.proposed_team}
+    evil = sorted((players[uid] for uid in game.proposed_team if players[uid].character in EVIL_CHARACTERS),
+                  key=lambda p: p.seat_id)
+    assert [results[p.user_id] for p in evil] == [MissionResult.FAIL, MissionResult.FAIL, MissionResult.SUCCESS]
+    assert results[game.proposed_team[0]] == MissionResult.SUCCESS
+
+    # 梅林否决有坏人的队伍，普通忠臣看不到身份
+    game, players = _game_in_phase(GamePhase.VOTE, [Character.PERCIVAL, Character.MINION, Character.SERVANT])
+    merlin = next(p for p in game.players if p.character == Character.MERLIN)
+    assert policy.decide(game, merlin, rng) == (ActionType.VOTE, {"option": VoteOption.REJECT})
+    on_team = players[game.proposed_team[2]]
+    assert policy.decide(game, on_team, rng) == (ActionType.VOTE, {"option": VoteOption.APPROVE})
+    minion = players[game.proposed_team[1]]
+    assert policy.decide(game, minion, rng)[1]["option"] == VoteOption.APPROVE
+
+    # 全流程只产生合法动作
+    report = simulate_games("rule", 100, seed=1)
+    assert report.games == 100 and report.errors == 0
+
+def test_engine_acts_until_a_human_is_pending():
+    async def run():
+        engine = AIEngine(policy=RuleBasedPolicy(), rng=random.Random(0))
+        GameService.add_listener(engine.on_game_updated)
+        try:
+            game = await GameService.create_game(list(range(1, 9)), {}, ai_player_ids=list(range(2, 9)))
+            assert len(engine) == (0 if game.speaker_id == 1 else 1)
+
+            for _ in range(200):
+                game = await GameService.get_game(game.game_id)
+                if game.phase == GamePhase.FINISHED:
+                    break
+                if not pending_ai_players(game):
+                    # 轮到人类玩家：用兜底动作代替
+                    human = game.get_player(1)
+                    action = TimeoutPolicy.get_default_action(game, human)
+                    await GameService.process_action(game.game_id, 1, action["action_type"], action["payload"])
+                    continue
+                seq = game.seq
+                await engine.run_tick()
+                game = await GameService.get_game(game.game_id)
+                # 一个 tick 内连续执行所有 AI 动作，停在人类玩家或对局结束处
+                assert game.seq > seq
+                assert not pending_ai_players(game)
+            assert game.phase == GamePhase.FINISHED
+            assert len(engine) == 0
+        finally:
+            GameService.remove_listener(engine.on_game_updated)
+
+    asyncio.run(run())
+
+def test_engine_batches_across_games_and_retries(monkeypatch):
+    async def run():
+        engine = AIEngine(policy=RuleBasedPolicy(), rng=random.Random(0), max_batch_actions=10)
+        GameService.add_listener(engine.on_game_updated)
+        try:
+            games = [await GameService.create_game(list(range(1, 9)), {}, ai_player_ids=list(range(1, 9)))
+                     for _ in range(3)]
+            assert len(engine) == 3
+
+            submitted = []
+            original = GameService.process_actions
+
+            async def failing(game_id, actions):
+                submitted.append((game_id, len(actions)))
+                raise HTTPException(status_code=409, detail="conflict")
+
+            monkeypatch.setattr(GameService, "process_actions", failing)
+            await engine.run_tick()
+            # 每局一次提交，达到上限后在当前阶段的动作执行完时停止；失败的对局在下个 tick 重试
+            assert sorted(game_id for game_id, _ in submitted) == sorted(g.game_id for g in games)
+            assert all(10 <= count < 10 + 8 for _, count in submitted)
+            assert len(engine) == 3
+
+            monkeypatch.setattr(GameService, "process_actions", original)
+            for _ in range(100):
+                await engine.run_tick()
+                if not len(engine):
+                    break
+            for game in games:
+                state = await GameService.get_game(game.game_id)
+                assert state.phase == GamePhase.FINISHED
+        finally:
+            GameService.remove_listener(engine.on_game_updated)
+
+    asyncio.run(run())
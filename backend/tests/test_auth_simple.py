@@ -1,7 +1,7 @@
 from fastapi.testclient import TestClient
 from app.main import app
 from app.core.redis import get_redis
-from app.db.base import get_db
+from app.db.session import get_async_db
 from unittest.mock import AsyncMock, MagicMock
 from app.core.security import get_password_hash
 from app.models.user import User
@@ -14,8 +14,8 @@ async def override_get_redis():
     # Mock verification code for register if needed, but we test login here
     return mock
 
-# Mock DB
-def override_get_db():
+# Mock DB (AsyncSession)
+async def override_get_db():
     db = MagicMock()
     
     from datetime import datetime
@@ -23,25 +23,25 @@ def override_get_db():
     # user = User(id=1, username="testuser", email="test@example.com", hashed_password=get_password_hash("password123"), is_active=True)
     user = User(id=1, username="testuser", email="test@example.com", hashed_password="hashed_password_123", is_active=True, created_at=datetime.utcnow())
     
-    # Setup mock
-    query_mock = MagicMock()
-    db.query.return_value = query_mock
-    filter_mock = MagicMock()
-    query_mock.filter.return_value = filter_mock
-    filter_mock.first.return_value = user
+    # Setup mock: await db.execute(select(...)) -> result.scalars().first()
+    result_mock = MagicMock()
+    result_mock.scalars.return_value.first.return_value = user
+    db.execute = AsyncMock(return_value=result_mock)
+    # await db.get(User, id)
+    db.get = AsyncMock(return_value=user)
     
     yield db
 
-# Mock verify_password to match our fake hash
-def override_verify_password(plain, hashed):
-    return plain == "password123" and hashed == "hashed_password_123"
+# Mock verify_and_update_async to match our fake hash
+async def override_verify_password(plain, hashed):
+    return plain == "password123" and hashed == "hashed_password_123", None
 
 # Patch the function where it is USED, not just where it is defined
 from app.routers import auth
-auth.verify_password = override_verify_password
+auth.verify_and_update_async = override_verify_password
 
 app.dependency_overrides[get_redis] = override_get_redis
-app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_async_db] = override_get_db
 
 def test_login_and_me():
     print("Testing login...")
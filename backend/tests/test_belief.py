@@ -0,0 +1,118 @@
+import asyncio
+import random
+import numpy as np
+from app.core.ai_policy import BeliefPolicy
+from app.core.belief import (
+    EVIL_ON_TEAM, GameBelief, HYPOTHESES, HYPOTHESIS_MASKS, SEAT_EVIL, seat_mask
+)
+from app.core.game_reducer import new_game
+from app.models.game_enums import ActionType, Character, GamePhase, MissionResult, VoteOption, EVIL_CHARACTERS
+from app.services.ai_engine import AIEngine
+from app.services.belief_tracker import BeliefTracker
+from app.services.game_service import GameService
+
+def _game():
+    game = new_game("g", list(range(1, 9)), {}, now=0.0, rng=random.Random(4))
+    return game, {p.character: p for p in game.players}
+
+def test_precomputed_masks():
+    assert len(HYPOTHESES) == 56
+    # 每个座位在 C(7,2)=21 种假设中是坏人
+    assert SEAT_EVIL.sum(axis=1).tolist() == [21] * 8
+    team = seat_mask([0, 1, 2])
+    assert EVIL_ON_TEAM[team][HYPOTHESIS_MASKS == team].tolist() == [3]
+    assert (EVIL_ON_TEAM[team] == 0).sum() == 10  # C(5,3)
+
+def test_viewer_conditioning():
+    game, by_role = _game()
+    belief = GameBelief.from_game(game)
+    evil_seats = {p.seat_id for p in game.players if p.character in EVIL_CHARACTERS}
+
+    # 坏人与梅林知道真相
+    for role in (Character.ASSASSIN, Character.MERLIN):
+        posterior = belief.posterior(game, by_role[role])
+        assert posterior.max() == 1.0
+        assert set(HYPOTHESES[int(np.argmax(posterior))]) == evil_seats
+
+    # 派西维尔：梅林与莫甘娜恰好一名是坏人
+    percival = by_role[Character.PERCIVAL]
+    evil_prob = belief.evil_probabilities(game, percival)
+    assert evil_prob[percival.seat_id] == 0
+    assert evil_prob[by_role[Character.MERLIN].seat_id] + evil_prob[by_role[Character.MORGANA].seat_id] == 1.0
+
+    # 普通好人只排除自己
+    servant = next(p for p in game.players if p.character == Character.SERVANT)
+    assert np.count_nonzero(belief.posterior(game, servant)) == 35  # C(7,3)
+
+def test_observe_matches_batched_updates():
+    game, by_role = _game()
+    seats = {p.user_id: p.seat_id for p in game.players}
+    team = [by_role[Character.MERLIN].user_id, by_role[Character.MINION].user_id, by_role[Character.SERVANT].user_id]
+    approvers = {p.user_id for p in game.players if p.user_id in team or p.character in EVIL_CHARACTERS}
+
+    incremental = GameBelief.from_game(game)
+    incremental.observe(team[0], ActionType.PROPOSE, {"target_ids": team})
+    for p in game.players:
+        incremental.observe(p.user_id, ActionType.VOTE,
+                            {"option": "approve" if p.user_id in approvers else VoteOption.REJECT})
+    for uid in team:
+        result = MissionResult.FAIL if uid == by_role[Character.MINION].user_id else "success"
+        incremental.observe(uid, ActionType.MISSION, {"result": result})
+
+    direct = GameBelief.from_game(game)
+    team_mask = seat_mask(seats[uid] for uid in team)
+    direct.observe_votes(team_mask, seat_mask(seats[uid] for uid in approvers))
+    direct.observe_mission(team_mask, 1)
+
+    assert np.allclose(incremental.log_public, direct.log_public)
+    assert np.allclose(incremental.merlin_score, direct.merlin_score)
+    # 出现 1 张失败票后，队伍中没有坏人的假设被排除
+    assert np.all(np.isneginf(direct.log_public[EVIL_ON_TEAM[team_mask] == 0]))
+
+def test_belief_policy_decisions():
+    game, by_role = _game()
+    belief = GameBelief.from_game(game)
+    minion, merlin, servant = by_role[Character.MINION], by_role[Character.MERLIN], by_role[Character.SERVANT]
+
+    # 爪牙所在的队伍两次任务失败：好人提名时避开爪牙
+    for others in ([merlin], [by_role[Character.PERCIVAL]]):
+        belief.observe_mission(seat_mask([minion.seat_id] + [p.seat_id for p in others]), 1)
+    team = belief.best_team(game, servant, 3)
+    assert servant.user_id in team and minion.user_id not in team
+
+    # 梅林始终否决有坏人的队伍、赞成干净的队伍：刺客猜中梅林
+    evil = [p.seat_id for p in game.players if p.character in EVIL_CHARACTERS]
+    goods = [p for p in game.players if p.character not in EVIL_CHARACTERS]
+    for i in range(4):
+        dirty = seat_mask([evil[i % 3], goods[i % 5].seat_id])
+        clean = seat_mask([g.seat_id for g in goods[:2]])
+        belief.observe_votes(dirty, seat_mask(evil))
+        belief.observe_votes(clean, seat_mask(evil) | seat_mask(g.seat_id for g in goods))
+        belief.observe_votes(dirty, seat_mask(evil) | seat_mask(g.seat_id for g in goods if g is not merlin))
+    assassin = by_role[Character.ASSASSIN]
+    game.phase = GamePhase.ASSASSINATION
+    action_type, payload = BeliefPolicy().decide(game, assassin, random.Random(0), belief)
+    assert action_type == ActionType.ASSASSINATE and payload == {"target_id": merlin.user_id}
+
+def test_tracker_follows_engine_games():
+    async def run():
+        tracker = BeliefTracker()
+        engine = AIEngine(policy=BeliefPolicy(), rng=random.Random(0), beliefs=tracker)
+        GameService.add_listener(tracker.on_game_updated)
+        GameService.add_listener(engine.on_game_updated)
+        try:
+            game = await GameService.create_game(list(range(1, 9)), {}, ai_player_ids=list(range(1, 9)))
+            assert tracker.get(game.game_id) is not None
+            for _ in range(100):
+                await engine.run_tick()
+                if not len(engine):
+                    break
+            state = await GameService.get_game(game.game_id)
+            assert state.phase == GamePhase.FINISHED
+            # 对局结束后不再保留信念
+            assert tracker.get(game.game_id) is None and len(tracker) == 0
+        finally:
+            GameService.remove_listener(engine.on_game_updated)
+            GameService.remove_listener(tracker.on_game_updated)
+
+    asyncio.run(run())
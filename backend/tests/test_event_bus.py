@@ -0,0 +1,63 @@
+import asyncio
+from app.services.event_bus import RedisEventBus
+from app.services.game_store import RedisGameStore
+from app.schemas.game import GameState, PlayerState
+from app.models.game_enums import GamePhase
+
+class StubPipeline:
+    def __init__(self, published):
+        self.published = published
+        self.batch = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+    def publish(self, channel, data):
+        self.batch.append((channel, data))
+
+    async def execute(self):
+        self.published.append(self.batch)
+
+class StubRedis:
+    def __init__(self):
+        self.published = []
+
+    def pipeline(self, transaction=False):
+        return StubPipeline(self.published)
+
+def create_mock_game(game_id, version):
+    players = [PlayerState(user_id=i, username=f"u{i}", seat_id=i - 1) for i in range(1, 9)]
+    return GameState(game_id=game_id, phase=GamePhase.SPEECH, players=players, version=version)
+
+def test_updates_coalesced_into_one_pipeline():
+    async def run():
+        redis = StubRedis()
+        bus = RedisEventBus(client=redis, channel_prefix="ch:", flush_interval=0.01, worker_id="w1")
+        bus.on_game_updated(create_mock_game("g1", 1), None)
+        bus.on_game_updated(create_mock_game("g1", 2), None)
+        bus.on_game_updated(create_mock_game("g2", 1), None)
+        await asyncio.sleep(0.05)
+
+        # 一次 pipeline，每局一条消息，且只保留最新版本
+        assert len(redis.published) == 1
+        batch = dict(redis.published[0])
+        assert set(batch) == {"ch:g1", "ch:g2"}
+        assert RedisGameStore.deserialize(batch["ch:g1"].partition(b"|")[2]).version == 2
+
+    asyncio.run(run())
+
+def test_remote_messages_dispatched_and_own_ignored():
+    received = []
+    local = RedisEventBus(client=StubRedis(), worker_id="w1")
+    remote = RedisEventBus(client=StubRedis(), worker_id="w2")
+    local.add_handler(lambda game, record: received.append(game))
+
+    game = create_mock_game("g1", 3)
+    local.handle_message(local.encode(game))
+    assert received == []
+
+    local.handle_message(remote.encode(game))
+    assert received == [game]
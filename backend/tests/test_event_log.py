@@ -0,0 +1,146 @@
+import asyncio
+from sqlalchemy.exc import OperationalError
+from app.services.event_log import EventWriteBehind
+from app.services.game_service import GameService
+from app.models.game_enums import ActionType
+from app.schemas.game import GameActionRecord
+
+def _record(seq: int) -> GameActionRecord:
+    return GameActionRecord(game_id="g", seq=seq, user_id=1, action_type=ActionType.SPEAK, payload={}, ts=0.0)
+
+def test_actions_are_batched_into_event_log():
+    async def run():
+        batches = []
+
+        async def writer(rows, snapshots):
+            batches.append(rows)
+
+        log = EventWriteBehind(writer=writer, flush_interval=60, batch_size=100)
+        GameService.add_listener(log.on_game_updated)
+        try:
+            game = await GameService.create_game(list(range(1, 9)), {})
+            # 创建对局本身不是动作，不记录事件，只记录初始快照
+            assert log.pending == 0 and log.pending_snapshots == 1
+
+            for _ in range(3):
+                current = await GameService.get_game(game.game_id)
+                await GameService.process_action(game.game_id, current.speaker_id, ActionType.SPEAK, {})
+
+            # 动作不等待落库
+            assert log.pending == 3 and batches == []
+            await log.flush()
+        finally:
+            GameService.remove_listener(log.on_game_updated)
+
+        assert len(batches) == 1
+        assert [row["seq"] for row in batches[0]] == [1, 2, 3]
+        assert all(row["game_id"] == game.game_id for row in batches[0])
+        assert batches[0][0]["action_type"] == ActionType.SPEAK.value
+
+    asyncio.run(run())
+
+def test_flush_when_batch_size_reached():
+    async def run():
+        batches = []
+
+        async def writer(rows, snapshots):
+            batches.append(rows)
+
+        log = EventWriteBehind(writer=writer, flush_interval=60, batch_size=2)
+        log.start()
+        try:
+            log.append(_record(1))
+            await asyncio.sleep(0.01)
+            assert batches == []
+
+            log.append(_record(2))
+            await asyncio.sleep(0.01)
+            assert [[row["seq"] for row in rows] for rows in batches] == [[1, 2]]
+        finally:
+            await log.stop()
+
+    asyncio.run(run())
+
+def test_failed_flush_requeues_rows():
+    async def run():
+        written = []
+        fail = [True]
+
+        async def writer(rows, snapshots):
+            if fail[0]:
+                raise RuntimeError("db down")
+            written.extend(rows)
+
+        log = EventWriteBehind(writer=writer, flush_interval=60, batch_size=10, max_buffer=3)
+        for seq in range(1, 5):
+            log.append(_record(seq))
+        # 超出缓冲上限时丢弃最旧的事件
+        assert log.pending == 3 and log.dropped == 1
+
+        await log.flush()
+        assert log.pending == 3 and written == []
+
+        fail[0] = False
+        await log.stop()
+        assert [row["seq"] for row in written] == [2, 3, 4]
+        assert log.pending == 0
+
+    asyncio.run(run())
+
+def test_rows_that_keep_failing_are_dead_lettered():
+    async def run():
+        written = []
+        db_down = [True]
+
+        async def writer(rows, snapshots):
+            if db_down[0]:
+                raise OperationalError("INSERT", {}, ConnectionRefusedError())
+            if any(row["seq"] == 2 for row in rows):
+                raise ValueError("bad row")
+            written.extend(row["seq"] for row in rows)
+
+        log = EventWriteBehind(writer=writer, flush_interval=60, batch_size=10, max_retries=2)
+        for seq in range(1, 5):
+            log.append(_record(seq))
+        # 数据库不可用不计入重试次数，事件一直保留
+        for _ in range(5):
+            await log.flush()
+        assert log.pending == 4 and log.dead_lettered == 0
+
+        # 无法写入的行不会永远阻塞后续事件
+        db_down[0] = False
+        await log.flush()
+        assert log.pending == 4 and written == []
+        await log.flush()
+        assert written == [1, 3, 4]
+        assert log.pending == 0 and log.dead_lettered == 1
+
+        log.append(_record(5))
+        await log.flush()
+        assert written == [1, 3, 4, 5]
+
+    asyncio.run(run())
+
+def test_snapshot_every_interval():
+    async def run():
+        written = []
+
+        async def writer(rows, snapshots):
+            written.extend(snapshots)
+
+        log = EventWriteBehind(writer=writer, flush_interval=60, batch_size=100, snapshot_interval=2)
+        GameService.add_listener(log.on_game_updated)
+        try:
+            game = await GameService.create_game(list(range(1, 9)), {})
+            for _ in range(5):
+                current = await GameService.get_game(game.game_id)
+                await GameService.process_action(game.game_id, current.speaker_id, ActionType.SPEAK, {})
+            await log.flush()
+        finally:
+            GameService.remove_listener(log.on_game_updated)
+
+        assert [row["seq"] for row in written] == [0, 2, 4]
+        assert all(row["game_id"] == game.game_id for row in written)
+        assert [row["version"] for row in written] == [1, 3, 5]
+
+    asyncio.run(run())
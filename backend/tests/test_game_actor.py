@@ -0,0 +1,54 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+from app.services.game_service import GameService
+from app.services.game_actor import GameActorRegistry
+from app.models.game_enums import GamePhase, ActionType
+
+def test_actions_within_game_are_serialized():
+    async def run():
+        game = await GameService.create_game(list(range(1, 9)), {})
+        # 按座位顺序依次发言：动作按投递顺序串行执行，才能全部合法
+        speakers = [p.user_id for p in game.players]
+        results = await asyncio.gather(*[
+            GameService.process_action(game.game_id, uid, ActionType.SPEAK, {})
+            for uid in speakers
+        ])
+        final = await GameService.get_game(game.game_id)
+        assert final.phase == GamePhase.TEAM_PROPOSAL
+        assert final.seq == 8
+        assert len(results) == 8
+
+    asyncio.run(run())
+
+def test_failed_action_does_not_consume_seq():
+    async def run():
+        game = await GameService.create_game(list(range(1, 9)), {})
+        not_speaker = game.players[1].user_id
+        with pytest.raises(HTTPException):
+            await GameService.process_action(game.game_id, not_speaker, ActionType.SPEAK, {})
+        assert (await GameService.get_game(game.game_id)).seq == 0
+
+    asyncio.run(run())
+
+def test_games_run_in_parallel():
+    async def run():
+        registry = GameActorRegistry(idle_timeout=0.05)
+        order = []
+
+        async def slow():
+            await asyncio.sleep(0.05)
+            order.append("slow")
+
+        async def fast():
+            order.append("fast")
+
+        # 不同对局互不阻塞：fast 不需要等待 slow 完成
+        await asyncio.gather(registry.submit("g1", slow), registry.submit("g2", fast))
+        assert order == ["fast", "slow"]
+
+        # 空闲超时后 Actor 自动退出
+        await asyncio.sleep(0.1)
+        assert len(registry) == 0
+
+    asyncio.run(run())
@@ -0,0 +1,174 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from app.main import app
+from app.core.config import settings
+from app.core.deps import get_current_user
+from app.db.session import get_async_db
+from app.models.game_enums import ActionType, GamePhase
+from app.models.user import User
+from app.services.event_log import EventWriteBehind
+from app.services.game_service import GameService
+
+AI_IDS = list(range(2, 9))
+
+def _speech_order(game):
+    """从当前发言者开始按座位顺序的整轮发言"""
+    order = []
+    player = game.get_player(game.speaker_id)
+    while True:
+        order.append((player.user_id, ActionType.SPEAK, {}))
+        player = game.next_player(player.user_id)
+        if player.user_id == game.leader_id:
+            return order
+
+def test_batch_applies_in_one_write():
+    async def run():
+        records = []
+
+        def listener(game, record):
+            records.append((record.seq, game.seq))
+
+        game = await GameService.create_game(list(range(1, 9)), {}, ai_player_ids=AI_IDS)
+        assert [p.is_ai for p in sorted(game.players, key=lambda p: p.user_id)] == [False] + [True] * 7
+        version = game.version
+
+        GameService.add_listener(listener)
+        try:
+            updated = await GameService.process_actions(game.game_id, _speech_order(game))
+        finally:
+            GameService.remove_listener(listener)
+
+        assert updated.phase == GamePhase.TEAM_PROPOSAL
+        assert updated.seq == 8
+        # 整批只写入一次，每个动作各通知一次（均为最终状态）
+        assert updated.version == version + 1
+        assert records == [(seq, 8) for seq in range(1, 9)]
+
+    asyncio.run(run())
+
+def test_batch_is_atomic():
+    async def run():
+        game = await GameService.create_game(list(range(1, 9)), {})
+        before = game.model_copy(deep=True)
+        actions = _speech_order(game)
+        # 第 3 个动作由错误的玩家提交
+        actions[2] = (actions[4][0], ActionType.SPEAK, {})
+
+        with pytest.raises(HTTPException) as exc:
+            await GameService.process_actions(game.game_id, actions)
+        assert exc.value.status_code == 403
+        assert exc.value.detail.startswith("第 3 个动作")
+
+        assert await GameService.get_game(game.game_id) == before
+
+    asyncio.run(run())
+
+def test_batch_snapshot_uses_final_state():
+    async def run():
+        snapshots = []
+
+        async def writer(rows, snaps):
+            snapshots.extend(snaps)
+
+        log = EventWriteBehind(writer=writer, flush_interval=60, batch_size=100, snapshot_interval=3)
+        game = await GameService.create_game(list(range(1, 9)), {})
+        GameService.add_listener(log.on_game_updated)
+        try:
+            await GameService.process_actions(game.game_id, _speech_order(game))
+        finally:
+            GameService.remove_listener(log.on_game_updated)
+        assert log.pending == 8
+        await log.flush()
+        # 跨过了 seq 3 与 6 两个快照点，但只在整批结束时记录一次
+        assert [s["seq"] for s in snapshots] == [8]
+
+    asyncio.run(run())
+
+def test_batch_endpoint_permissions(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    monkeypatch.setattr(settings, "AI_OPERATOR_USER_IDS", [999])
+    client = TestClient(app)
+    current = {}
+    previous = app.dependency_overrides.get(get_current_user)
+    app.dependency_overrides[get_current_user] = lambda: User(id=current["id"], username="u", email="u@example.com", is_active=True)
+
+    async def create():
+        return await GameService.create_game(list(range(1, 9)), {}, ai_player_ids=AI_IDS)
+
+    try:
+        game = asyncio.run(create())
+        order = _speech_order(game)
+        body = {"actions": [{"user_id": uid, "action_type": t.value, "payload": p} for uid, t, p in order]}
+        url = f"/api/v1/games/{game.game_id}/actions/batch"
+
+        # 普通玩家不能代其他座位提交
+        current["id"] = 1
+        assert client.post(url, json=body).status_code == 403
+
+        # AI 编排账号不能代人类座位提交
+        current["id"] = 999
+        assert client.post(url, json=body).status_code == 403
+
+        # 人类玩家先发言（如果轮到），随后 AI 编排账号一次提交之后连续的 AI 发言
+        human_turns = 0
+        if order[0][0] == 1:
+            current["id"] = 1
+            response = client.post(url, json={"actions": body["actions"][:1]})
+            assert response.status_code == 200
+            # 玩家拿到本人视角
+            assert sum(p["character"] is not None for p in response.json()["players"]) >= 1
+            human_turns = 1
+        ai_actions = []
+        for action in body["actions"][human_turns:]:
+            if action["user_id"] == 1:
+                break
+            ai_actions.append(action)
+
+        current["id"] = 999
+        response = client.post(url, json={"actions": ai_actions})
+        assert response.status_code == 200
+        data = response.json()
+        # AI 编排账号只拿到公开视角：看不到任何身份与未公开的任务牌
+        assert all(p["character"] is None for p in data["players"])
+        assert data["pending_mission_results"] == []
+        assert data["seq"] == human_turns + len(ai_actions)
+    finally:
+        if previous is None:
+            app.dependency_overrides.pop(get_current_user, None)
+        else:
+            app.dependency_overrides[get_current_user] = previous
+
+def test_ai_seats_cannot_take_over_other_users(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    monkeypatch.setattr(settings, "AI_BOT_USER_IDS", [7])
+    client = TestClient(app)
+    # 已注册的账号：1 为创建者，2、3 为其他真人（3 已停用），7 为机器人账号；其余为未注册的占位座位
+    rows = [(1, "me", True), (2, "alice", True), (3, "bob", False), (7, "bot", True)]
+
+    async def override_get_db():
+        db = MagicMock()
+        result = MagicMock()
+        result.all.return_value = rows
+        db.execute = AsyncMock(return_value=result)
+        yield db
+
+    overrides = dict(app.dependency_overrides)
+    app.dependency_overrides[get_current_user] = lambda: User(id=1, username="me", email="me@example.com", is_active=True)
+    app.dependency_overrides[get_async_db] = override_get_db
+    try:
+        url = "/api/v1/games/"
+        players = list(range(1, 9))
+        response = client.post(url, json={"player_ids": players, "ai_player_ids": [2, 5]})
+        assert response.status_code == 403
+        assert "[2]" in response.json()["detail"]
+
+        response = client.post(url, json={"player_ids": players, "ai_player_ids": [1, 3, 4, 5, 6, 7, 8]})
+        assert response.status_code == 200
+        ai_ids = {p["user_id"] for p in response.json()["initial_state"]["players"] if p["is_ai"]}
+        assert ai_ids == {1, 3, 4, 5, 6, 7, 8}
+    finally:
+        app.dependency_overrides.clear()
+        app.dependency_overrides.update(overrides)
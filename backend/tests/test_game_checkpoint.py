@@ -0,0 +1,107 @@
+import asyncio
+import random
+import time
+from app.core.ai_policy import RandomPolicy
+from app.core.game_reducer import apply_action, new_game
+from app.core.game_rules import TimeoutPolicy
+from app.models.game_enums import GamePhase
+import app.services.game_checkpoint as game_checkpoint
+from app.services.game_checkpoint import GameCheckpointer, checkpoint_saved_at
+from app.services.game_store import BytesColdTier, MemoryGameStore
+
+def _games(count, seed=0):
+    """随机推进到不同阶段的对局"""
+    rng = random.Random(seed)
+    policy = RandomPolicy()
+    games = []
+    for i in range(count):
+        game = new_game(f"g{i}", list(range(1, 9)), {}, now=1000.0, rng=rng)
+        target = rng.randint(0, 150)
+        while game.seq < target and game.phase != GamePhase.FINISHED:
+            for player in TimeoutPolicy.get_pending_players(game):
+                action_type, payload = policy.decide(game, player, rng)
+                apply_action(game, player.user_id, action_type, payload, 1000.0)
+                game.seq += 1
+        games.append(game)
+    return games
+
+def test_checkpoint_restores_live_and_cold_games(tmp_path):
+    async def run():
+        path = str(tmp_path / "games.snapshot")
+        store = MemoryGameStore(cold=BytesColdTier())
+        games = _games(30)
+        for game in games:
+            await store.save(game, expected_version=0)
+        # 一部分对局在冷存储中
+        assert store.evict(time.time() + 10, finished_grace_seconds=0, idle_seconds=1e9, limit=100) > 0
+        hot_ids = {game.game_id for game in store.games()}
+        assert await GameCheckpointer(store, path=path).checkpoint() == len(games)
+
+        restored_store = MemoryGameStore(cold=BytesColdTier())
+        restored = GameCheckpointer(restored_store, path=path).restore(now=checkpoint_saved_at(path))
+        assert {game.game_id for game in restored} == hot_ids
+        assert len(restored_store) == len(hot_ids)
+        assert len(restored_store.cold) == len(games) - len(hot_ids)
+        for game in games:
+            assert await restored_store.get(game.game_id) == game
+        # 恢复后的对局可以继续按版本号写入
+        loaded = await restored_store.get("g0")
+        assert await restored_store.save(loaded, expected_version=loaded.version)
+
+    asyncio.run(run())
+
+def test_checkpoint_reencodes_only_changed_games(tmp_path, monkeypatch):
+    async def run():
+        store = MemoryGameStore()
+        for game in _games(5):
+            await store.save(game, expected_version=0)
+        checkpointer = GameCheckpointer(store, path=str(tmp_path / "games.snapshot"))
+        await checkpointer.checkpoint()
+
+        encoded = []
+        original = game_checkpoint.encode_game
+        monkeypatch.setattr(game_checkpoint, "encode_game", lambda game: encoded.append(game.game_id) or original(game))
+        game = await store.get("g2")
+        await store.save(game, expected_version=game.version)
+        await checkpointer.checkpoint()
+        assert encoded == ["g2"]
+
+    asyncio.run(run())
+
+def test_restore_does_not_count_downtime_against_players(tmp_path):
+    async def run():
+        path = str(tmp_path / "games.snapshot")
+        store = MemoryGameStore()
+        games = [game for game in _games(20) if game.phase != GamePhase.FINISHED]
+        for game in games:
+            game.phase_start_time = time.time() - 5
+            await store.save(game, expected_version=0)
+        checkpointer = GameCheckpointer(store, path=path)
+        await checkpointer.checkpoint()
+
+        # 停机时间远超行动时限：恢复后仍按停机前剩余的时间计时，而不是立即全部超时
+        downtime = TimeoutPolicy.TIMEOUT_SECONDS * 10
+        now = checkpoint_saved_at(path) + downtime
+        restored_store = MemoryGameStore()
+        restored_checkpointer = GameCheckpointer(restored_store, path=path)
+        restored = restored_checkpointer.restore(now=now)
+        assert len(restored) == len(games)
+        for game in restored:
+            assert not TimeoutPolicy.is_timed_out(game, now)
+            assert abs(now - game.phase_start_time - 5) < 1
+
+        # 顺延后的时间写入下一份快照，再次重启不会重复顺延
+        await restored_checkpointer.checkpoint()
+        again = GameCheckpointer(MemoryGameStore(), path=path).restore(now=checkpoint_saved_at(path))
+        shifted = {game.game_id: game.phase_start_time for game in restored}
+        assert all(game.phase_start_time == shifted[game.game_id] for game in again)
+
+    asyncio.run(run())
+
+def test_missing_or_corrupt_checkpoint_does_not_block_startup(tmp_path):
+    path = tmp_path / "games.snapshot"
+    assert GameCheckpointer(MemoryGameStore(), path=str(path)).restore() == []
+    path.write_bytes(b"not a checkpoint file")
+    store = MemoryGameStore()
+    assert GameCheckpointer(store, path=str(path)).restore() == []
+    assert len(store) == 0
@@ -0,0 +1,89 @@
+import random
+import pytest
+import uuid
+from app.core.ai_policy import RandomPolicy
+from app.core.game_codec import FORMAT_V1, decode_game, encode_game
+from app.core.game_reducer import apply_action, new_game
+from app.core.game_rules import TimeoutPolicy
+from app.models.game_enums import GamePhase, MissionResult, VoteOption
+from app.schemas.game import GameState, PlayerState
+from app.services.game_store import RedisGameStore
+
+def _states(seed):
+    """随机策略推进一局，产出每个动作之后的状态"""
+    rng = random.Random(seed)
+    policy = RandomPolicy()
+    game = new_game(str(uuid.UUID(int=rng.getrandbits(128))), list(range(1, 9)),
+                    {1: "alice", 5: "测试"}, now=1.7e9 + seed, rng=rng, ai_player_ids=[2, 7])
+    yield game
+    while game.phase != GamePhase.FINISHED:
+        for player in TimeoutPolicy.get_pending_players(game):
+            action_type, payload = policy.decide(game, player, rng)
+            apply_action(game, player.user_id, action_type, payload, 1.7e9 + game.seq)
+            game.seq += 1
+            game.version += 1
+            yield game
+
+def test_round_trip_every_state():
+    for seed in range(20):
+        for game in _states(seed):
+            data = encode_game(game)
+            assert data[0] == FORMAT_V1
+            decoded = decode_game(data)
+            assert decoded == game
+            assert decoded.model_dump() == game.model_dump()
+            # 解码结果的索引可用
+            assert decoded.get_player(game.players[3].user_id).seat_id == game.players[3].seat_id
+
+def test_binary_is_over_ten_times_smaller():
+    for game in _states(1):
+        if game.round >= 3:
+            break
+    json_size = len(game.model_dump_json(exclude_defaults=True))
+    assert len(encode_game(game)) * 10 < json_size
+
+def test_legacy_json_is_decoded():
+    for game in _states(2):
+        pass
+    legacy = game.model_dump_json(exclude_defaults=True).encode("utf-8")
+    assert decode_game(legacy) == game
+
+def test_unencodable_state_falls_back_to_json():
+    players = [PlayerState(user_id=i, username=f"User_{i}", seat_id=i - 1) for i in range(1, 9)]
+    game = GameState(game_id="custom id", phase=GamePhase.VOTE, players=players,
+                     proposed_team=[1, 99], votes={1: VoteOption.APPROVE, 42: VoteOption.REJECT})
+    data = encode_game(game)
+    assert data[:1] == b"{"
+    assert decode_game(data) == game
+
+    # 非 UUID 的 game_id、不在对局中的提名仍可用二进制表达
+    game.votes = {1: VoteOption.APPROVE}
+    data = encode_game(game)
+    assert data[0] == FORMAT_V1
+    assert decode_game(data) == game
+
+def test_vote_and_mission_values_round_trip_exactly():
+    players = [PlayerState(user_id=i, username=f"User_{i}", seat_id=i - 1) for i in range(1, 9)]
+    # 动作 payload 中的原始字符串与枚举值都能原样往返
+    game = GameState(game_id="g", phase=GamePhase.MISSION, players=players, proposed_team=[1, 2, 3],
+                     votes={1: "approve", 2: "reject", 3: VoteOption.APPROVE},
+                     mission_results=[MissionResult.FAIL, "success"], pending_mission_results=["fail", "success"])
+    data = encode_game(game)
+    assert data[0] == FORMAT_V1
+    decoded = decode_game(data)
+    assert decoded.votes == {1: VoteOption.APPROVE, 2: VoteOption.REJECT, 3: VoteOption.APPROVE}
+    assert decoded.mission_results == [MissionResult.FAIL, MissionResult.SUCCESS]
+    assert decoded.pending_mission_results == [MissionResult.FAIL, MissionResult.SUCCESS]
+
+    # 枚举之外的值不能用二进制表达（不会被当成反对票或成功悄悄改写）
+    game.votes = {1: "maybe"}
+    with pytest.warns(UserWarning):
+        assert encode_game(game)[:1] == b"{"
+    game.votes = {1: VoteOption.REJECT}
+    game.pending_mission_results = [None]
+    assert encode_game(game)[:1] == b"{"
+
+def test_store_serialization_uses_codec():
+    game = next(_states(3))
+    assert RedisGameStore.serialize(game) == encode_game(game)
+    assert RedisGameStore.deserialize(RedisGameStore.serialize(game)) == game
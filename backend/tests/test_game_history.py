@@ -0,0 +1,96 @@
+import random
+import numpy as np
+from app.core.ai_policy import RandomPolicy
+from app.core.belief import GameBelief
+from app.core.game_history import approval_matrix, approval_rate, mission_history, team_counts, vote_history
+from app.core.game_reducer import apply_action, new_game
+from app.core.game_rules import TimeoutPolicy
+from app.models.game_enums import ActionType, GamePhase, MissionResult, VoteOption
+from app.services.game_store import RedisGameStore
+
+def _play(seed, stop=None):
+    """用随机策略推进对局，返回 (状态, 已执行的动作)；stop(game) 为真时提前停止"""
+    rng = random.Random(seed)
+    policy = RandomPolicy()
+    game = new_game("g", list(range(1, 9)), {}, now=0.0, rng=rng)
+    actions = []
+    while game.phase != GamePhase.FINISHED and not (stop and stop(game)):
+        for player in TimeoutPolicy.get_pending_players(game):
+            action_type, payload = policy.decide(game, player, rng)
+            apply_action(game, player.user_id, action_type, payload, 0.0)
+            game.seq += 1
+            actions.append((player.user_id, action_type, payload))
+            if stop and stop(game):
+                break
+    return game, actions
+
+def _expected(game, actions):
+    """逐条扫描动作得到的投票与任务历史"""
+    seats = {p.user_id: p.seat_id for p in game.players}
+    votes, missions = [], []
+    team, approves, voted, fails, submitted = 0, 0, 0, 0, 0
+    for user_id, action_type, payload in actions:
+        if action_type == ActionType.PROPOSE:
+            team = sum(1 << seats[uid] for uid in payload["target_ids"])
+            approves, voted = 0, 0
+        elif action_type == ActionType.VOTE:
+            approves |= (payload["option"] == VoteOption.APPROVE) << seats[user_id]
+            voted += 1
+            if voted == 8:
+                votes.append((team, approves))
+        elif action_type == ActionType.MISSION:
+            submitted += 1
+            fails += payload["result"] == MissionResult.FAIL
+            if submitted == bin(team).count("1"):
+                missions.append((team, fails))
+                fails, submitted = 0, 0
+    return votes, missions
+
+def test_history_matches_action_log():
+    for seed in range(20):
+        game, actions = _play(seed)
+        votes, missions = _expected(game, actions)
+
+        teams, approves = vote_history(game)
+        assert list(zip(teams.tolist(), approves.tolist())) == votes
+        assert [(team, fails) for _, team, fails in mission_history(game)] == missions
+
+        matrix = approval_matrix(game)
+        for voter in range(8):
+            for member in range(8):
+                approved = sum(1 for t, a in votes if t >> member & 1 and a >> voter & 1)
+                assert matrix[voter, member] == approved
+        assert approval_rate(game, 3, 5) == (matrix[3, 5], sum(1 for t, _ in votes if t >> 5 & 1))
+        assert team_counts(game).tolist() == [sum(1 for t, _ in votes if t >> s & 1) for s in range(8)]
+
+        # 历史随状态一起序列化
+        assert RedisGameStore.deserialize(RedisGameStore.serialize(game)) == game
+
+def test_unresolved_vote_is_excluded():
+    game, actions = _play(3, stop=lambda g: g.phase == GamePhase.VOTE and 0 < g.votes_cast < 8)
+    votes, _ = _expected(game, actions)
+    teams, _ = vote_history(game)
+    assert len(teams) == len(votes)
+    assert game.team_history[game.current_slot] != 0
+
+def test_belief_from_history_matches_incremental():
+    for seed in range(10):
+        for stop in (None,
+                     lambda g: g.phase == GamePhase.VOTE and g.votes_cast == 5,
+                     lambda g: g.phase == GamePhase.MISSION and g.mission_submitted == 1):
+            game, actions = _play(seed, stop=stop)
+            incremental = GameBelief.from_game(game)
+            for user_id, action_type, payload in actions:
+                incremental.observe(user_id, action_type, payload)
+            rebuilt = GameBelief.from_history(game)
+            assert np.allclose(incremental.log_public, rebuilt.log_public)
+            assert np.allclose(incremental.merlin_score, rebuilt.merlin_score)
+
+            # 重建后继续输入动作，结果仍然一致
+            if game.phase != GamePhase.FINISHED:
+                rng = random.Random(seed)
+                player = TimeoutPolicy.get_pending_players(game)[0]
+                action_type, payload = RandomPolicy().decide(game, player, rng)
+                incremental.observe(player.user_id, action_type, payload)
+                rebuilt.observe(player.user_id, action_type, payload)
+                assert np.allclose(incremental.log_public, rebuilt.log_public)
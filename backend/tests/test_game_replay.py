@@ -0,0 +1,127 @@
+import asyncio
+import random
+from app.core.game_reducer import replay
+from app.core.game_rules import TimeoutPolicy
+from app.models.game_enums import ActionType, GamePhase, MissionResult, VoteOption
+from app.services import game_replay as replay_module
+from app.services.event_log import EventWriteBehind
+from app.services.game_replay import GameReplay, restore
+from app.services.game_service import GameService
+from app.services.game_view import build_player_view, mask_event
+
+async def _play(actions: int, snapshot_interval: int):
+    """用兜底动作推进一局，返回 (最终状态, 事件行, 快照行)"""
+    rows, snapshots = [], []
+
+    async def writer(r, s):
+        rows.extend(r)
+        snapshots.extend(s)
+
+    log = EventWriteBehind(writer=writer, flush_interval=60, batch_size=1000, snapshot_interval=snapshot_interval)
+    GameService.add_listener(log.on_game_updated)
+    rng = random.Random(7)
+    try:
+        game = await GameService.create_game(list(range(1, 9)), {})
+        for _ in range(actions):
+            if game.phase == GamePhase.FINISHED:
+                break
+            player = TimeoutPolicy.get_pending_players(game)[0]
+            action = TimeoutPolicy.get_default_action(game, player)
+            if action["action_type"] == ActionType.VOTE:
+                action["payload"] = {"option": rng.choice([VoteOption.APPROVE, VoteOption.REJECT])}
+            game = await GameService.process_action(game.game_id, player.user_id, action["action_type"], action["payload"])
+        await log.flush()
+    finally:
+        GameService.remove_listener(log.on_game_updated)
+    return game, rows, snapshots
+
+def test_replay_from_genesis_matches_live_state():
+    async def run():
+        game, rows, snapshots = await _play(60, snapshot_interval=0)
+        # 只有开局快照
+        assert [s["seq"] for s in snapshots] == [0]
+
+        records = [replay_module.row_to_record(row) for row in rows]
+        rebuilt = restore(snapshots[0]["state"], snapshots[0]["version"], records)
+        assert rebuilt == game
+
+        # 回放不修改起点状态
+        genesis = restore(snapshots[0]["state"], snapshots[0]["version"], [])
+        assert replay(genesis, records[:10]).seq == 10
+        assert genesis.seq == 0
+
+    asyncio.run(run())
+
+def test_state_at_uses_nearest_snapshot(monkeypatch):
+    async def run():
+        game, rows, snapshots = await _play(60, snapshot_interval=20)
+        assert [s["seq"] for s in snapshots] == [0, 20, 40, 60]
+        loaded = []
+
+        async def load_snapshot(game_id, seq):
+            found = [s for s in snapshots if seq is None or s["seq"] <= seq]
+            s = found[-1]
+            return s["seq"], s["version"], s["state"]
+
+        async def load_events(game_id, after, until, limit):
+            result = [r for r in rows if r["seq"] > after and (until is None or r["seq"] <= until)]
+            loaded.append(len(result))
+            return result
+
+        monkeypatch.setattr(replay_module, "_load_snapshot", load_snapshot)
+        monkeypatch.setattr(replay_module, "_load_events", load_events)
+        service = GameReplay()
+
+        # 最新状态：从最后一个快照开始，无需回放
+        assert await service.state_at(game.game_id) == game
+        assert loaded == [0]
+
+        # 历史状态：最近快照 + 短尾巴，并发请求共享一次加载
+        results = await asyncio.gather(*(service.state_at(game.game_id, 45) for _ in range(10)))
+        assert loaded == [0, 5]
+        assert all(r is results[0] for r in results)
+        assert results[0].seq == 45
+
+        # 已缓存
+        assert await service.state_at(game.game_id, 45) is results[0]
+        assert loaded == [0, 5]
+
+    asyncio.run(run())
+
+def test_mission_events_are_masked():
+    async def run():
+        game, rows, _ = await _play(200, snapshot_interval=0)
+        records = [replay_module.row_to_record(row) for row in rows]
+        missions = [r for r in records if r.action_type == ActionType.MISSION]
+        assert missions and all("result" in r.payload for r in missions)
+        assert all(mask_event(r).payload == {} for r in missions)
+        votes = [r for r in records if r.action_type == ActionType.VOTE]
+        assert all(mask_event(r) is r for r in votes)
+
+    asyncio.run(run())
+
+def test_replay_mid_mission_does_not_reveal_cards():
+    async def run():
+        game, rows, snapshots = await _play(200, snapshot_interval=0)
+        records = [replay_module.row_to_record(row) for row in rows]
+        genesis = restore(snapshots[0]["state"], snapshots[0]["version"], [])
+        checked = 0
+        for k, record in enumerate(records):
+            state = replay(genesis, records[:k + 1])
+            if record.action_type != ActionType.MISSION or state.phase != GamePhase.MISSION:
+                continue
+            # 把第 k 个任务牌换成相反的结果：任务尚未结算时，任何非结算视角都看不出区别
+            flipped_result = MissionResult.FAIL if record.payload["result"] == MissionResult.SUCCESS else MissionResult.SUCCESS
+            flipped = record.model_copy(update={"payload": {"result": flipped_result}})
+            other = replay(genesis, records[:k] + [flipped])
+            before = replay(genesis, records[:k])
+            for viewer in state.players:
+                view = build_player_view(state, viewer)
+                assert view.pending_mission_results == []
+                assert view.pending_mission_count == len(state.pending_mission_results)
+                assert view == build_player_view(other, other.get_player(viewer.user_id))
+                assert view.pending_mission_count == build_player_view(before, before.get_player(viewer.user_id)).pending_mission_count + 1
+            checked += 1
+        assert checked > 0
+
+    asyncio.run(run())
@@ -75,3 +75,19 @@ def test_mission_good_fail():
     with pytest.raises(HTTPException) as exc:
         GameRuleValidator.validate_action(game, 1, ActionType.MISSION, {"result": "fail"})
     assert "好人阵营只能投任务成功" in exc.value.detail
+
+def test_vote_and_mission_values_are_validated():
+    game = create_mock_game(GamePhase.VOTE)
+    GameRuleValidator.validate_action(game, 1, ActionType.VOTE, {"option": "approve"})
+    for payload in ({}, {"option": "maybe"}, {"option": ["approve"]}):
+        with pytest.raises(HTTPException) as exc:
+            GameRuleValidator.validate_action(game, 1, ActionType.VOTE, payload)
+        assert exc.value.status_code == 400
+
+    game.phase = GamePhase.MISSION
+    game.proposed_team = [1, 2]
+    GameRuleValidator.validate_action(game, 2, ActionType.MISSION, {"result": "fail"})
+    for payload in ({}, {"result": "abstain"}):
+        with pytest.raises(HTTPException) as exc:
+            GameRuleValidator.validate_action(game, 2, ActionType.MISSION, payload)
+        assert exc.value.status_code == 400
@@ -0,0 +1,53 @@
+from app.schemas.game import GameState, PlayerState
+from app.models.game_enums import GamePhase, Character, VoteOption, MissionResult
+
+def create_mock_game(phase=GamePhase.VOTE):
+    # 玩家列表顺序与座位号不一致，索引需要按座位号工作
+    players = [
+        PlayerState(user_id=100 + seat, username=f"u{seat}", seat_id=seat, character=Character.SERVANT)
+        for seat in [3, 0, 7, 1, 5, 2, 6, 4]
+    ]
+    return GameState(game_id="test", phase=phase, leader_id=107, players=players)
+
+def test_player_indexes():
+    game = create_mock_game()
+    assert game.get_player(105).seat_id == 5
+    assert game.get_player(999) is None
+    assert game.get_player_by_seat(2).user_id == 102
+    # 座位首尾相接
+    assert game.next_player(107).user_id == 100
+    assert [p.seat_id for p in game.players_by_seat] == list(range(8))
+
+def test_vote_and_mission_counters():
+    game = create_mock_game()
+    game.record_vote(game.get_player(100), VoteOption.APPROVE)
+    game.record_vote(game.get_player(101), VoteOption.REJECT)
+    game.record_vote(game.get_player(102), "approve")
+    assert game.votes_cast == 3
+    assert game.approve_votes == 2
+    assert game.get_player(101).has_voted
+
+    game.reset_votes()
+    assert game.votes_cast == 0
+    assert not game.get_player(101).has_voted
+
+    game.record_mission_result(game.get_player(100), MissionResult.SUCCESS)
+    game.record_mission_result(game.get_player(101), "fail")
+    assert game.mission_submitted == 2
+    assert game.mission_fails == 1
+
+def test_indexes_rebuilt_on_load_and_copy():
+    game = create_mock_game()
+    game.record_vote(game.get_player(100), VoteOption.APPROVE)
+    game.record_mission_result(game.get_player(101), MissionResult.FAIL)
+
+    restored = GameState.model_validate_json(game.model_dump_json())
+    assert restored.votes_cast == 1
+    assert restored.approve_votes == 1
+    assert restored.mission_fails == 1
+
+    copied = game.model_copy(deep=True)
+    copied.get_player(100).has_voted = False
+    # 深拷贝后的索引指向拷贝自己的玩家对象
+    assert copied.get_player(100) is copied.players[1]
+    assert game.get_player(100).has_voted
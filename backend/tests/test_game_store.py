@@ -0,0 +1,125 @@
+import asyncio
+import time
+from app.core.metrics import metrics
+from app.services.game_evictor import GameEvictor
+from app.services.game_store import BytesColdTier, FileColdTier, MemoryGameStore, RedisGameStore
+from app.schemas.game import GameState, PlayerState
+from app.models.game_enums import GamePhase, Character, VoteOption
+
+def create_mock_game(game_id="test"):
+    players = [
+        PlayerState(user_id=i, username=f"u{i}", seat_id=i-1, character=Character.SERVANT)
+        for i in range(1, 9)
+    ]
+    return GameState(game_id=game_id, phase=GamePhase.VOTE, leader_id=1, players=players)
+
+def test_memory_store_compare_and_set():
+    async def run():
+        store = MemoryGameStore()
+        game = create_mock_game()
+
+        # 新建对局：期望版本为 0
+        assert await store.save(game, expected_version=0) == True
+        assert game.version == 1
+
+        # 另一个实例以过期版本写入 -> 冲突
+        stale = game.model_copy(deep=True)
+        stale.version = 0
+        assert await store.save(stale, expected_version=0) == False
+
+        # 以当前版本写入 -> 成功
+        loaded = await store.get("test")
+        assert await store.save(loaded, expected_version=loaded.version) == True
+        assert (await store.get("test")).version == 2
+
+        await store.delete("test")
+        assert await store.get("test") is None
+
+    asyncio.run(run())
+
+def test_redis_store_serialization_roundtrip():
+    game = create_mock_game()
+    game.version = 7
+    game.votes = {1: VoteOption.APPROVE, 2: VoteOption.REJECT}
+
+    data = RedisGameStore.serialize(game)
+    restored = RedisGameStore.deserialize(data)
+
+    assert restored == game
+    # 紧凑序列化：默认值字段不写入
+    assert b"is_alive" not in data
+
+def test_finished_and_idle_games_move_to_cold_tier():
+    async def run():
+        store = MemoryGameStore(cold=BytesColdTier())
+        active, finished, idle = create_mock_game("active"), create_mock_game("finished"), create_mock_game("idle")
+        finished.phase = GamePhase.FINISHED
+        for game in (idle, finished, active):
+            await store.save(game, expected_version=0)
+        now = time.time()
+
+        # 宽限期内都保留在内存中
+        assert store.evict(now, finished_grace_seconds=60, idle_seconds=600, limit=100) == 0
+        # 已结束的对局超过宽限期后移出，进行中的对局要等到空闲超时
+        assert store.evict(now + 120, finished_grace_seconds=60, idle_seconds=600, limit=100) == 1
+        assert len(store) == 2 and len(store.cold) == 1
+        assert store.evict(now + 1200, finished_grace_seconds=60, idle_seconds=600, limit=1) == 1
+        assert store.evict(now + 1200, finished_grace_seconds=60, idle_seconds=600, limit=1) == 1
+        assert len(store) == 0 and len(store.cold) == 3
+
+        # 访问时透明加载，CAS 语义不变
+        loaded = await store.get("finished")
+        assert loaded == finished and loaded is not finished
+        assert len(store) == 1 and len(store.cold) == 2
+        assert await store.save(loaded, expected_version=loaded.version) == True
+        # 被驱逐前读取的旧对象：版本号与冷存储一致时仍可写入
+        assert await store.save(active, expected_version=active.version) == True
+        assert (await store.get("active")).version == 2
+
+        await store.delete("idle")
+        assert await store.get("idle") is None
+        assert len(store.cold) == 0
+
+    asyncio.run(run())
+
+def test_memory_cold_tier_is_bounded():
+    cold = BytesColdTier(ttl_seconds=100, max_bytes=30)
+    for i in range(3):
+        cold.put(f"g{i}", b"x" * 10, now=1000.0 + i)
+    assert len(cold) == 3 and cold.total_bytes == 30
+    # 超过字节上限时丢弃最早放入的对局；重新放入的对局算作最新
+    cold.put("g0", b"x" * 10, now=1003.0)
+    cold.put("g3", b"x" * 10, now=1004.0)
+    assert cold.get("g1") is None and cold.get("g0") is not None
+    assert len(cold) == 3 and cold.total_bytes == 30
+
+    # 超过保留时间的对局在 trim 时丢弃
+    assert cold.trim(1102.5) == 1
+    assert cold.get("g2") is None
+    assert {game_id for game_id, _ in cold.items()} == {"g0", "g3"}
+    assert cold.trim(1200.0) == 2
+    assert len(cold) == 0 and cold.total_bytes == 0
+
+def test_file_cold_tier_and_memory_gauges(tmp_path):
+    async def run():
+        store = MemoryGameStore(cold=FileColdTier(str(tmp_path)))
+        game = create_mock_game("3f2b1c9e-0a4d-4c5e-9b7a-1d2e3f405162")
+        await store.save(game, expected_version=0)
+
+        evictor = GameEvictor(store, finished_grace_seconds=60, idle_seconds=600, batch=100)
+        assert evictor.sweep(time.time()) == 0
+        assert metrics.gauge("game_store.hot_games").value == 1
+        assert metrics.gauge("game_store.hot_bytes").value == store.memory_usage(game.game_id) > 0
+
+        assert evictor.sweep(time.time() + 1200) == 1
+        assert metrics.gauge("game_store.hot_games").value == 0
+        assert metrics.gauge("game_store.hot_bytes").value == 0
+        assert metrics.gauge("game_store.cold_games").value == 1
+        assert metrics.gauge("game_store.cold_bytes").value == (tmp_path / f"{game.game_id}.bin").stat().st_size
+
+        assert await store.get(game.game_id) == game
+        assert list(tmp_path.iterdir()) == []
+        # 不能作为文件名的 game_id 不会写到目录之外
+        assert await store.get("../../etc/passwd") is None
+
+    asyncio.run(run())
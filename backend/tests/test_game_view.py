@@ -0,0 +1,100 @@
+import pytest
+from fastapi import HTTPException
+from app.services.game_view import GameViewCache
+from app.schemas.game import GameState, PlayerState
+from app.models.game_enums import GamePhase, Character, MissionResult, VoteOption
+
+ROLES = [
+    Character.MERLIN, Character.PERCIVAL, Character.SERVANT, Character.SERVANT,
+    Character.SERVANT, Character.MORGANA, Character.ASSASSIN, Character.MINION
+]
+
+def create_mock_game(phase=GamePhase.SPEECH):
+    # user_id = seat + 1, 角色按 ROLES 顺序分配
+    players = [
+        PlayerState(user_id=i + 1, username=f"u{i + 1}", seat_id=i, character=role)
+        for i, role in enumerate(ROLES)
+    ]
+    return GameState(game_id="test", phase=phase, leader_id=1, players=players, version=1)
+
+def visible(view):
+    return {p.user_id: p.character for p in view.players if p.character is not None}
+
+def test_role_views():
+    cache = GameViewCache()
+    game = create_mock_game()
+
+    # 梅林：只看到自己，坏人带标记
+    view = cache.get_player_view(game, 1)
+    assert visible(view) == {1: Character.MERLIN}
+    assert {p.user_id for p in view.players if p.is_seen_as_evil} == {6, 7, 8}
+
+    # 派西维尔：梅林与莫甘娜带梅林标记
+    view = cache.get_player_view(game, 2)
+    assert visible(view) == {2: Character.PERCIVAL}
+    assert {p.user_id for p in view.players if p.is_seen_as_merlin} == {1, 6}
+
+    # 普通好人：只看到自己
+    assert visible(cache.get_player_view(game, 3)) == {3: Character.SERVANT}
+
+    # 坏人：互知身份
+    assert visible(cache.get_player_view(game, 7)) == {6: Character.MORGANA, 7: Character.ASSASSIN, 8: Character.MINION}
+
+    # 原始状态不被修改
+    assert visible(game) == {p.user_id: p.character for p in game.players}
+
+def test_views_cached_per_version():
+    cache = GameViewCache()
+    game = create_mock_game()
+
+    # 同一版本、同一类别的视图只构建一次
+    assert cache.get_player_view(game, 6) is cache.get_player_view(game, 7)
+    assert cache.get_player_view(game, 3).players[0] is cache.get_player_view(game, 4).players[0]
+
+    # 版本变化后重新构建
+    evil_view = cache.get_player_view(game, 6)
+    game.phase = GamePhase.FINISHED
+    game.version += 1
+    revealed = cache.get_player_view(game, 3)
+    assert revealed is not evil_view
+    assert len(visible(revealed)) == 8
+
+def test_non_player_forbidden():
+    cache = GameViewCache()
+    with pytest.raises(HTTPException) as exc:
+        cache.get_player_view(create_mock_game(), 99)
+    assert exc.value.status_code == 403
+
+def test_view_json_encoded_once_per_version():
+    cache = GameViewCache()
+    game = create_mock_game()
+
+    data = cache.get_player_view_json(game, 6)
+    assert data == cache.get_player_view(game, 6).model_dump_json().encode()
+    # 同一版本、同一视角直接返回缓存的字节
+    assert cache.get_player_view_json(game, 7) is data
+
+    # 需要补丁自己座位的视角按观察者分别缓存
+    assert cache.get_player_view_json(game, 3) != cache.get_player_view_json(game, 4)
+    assert cache.get_player_view_json(game, 3) is cache.get_player_view_json(game, 3)
+
+    game.version += 1
+    assert cache.get_player_view_json(game, 6) is not data
+
+def test_cached_view_is_not_changed_by_later_in_place_updates():
+    cache = GameViewCache()
+    game = create_mock_game(GamePhase.VOTE)
+    game.proposed_team = [1, 2, 3]
+    game.team_history[0] = 0b111
+    view = cache.get_player_view(game, 3)
+    before = view.model_dump()
+
+    # 单个动作在存储中的对象上原地执行
+    game.record_vote(game.get_player(1), VoteOption.APPROVE)
+    game.proposed_team.append(4)
+    game.approve_history[0] = 0b1
+    game.mission_results.append(MissionResult.FAIL)
+    game.mission_fail_history[0] = 1
+    game.pending_mission_results.append(MissionResult.SUCCESS)
+    assert view.model_dump() == before
+    assert cache.get_player_view(game, 3).model_dump() == before
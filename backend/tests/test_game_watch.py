@@ -0,0 +1,83 @@
+import asyncio
+import time
+from fastapi.testclient import TestClient
+from app.core.deps import get_current_user
+from app.main import app
+from app.models.user import User
+from app.services.game_watch import game_watcher
+from app.services.game_watch import GameVersionWatcher
+from app.services.game_service import GameService
+from app.models.game_enums import ActionType
+
+def test_long_poll_wakes_on_update():
+    async def run():
+        watcher = GameVersionWatcher()
+        GameService.add_listener(watcher.on_game_updated)
+        try:
+            game = await GameService.create_game(list(range(1, 9)), {})
+            version = game.version
+
+            waiter = asyncio.create_task(watcher.wait_for_version(game.game_id, version + 1, timeout=5))
+            await asyncio.sleep(0.01)
+            assert not waiter.done()
+
+            await GameService.process_action(game.game_id, game.speaker_id, ActionType.SPEAK, {})
+            updated = await asyncio.wait_for(waiter, timeout=1)
+            assert updated.version == version + 1
+        finally:
+            GameService.remove_listener(watcher.on_game_updated)
+
+    asyncio.run(run())
+
+def test_long_poll_returns_current_state_on_timeout():
+    async def run():
+        watcher = GameVersionWatcher()
+        game = await GameService.create_game(list(range(1, 9)), {})
+
+        # 已达到的版本立即返回
+        assert (await watcher.wait_for_version(game.game_id, game.version, timeout=5)).version == game.version
+
+        # 超时返回当前状态
+        result = await watcher.wait_for_version(game.game_id, game.version + 1, timeout=0.05)
+        assert result.version == game.version
+
+        assert await watcher.wait_for_version("missing", 1, timeout=0.05) is None
+        # 没有请求在等待时不保留 Event
+        assert len(watcher) == 0
+
+        # 多个请求同时等待时，先超时的请求不影响仍在等待的请求
+        version = game.version
+        long_waiter = asyncio.create_task(watcher.wait_for_version(game.game_id, version + 1, timeout=5))
+        await watcher.wait_for_version(game.game_id, version + 1, timeout=0.05)
+        assert len(watcher) == 1 and not long_waiter.done()
+        await GameService.process_action(game.game_id, game.speaker_id, ActionType.SPEAK, {})
+        watcher.notify(game.game_id)
+        assert (await asyncio.wait_for(long_waiter, timeout=1)).version == version + 1
+        assert len(watcher) == 0
+
+    asyncio.run(run())
+
+def test_non_players_cannot_long_poll():
+    client = TestClient(app)
+    current = {}
+    overrides = dict(app.dependency_overrides)
+    app.dependency_overrides[get_current_user] = lambda: User(id=current["id"], username="u", email="u@example.com", is_active=True)
+    try:
+        game = asyncio.run(GameService.create_game(list(range(1, 9)), {}))
+        url = f"/api/v1/games/{game.game_id}?wait_for_version={game.version + 1}&timeout=20"
+
+        # 非玩家立即被拒绝，不会挂起等待
+        current["id"] = 99
+        start = time.monotonic()
+        assert client.get(url).status_code == 403
+        assert time.monotonic() - start < 5
+        assert len(game_watcher) == 0
+
+        # 玩家请求已达到的版本时立即返回
+        current["id"] = 1
+        response = client.get(f"/api/v1/games/{game.game_id}?wait_for_version={game.version}")
+        assert response.status_code == 200
+        assert response.json()["version"] == game.version
+    finally:
+        app.dependency_overrides.clear()
+        app.dependency_overrides.update(overrides)
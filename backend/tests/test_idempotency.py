@@ -0,0 +1,117 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from app.main import app
+from app.core.config import settings
+from app.core.deps import get_current_user
+from app.models.user import User
+from app.services.game_service import GameService
+from app.services.idempotency import IdempotencyCache, IdempotentResponse
+
+def test_concurrent_retries_share_one_execution():
+    async def run():
+        cache = IdempotencyCache(max_size=10, ttl=60)
+        calls = []
+
+        async def handler():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return IdempotentResponse("fp", b"{}", '"g:1"')
+
+        results = await asyncio.gather(*(cache.run(("u", "g", "k"), "fp", handler) for _ in range(5)))
+        assert len(calls) == 1
+        assert [replayed for _, replayed in results] == [False, True, True, True, True]
+        assert all(response is results[0][0] for response, _ in results)
+
+        # 已完成的结果直接返回
+        response, replayed = await cache.run(("u", "g", "k"), "fp", handler)
+        assert replayed and len(calls) == 1
+
+        # 同一 key 用于不同的请求
+        with pytest.raises(HTTPException) as exc:
+            await cache.run(("u", "g", "k"), "other", handler)
+        assert exc.value.status_code == 422
+
+    asyncio.run(run())
+
+def test_failures_are_not_cached():
+    async def run():
+        cache = IdempotencyCache(max_size=10, ttl=60)
+        attempts = []
+
+        async def handler():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise HTTPException(status_code=409, detail="conflict")
+            return IdempotentResponse("fp", b"{}", '"g:1"')
+
+        with pytest.raises(HTTPException):
+            await cache.run("k", "fp", handler)
+        _, replayed = await cache.run("k", "fp", handler)
+        assert not replayed and len(attempts) == 2
+
+    asyncio.run(run())
+
+def test_cancelled_request_does_not_rerun_the_action():
+    async def run():
+        cache = IdempotencyCache(max_size=10, ttl=60)
+        calls = []
+        release = asyncio.Event()
+
+        async def handler():
+            calls.append(1)
+            await release.wait()
+            return IdempotentResponse("fp", b"{}", '"g:1"')
+
+        # 客户端断开：第一次请求被取消，动作仍在执行
+        first = asyncio.create_task(cache.run("k", "fp", handler))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        retry = asyncio.create_task(cache.run("k", "fp", handler))
+        await asyncio.sleep(0)
+        release.set()
+        response, replayed = await retry
+        assert replayed and len(calls) == 1
+
+        # 动作完成后结果已缓存
+        assert (await cache.run("k", "fp", handler))[1] and len(calls) == 1
+
+    asyncio.run(run())
+
+def test_retried_action_is_applied_once(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    client = TestClient(app)
+
+    async def create():
+        return await GameService.create_game(list(range(1, 9)), {})
+
+    game = asyncio.run(create())
+    speaker = User(id=game.speaker_id, username="speaker", email="s@example.com", is_active=True)
+    previous = app.dependency_overrides.get(get_current_user)
+    app.dependency_overrides[get_current_user] = lambda: speaker
+    try:
+        url = f"/api/v1/games/{game.game_id}/action"
+        headers = {"Idempotency-Key": "retry-1"}
+        first = client.post(url, json={"action_type": "speak"}, headers=headers)
+        second = client.post(url, json={"action_type": "speak"}, headers=headers)
+        assert first.status_code == second.status_code == 200
+        assert "Idempotent-Replayed" not in first.headers
+        assert second.headers["Idempotent-Replayed"] == "true"
+        assert second.content == first.content
+        assert second.headers["ETag"] == first.headers["ETag"]
+        assert first.json()["seq"] == 1
+
+        # 同一 key 携带不同的动作
+        conflict = client.post(url, json={"action_type": "propose", "payload": {}}, headers=headers)
+        assert conflict.status_code == 422
+
+        # 动作只执行了一次
+        state = asyncio.run(GameService.get_game(game.game_id))
+        assert state.seq == 1
+    finally:
+        if previous is None:
+            app.dependency_overrides.pop(get_current_user, None)
+        else:
+            app.dependency_overrides[get_current_user] = previous
@@ -0,0 +1,104 @@
+import asyncio
+from unittest.mock import AsyncMock
+import pytest
+from fastapi import HTTPException
+from app.core import rate_limit, redis_scripts
+from app.core.config import settings
+from app.core.rate_limit import RateLimiter, TokenBucketLimiter
+
+def test_rate_limiter_rejects_with_retry_after(monkeypatch):
+    calls = []
+
+    async def fake_hit(redis, key, limit, window_seconds):
+        calls.append((key, limit, window_seconds))
+        return len(calls) <= 2, 1500 if len(calls) > 2 else 2 - len(calls)
+
+    monkeypatch.setattr(rate_limit, "sliding_window_hit", fake_hit)
+    limiter = RateLimiter("test", limit=2, window_seconds=10)
+
+    async def run():
+        await limiter.hit(None, "7")
+        await limiter.hit(None, "7")
+        with pytest.raises(HTTPException) as exc:
+            await limiter.hit(None, "7")
+        return exc.value
+
+    error = asyncio.run(run())
+    assert error.status_code == 429
+    assert error.headers["Retry-After"] == "2"
+    assert calls[0] == ("rate_limit:test:7", 2, 10)
+
+def test_rate_limiter_fails_open(monkeypatch):
+    async def broken_hit(*args):
+        raise ConnectionError("redis down")
+
+    monkeypatch.setattr(rate_limit, "sliding_window_hit", broken_hit)
+    asyncio.run(RateLimiter("test", limit=1).hit(None, "7"))
+
+    # 关闭限流时不访问 Redis
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    monkeypatch.setattr(rate_limit, "sliding_window_hit", AsyncMock(side_effect=AssertionError))
+    asyncio.run(RateLimiter("test", limit=1).hit(None, "7"))
+
+def test_token_bucket_is_local_and_refills():
+    now = [100.0]
+    limiter = TokenBucketLimiter("test_bucket", limit=3, window_seconds=60, clock=lambda: now[0])
+    for _ in range(3):
+        limiter.hit("7")
+    with pytest.raises(HTTPException) as exc:
+        limiter.hit("7")
+    assert exc.value.status_code == 429
+    assert exc.value.headers["Retry-After"] == "20"
+    # 其他用户不受影响
+    limiter.hit("8")
+
+    # 每 20 秒补一个令牌，最多补满到 limit
+    now[0] += 20
+    limiter.hit("7")
+    with pytest.raises(HTTPException):
+        limiter.hit("7")
+    now[0] += 3600
+    for _ in range(3):
+        limiter.hit("7")
+    with pytest.raises(HTTPException):
+        limiter.hit("7")
+
+def test_token_bucket_charges_batch_cost():
+    now = [100.0]
+    limiter = TokenBucketLimiter("test_batch", limit=10, window_seconds=60, clock=lambda: now[0])
+    limiter.hit("7", cost=8)
+    with pytest.raises(HTTPException) as exc:
+        limiter.hit("7", cost=3)
+    assert exc.value.headers["Retry-After"] == "6"
+    limiter.hit("7", cost=2)
+    # 超过桶容量的批次按整桶计，补满后可以通过
+    now[0] += 60
+    limiter.hit("7", cost=64)
+
+class ScriptClient:
+    """记录 EVALSHA 调用的 Redis 客户端替身"""
+
+    def __init__(self, result):
+        self.result = result
+        self.calls = []
+
+    async def evalsha(self, sha, numkeys, *keys_and_args):
+        self.calls.append((sha, list(keys_and_args[:numkeys]), list(keys_and_args[numkeys:])))
+        return self.result
+
+def test_scripts_run_in_one_round_trip():
+    async def run():
+        client = ScriptClient(0)
+        assert await redis_scripts.try_store_verification_code(client, "a@b.c", "123456", code_ttl=300, interval=60) == 0
+        assert client.calls == [(redis_scripts._send_code.sha, ["email_limit:a@b.c", "verification_code:a@b.c"], ["123456", 300, 60])]
+
+        client = ScriptClient(1)
+        assert await redis_scripts.consume_verification_code(client, "a@b.c", "123456") is True
+        assert client.calls[0][1:] == (["verification_code:a@b.c"], ["123456"])
+
+        client = ScriptClient([0, 1500])
+        assert await redis_scripts.sliding_window_hit(client, "rate_limit:x:1", 5, 60) == (False, 1500)
+        assert len(client.calls) == 1
+        assert client.calls[0][2][:2] == [60000, 5]
+
+    asyncio.run(run())
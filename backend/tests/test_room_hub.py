@@ -0,0 +1,99 @@
+import asyncio
+import json
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+from app.main import app
+from app.models.user import User
+from app.routers import ws
+from app.services.game_service import GameService
+from app.services.room_hub import RoomHub, compute_delta
+from app.schemas.game import GameState, PlayerState
+from app.models.game_enums import GamePhase, Character
+
+ROLES = [
+    Character.MERLIN, Character.PERCIVAL, Character.SERVANT, Character.SERVANT,
+    Character.SERVANT, Character.MORGANA, Character.ASSASSIN, Character.MINION
+]
+
+def create_mock_game(game_id):
+    players = [
+        PlayerState(user_id=i + 1, username=f"u{i + 1}", seat_id=i, character=role)
+        for i, role in enumerate(ROLES)
+    ]
+    return GameState(game_id=game_id, phase=GamePhase.SPEECH, leader_id=1, speaker_id=1, players=players, version=1)
+
+def drain(conn):
+    messages = []
+    while not conn._queue.empty():
+        messages.append(json.loads(conn._queue.get_nowait()))
+    return messages
+
+def test_compute_delta():
+    prev = {"phase": "speech", "round": 1, "players": [{"seat_id": 0, "has_voted": False}, {"seat_id": 1, "has_voted": False}]}
+    curr = {"phase": "vote", "round": 1, "players": [{"seat_id": 0, "has_voted": False}, {"seat_id": 1, "has_voted": True}]}
+    assert compute_delta(prev, curr) == {"changes": {"phase": "vote"}, "players": {"1": {"has_voted": True}}}
+
+def test_snapshot_on_join_then_deltas():
+    hub = RoomHub(queue_size=8)
+    game = create_mock_game("hub-deltas")
+    merlin = hub.join(game, None, 1)
+    servant = hub.join(game, None, 3)
+
+    snapshot = drain(merlin)
+    assert snapshot[0]["type"] == "game_snapshot"
+    assert snapshot[0]["payload"]["players"][0]["character"] == "merlin"
+    drain(servant)
+
+    game.speaker_id = 2
+    game.version = 2
+    hub.broadcast(game)
+
+    update = drain(merlin)[0]
+    assert update["type"] == "state_update"
+    assert update["payload"]["version"] == 2
+    assert update["payload"]["changes"] == {"version": 2, "speaker_id": 2}
+    assert update["payload"]["players"] == {}
+    assert drain(servant)[0]["payload"]["changes"]["speaker_id"] == 2
+
+def test_slow_client_gets_resynced():
+    hub = RoomHub(queue_size=2)
+    game = create_mock_game("hub-slow")
+    slow = hub.join(game, None, 3)
+
+    # 客户端不读取，队列溢出后丢弃积压并改发全量快照
+    for version in range(2, 6):
+        game.version = version
+        hub.broadcast(game)
+
+    messages = drain(slow)
+    assert messages[-1]["type"] == "game_snapshot"
+    assert messages[-1]["payload"]["version"] == 5
+    assert slow.dropped > 0
+
+def test_leave_removes_empty_room():
+    hub = RoomHub()
+    conn = hub.join(create_mock_game("hub-leave"), None, 1)
+    assert hub.has_room("hub-leave")
+    hub.leave(conn)
+    assert not hub.has_room("hub-leave")
+
+def test_socket_rejections_reach_client_as_policy_violation(monkeypatch):
+    client = TestClient(app)
+
+    def close_of(url):
+        with client.websocket_connect(url) as websocket:
+            with pytest.raises(WebSocketDisconnect) as exc:
+                websocket.receive_json()
+        return exc.value.code, exc.value.reason
+
+    # 鉴权失败：客户端收到 1008 关闭帧，而不是握手失败
+    assert close_of("/ws/games/any?token=invalid") == (1008, "Could not validate credentials")
+
+    async def outsider(token, db):
+        return User(id=99, username="outsider", email="o@example.com", is_active=True)
+
+    monkeypatch.setattr(ws, "get_user_by_token", outsider)
+    game = asyncio.run(GameService.create_game(list(range(1, 9)), {}))
+    assert close_of("/ws/games/missing?token=t") == (1008, "Game not found")
+    assert close_of(f"/ws/games/{game.game_id}?token=t") == (1008, "You are not a player in this game")
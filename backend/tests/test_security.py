@@ -0,0 +1,54 @@
+import asyncio
+import threading
+from app.core import security
+from app.core.config import settings
+from app.core.metrics import metrics
+
+def test_hash_and_verify(monkeypatch):
+    monkeypatch.setattr(settings, "BCRYPT_ROUNDS", 4)
+    hashed = security.get_password_hash("password123")
+    assert security.get_hash_rounds(hashed) == 4
+    assert security.verify_password("password123", hashed)
+    assert not security.verify_password("wrong", hashed)
+    assert not security.verify_password("password123", "not-a-hash")
+
+    # 超过 72 字节的部分不参与计算（与 bcrypt 历史行为一致）
+    long_hash = security.get_password_hash("x" * 80)
+    assert security.verify_password("x" * 72 + "y", long_hash)
+
+def test_rehash_when_rounds_change(monkeypatch):
+    monkeypatch.setattr(settings, "BCRYPT_ROUNDS", 4)
+    old_hash = security.get_password_hash("password123")
+    assert security.verify_and_update("password123", old_hash) == (True, None)
+
+    monkeypatch.setattr(settings, "BCRYPT_ROUNDS", 5)
+    verified, new_hash = security.verify_and_update("password123", old_hash)
+    assert verified and security.get_hash_rounds(new_hash) == 5
+    assert security.verify_password("password123", new_hash)
+
+    # 密码错误时不升级
+    assert security.verify_and_update("wrong", old_hash) == (False, None)
+
+def test_async_hashing_runs_off_loop(monkeypatch):
+    monkeypatch.setattr(settings, "BCRYPT_ROUNDS", 4)
+    threads = []
+    original = security.get_password_hash
+
+    def tracking_hash(password):
+        threads.append(threading.current_thread().name)
+        return original(password)
+
+    monkeypatch.setattr(security, "get_password_hash", tracking_hash)
+    hash_count = metrics.summary("password.hash_ms").count
+    rehash_count = metrics.counter("password.rehash").value
+
+    async def run():
+        hashed = await security.hash_password_async("password123")
+        monkeypatch.setattr(settings, "BCRYPT_ROUNDS", 5)
+        return await security.verify_and_update_async("password123", hashed)
+
+    verified, new_hash = asyncio.run(run())
+    assert verified and new_hash is not None
+    assert threads and all(name.startswith("password-hash") for name in threads)
+    assert metrics.summary("password.hash_ms").count == hash_count + 1
+    assert metrics.counter("password.rehash").value == rehash_count + 1
@@ -0,0 +1,224 @@
+import asyncio
+import httpx
+import pytest
+from fastapi import FastAPI, Request, WebSocket
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+from app.core.hash_ring import HashRing
+from app.services.shard_registry import RedisShardRegistry, ShardRegistry
+from app.services.shard_router import ShardRouter
+
+class StubPipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append((name, args, kwargs))
+
+    async def execute(self):
+        return [await getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+class StubRedis:
+    """分片注册表用到的 Redis 命令（有序集合、Hash、字符串）"""
+    def __init__(self):
+        self.zsets, self.hashes, self.strings = {}, {}, {}
+
+    def pipeline(self, transaction=False):
+        return StubPipeline(self)
+
+    async def zadd(self, key, mapping):
+        self.zsets.setdefault(key, {}).update(mapping)
+
+    async def zremrangebyscore(self, key, low, high):
+        zset = self.zsets.get(key, {})
+        for member in [m for m, score in zset.items() if score <= high]:
+            del zset[member]
+
+    async def zrange(self, key, start, end):
+        return sorted(self.zsets.get(key, {}), key=self.zsets[key].get) if key in self.zsets else []
+
+    async def zrem(self, key, member):
+        self.zsets.get(key, {}).pop(member, None)
+
+    async def hset(self, key, field, value):
+        self.hashes.setdefault(key, {})[field] = value
+
+    async def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    async def hdel(self, key, *fields):
+        for field in fields:
+            self.hashes.get(key, {}).pop(field, None)
+
+    async def set(self, key, value, ex=None):
+        self.strings[key] = value
+
+    async def get(self, key):
+        return self.strings.get(key)
+
+def _registry(redis, worker_id):
+    return RedisShardRegistry(client=redis, worker_id=worker_id, url=f"http://{worker_id}:8000",
+                              key_prefix="shard:", worker_ttl_seconds=10, virtual_nodes=64)
+
+def test_hash_ring_balance_and_minimal_movement():
+    keys = [f"game-{i}" for i in range(20000)]
+    ring = HashRing(["w1", "w2", "w3", "w4"], virtual_nodes=128)
+    owners = [ring.owner(key) for key in keys]
+    for node in ring.nodes:
+        assert abs(owners.count(node) - len(keys) / 4) < len(keys) / 4 * 0.2
+
+    grown = HashRing(["w1", "w2", "w3", "w4", "w5"], virtual_nodes=128)
+    moved = [(before, grown.owner(key)) for key, before in zip(keys, owners) if grown.owner(key) != before]
+    # 只有约 1/5 的 key 移动，且都移动到新节点
+    assert abs(len(moved) - len(keys) / 5) < len(keys) / 5 * 0.2
+    assert all(after == "w5" for _, after in moved)
+    assert HashRing([]).owner("game") is None
+
+def test_registry_membership_and_ownership():
+    async def run():
+        redis = StubRedis()
+        w1, w2 = _registry(redis, "w1"), _registry(redis, "w2")
+        await w1.heartbeat(now=100.0)
+        await w2.heartbeat(now=100.0)
+        await w1.heartbeat(now=101.0)
+        assert w1.ring.nodes == w2.ring.nodes == {"w1", "w2"}
+        assert w1.url_of("w2") == "http://w2:8000"
+
+        # 新建的对局按哈希环落在创建它的 worker 上
+        game_id = w1.new_game_id()
+        assert w1.ring.owner(game_id) == "w1"
+        await w1.claim(game_id)
+        assert await w2.owner(game_id) == "w1"
+
+        # 新 worker 加入后，已登记的对局归属不变
+        w3 = _registry(redis, "w3")
+        await w3.heartbeat(now=102.0)
+        moved = next(g for g in (w1.new_game_id() for _ in range(1000)) if HashRing(["w1", "w2", "w3"], 64).owner(g) == "w3")
+        await w1.claim(moved)
+        await w2.heartbeat(now=102.0)
+        assert await w2.owner(moved) == "w1"
+        # 未登记的对局按哈希环
+        assert await w3.owner("unclaimed") == w3.ring.owner("unclaimed")
+
+        # 归属 worker 心跳超时后按新的哈希环重新分配
+        await w3.heartbeat(now=115.0)
+        await w2.heartbeat(now=115.0)
+        assert w2.ring.nodes == {"w2", "w3"}
+        assert await w2.owner(game_id) in {"w2", "w3"}
+        assert w2.url_of("w1") is None
+
+    asyncio.run(run())
+
+class FixedRegistry(ShardRegistry):
+    """所有对局固定归属于 owner 的注册表"""
+    def __init__(self, worker_id, owner, urls):
+        self.worker_id = worker_id
+        self._owner = owner
+        self._urls = urls
+
+    @property
+    def enabled(self):
+        return True
+
+    async def owner(self, game_id):
+        return self._owner
+
+    def url_of(self, worker_id):
+        return self._urls.get(worker_id)
+
+def _app(registry, forward=True, transport=None):
+    app = FastAPI()
+
+    @app.post("/api/v1/games/{game_id}/action")
+    async def action(game_id: str, request: Request):
+        return {"served_by": registry.worker_id, "game_id": game_id, "body": (await request.json())}
+
+    @app.websocket("/ws/games/{game_id}")
+    async def game_socket(websocket: WebSocket, game_id: str):
+        await websocket.accept()
+        await websocket.send_json({"served_by": registry.worker_id})
+        await websocket.close()
+
+    client = httpx.AsyncClient(transport=transport) if transport is not None else None
+    app.add_middleware(ShardRouter, registry=registry, forward=forward, client=client)
+    return app
+
+def test_router_serves_owned_games_locally():
+    client = TestClient(_app(FixedRegistry("w1", "w1", {})))
+    response = client.post("/api/v1/games/g1/action", json={"x": 1})
+    assert response.status_code == 200
+    assert response.json()["served_by"] == "w1"
+    assert response.headers["x-game-owner"] == "w1"
+
+def test_router_forwards_to_owner_or_returns_misdirected():
+    forwarded = []
+
+    class Body(httpx.AsyncByteStream):
+        async def __aiter__(self):
+            yield b'{"served_by":"w2"}'
+
+    def owner_worker(request: httpx.Request):
+        forwarded.append(request)
+        return httpx.Response(200, stream=Body(), headers={"content-type": "application/json", "x-game-owner": "w2"})
+
+    registry = FixedRegistry("w1", "w2", {"w2": "http://w2:8000"})
+    client = TestClient(_app(registry, transport=httpx.MockTransport(owner_worker)))
+    response = client.post("/api/v1/games/g1/action?wait=5", json={"x": 1}, headers={"Authorization": "Bearer t"})
+    assert response.status_code == 200
+    assert response.json() == {"served_by": "w2"}
+    assert response.headers["x-game-owner"] == "w2"
+
+    request = forwarded[0]
+    assert str(request.url) == "http://w2:8000/api/v1/games/g1/action?wait=5"
+    assert request.headers["authorization"] == "Bearer t"
+    assert request.content == b'{"x":1}'
+    signature = request.headers["x-shard-forwarded"]
+    assert signature.startswith("w1:")
+
+    # 其他 worker 签名转发过来的请求一律本地处理，不会再次转发
+    receiver = TestClient(_app(FixedRegistry("w2", "w1", {"w1": "http://w1:8000"}), forward=False))
+    response = receiver.post("/api/v1/games/g1/action", json={}, headers={"X-Shard-Forwarded": signature})
+    assert response.json()["served_by"] == "w2"
+    # 客户端伪造、篡改或挪用到其他对局的头部无效，按普通请求路由
+    tampered = signature[:-1] + ("0" if signature[-1] != "0" else "1")
+    for path, value in [("g1", "w1"), ("g1", tampered), ("g2", signature)]:
+        response = receiver.post(f"/api/v1/games/{path}/action", json={}, headers={"X-Shard-Forwarded": value})
+        assert response.status_code == 421
+    # 客户端带来的头部不会被原样转发
+    client.post("/api/v1/games/g1/action", json={}, headers={"X-Shard-Forwarded": "w2"})
+    assert forwarded[-1].headers.get_list("x-shard-forwarded") == [forwarded[-1].headers["x-shard-forwarded"]]
+    assert forwarded[-1].headers["x-shard-forwarded"].startswith("w1:")
+
+    # 关闭转发时返回 421，由前端代理按 X-Game-Owner 重试
+    client = TestClient(_app(registry, forward=False))
+    response = client.post("/api/v1/games/g1/action", json={})
+    assert response.status_code == 421
+    assert response.headers["x-game-owner"] == "w2"
+
+def test_router_closes_misdirected_websockets_with_owner():
+    client = TestClient(_app(FixedRegistry("w1", "w1", {})))
+    with client.websocket_connect("/ws/games/g1") as websocket:
+        assert websocket.receive_json() == {"served_by": "w1"}
+
+    # 客户端收到的是 4421 关闭帧（reason 为归属 worker），而不是握手失败
+    client = TestClient(_app(FixedRegistry("w1", "w2", {"w2": "http://w2:8000"})))
+    with client.websocket_connect("/ws/games/g1") as websocket:
+        with pytest.raises(WebSocketDisconnect) as exc:
+            websocket.receive_json()
+    assert exc.value.code == 4421
+    assert exc.value.reason == "w2"
+
+def test_forward_signature_expires():
+    router = ShardRouter(None, registry=FixedRegistry("w1", "w1", {}), secret="s")
+    scope = {"method": "POST", "path": "/api/v1/games/g1/action"}
+    value = router.sign_forward(scope, now=1000.0)
+    assert router.verify_forward(value, scope, now=1030.0)
+    assert not router.verify_forward(value, scope, now=1100.0)
+    assert not ShardRouter(None, registry=FixedRegistry("w1", "w1", {}), secret="other").verify_forward(value, scope, now=1000.0)
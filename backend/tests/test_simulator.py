@@ -0,0 +1,67 @@
+import random
+import pytest
+from fastapi import HTTPException
+from app.core.ai_policy import RandomPolicy
+from app.core.game_reducer import new_game
+from app.core.game_rules import GameRuleError, GameRuleValidator
+from app.models.game_enums import ActionType, Camp, Character, GamePhase
+from app.services.simulator import SimulationError, play_game, run_simulation, simulate_games
+
+def test_rule_errors_are_not_http_errors():
+    game = new_game("g", list(range(1, 9)), {}, now=0.0, rng=random.Random(1))
+    not_speaker = game.next_player(game.speaker_id).user_id
+
+    with pytest.raises(GameRuleError) as exc:
+        GameRuleValidator.check_action(game, not_speaker, ActionType.SPEAK, {})
+    assert not isinstance(exc.value, HTTPException)
+    assert exc.value.status_code == 403
+
+    # 接口层仍然得到 HTTPException
+    with pytest.raises(HTTPException) as exc:
+        GameRuleValidator.validate_action(game, not_speaker, ActionType.SPEAK, {})
+    assert exc.value.status_code == 403
+
+def test_play_game_uses_injected_clock_and_rng():
+    ticks = iter(range(1000, 10000))
+    game = play_game(RandomPolicy(), random.Random(3), clock=lambda: float(next(ticks)))
+    assert game.phase == GamePhase.FINISHED
+    assert game.winner in (Camp.GOOD, Camp.EVIL)
+    # 每个动作读一次时钟，最后一个动作的时间就是结束阶段的开始时间
+    assert game.phase_start_time == 1000 + game.seq
+
+    # 同样的种子得到同样的对局
+    again = play_game(RandomPolicy(), random.Random(3))
+    assert again.seq == game.seq
+    assert again.mission_results == game.mission_results
+    assert again.winner == game.winner
+
+def test_illegal_policy_action_is_reported(monkeypatch):
+    def speak_always(self, game, player, rng, belief=None):
+        return ActionType.SPEAK, {}
+
+    monkeypatch.setattr(RandomPolicy, "decide", speak_always)
+    with pytest.raises(SimulationError):
+        play_game(RandomPolicy(), random.Random(0))
+
+    report = simulate_games("random", 3, seed=0)
+    assert report.games == 0 and report.errors == 3
+    assert "非法动作" in report.error_samples[0]
+
+def test_report_win_rates():
+    report = simulate_games("random", 200, seed=42)
+    assert report.games == 200 and report.errors == 0
+    data = report.to_dict()
+    assert data["win_rate"]["good"] + data["win_rate"]["evil"] == pytest.approx(1.0)
+    assert sum(data["endings"].values()) == pytest.approx(1.0)
+    # 同阵营的角色同胜同负
+    assert report.role_win_rate(Character.SERVANT) == report.win_rate(Camp.GOOD)
+    assert report.role_win_rate(Character.ASSASSIN) == report.win_rate(Camp.EVIL)
+    assert report.role_games[Character.SERVANT] == 3 * 200
+
+def test_process_pool_matches_single_process():
+    single = run_simulation(60, workers=1, seed=5, chunk_size=20)
+    pooled = run_simulation(60, workers=2, seed=5, chunk_size=20)
+    assert pooled.to_dict() == single.to_dict()
+
+    with pytest.raises(ValueError):
+        run_simulation(1, policy="unknown")
@@ -102,3 +102,21 @@ def test_default_action_assassinate():
     assert action is not None
     assert action["action_type"] == ActionType.ASSASSINATE
     assert action["payload"]["target_id"] == 1
+
+def test_default_action_speech():
+    game = create_mock_game(GamePhase.SPEECH)
+    game.speaker_id = 3
+
+    pending = TimeoutPolicy.get_pending_players(game)
+    assert [p.user_id for p in pending] == [3]
+
+    action = TimeoutPolicy.get_default_action(game, pending[0])
+    assert action["action_type"] == ActionType.SPEAK
+
+def test_pending_players_vote():
+    game = create_mock_game(GamePhase.VOTE)
+    game.players[0].has_voted = True
+    game.players[4].has_voted = True
+
+    pending = TimeoutPolicy.get_pending_players(game)
+    assert [p.user_id for p in pending] == [2, 3, 4, 6, 7, 8]
@@ -0,0 +1,69 @@
+import asyncio
+from app.services.timeout_scheduler import TimeoutScheduler
+from app.services.game_service import GameService
+from app.models.game_enums import GamePhase
+
+def test_arm_cancel_and_pop_due():
+    scheduler = TimeoutScheduler(timeout_seconds=60)
+    scheduler.arm("g1", 100.0)
+    scheduler.arm("g2", 110.0)
+    scheduler.arm("g3", 120.0)
+
+    # 重新登记会使旧截止时间失效
+    scheduler.arm("g1", 150.0)
+    scheduler.cancel("g3")
+
+    assert scheduler.pop_due(165.0) == []
+    assert scheduler.pop_due(170.0) == ["g2"]
+    assert scheduler.pop_due(1000.0) == ["g1"]
+    assert len(scheduler) == 0
+
+def test_timed_out_speech_is_skipped():
+    async def run():
+        scheduler = TimeoutScheduler(timeout_seconds=60)
+        GameService.add_listener(scheduler.on_game_updated)
+        try:
+            game = await GameService.create_game(list(range(1, 9)), {})
+            first_speaker = game.speaker_id
+            start = game.phase_start_time
+
+            # 未到期：不触发
+            await scheduler.fire_due(start + 30)
+            assert game.speaker_id == first_speaker
+
+            # 到期：自动跳过当前发言者，并为新的阶段开始时间重新登记
+            await scheduler.fire_due(start + 61)
+            game = await GameService.get_game(game.game_id)
+            assert game.phase == GamePhase.SPEECH
+            assert game.speaker_id != first_speaker
+            assert len(scheduler) == 1
+        finally:
+            GameService.remove_listener(scheduler.on_game_updated)
+
+    asyncio.run(run())
+
+def test_timed_out_vote_is_submitted_as_one_batch():
+    async def run():
+        scheduler = TimeoutScheduler(timeout_seconds=60)
+        GameService.add_listener(scheduler.on_game_updated)
+        updates = []
+        listener = lambda game, record: updates.append(record.seq)
+        try:
+            game = await GameService.create_game(list(range(1, 9)), {})
+            start = game.phase_start_time
+            game.phase = GamePhase.VOTE
+            game.proposed_team = [1, 2, 3]
+            version = game.version
+            GameService.add_listener(listener)
+
+            # 到期：8 名玩家的兜底投票一次写入，投票结算后进入下一次发言
+            await scheduler.fire_due(start + 61)
+            game = await GameService.get_game(game.game_id)
+            assert game.version == version + 1
+            assert updates == list(range(1, 9))
+            assert game.phase == GamePhase.SPEECH and game.vote_track == 1
+        finally:
+            GameService.remove_listener(listener)
+            GameService.remove_listener(scheduler.on_game_updated)
+
+    asyncio.run(run())
@@ -0,0 +1,93 @@
+import asyncio
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock
+import pytest
+from fastapi import HTTPException
+from app.core.cache import TTLCache
+from app.core.deps import get_user_by_token
+from app.core.security import create_access_token
+from app.models.user import User
+from app.services.user_cache import user_cache, _invalidate_user
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_ttl_cache_expiry_and_lru():
+    clock = FakeClock()
+    cache = TTLCache(max_size=2, ttl=10, name="test_ttl_cache", clock=clock)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=5)
+    assert cache.get("a") == 1
+
+    # 单个条目可以使用更短的过期时间
+    clock.now = 6
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+
+    # 超出容量时淘汰最久未使用的条目
+    cache.set("c", 3)
+    cache.get("a")
+    cache.set("d", 4)
+    assert "c" not in cache and "a" in cache and "d" in cache
+
+    clock.now = 20
+    assert cache.get("a") is None
+    assert cache.hits == 3
+    assert cache.misses == 2
+
+def _mock_db(user: User):
+    db = MagicMock()
+    db.get = AsyncMock(return_value=user)
+    return db
+
+def test_user_lookup_is_cached_until_invalidated():
+    async def run():
+        user_cache.clear()
+        user = User(id=4242, username="cached", email="c@example.com", hashed_password="x",
+                    is_active=True, created_at=datetime.utcnow())
+        db = _mock_db(user)
+        token = create_access_token(subject=user.id)
+
+        first = await get_user_by_token(token, db)
+        second = await get_user_by_token(token, db)
+        assert first.id == second.id == 4242
+        assert db.get.await_count == 1
+        # 缓存中不保留密码哈希
+        assert second.hashed_password is None
+
+        # 同一用户的其他 Token 只需校验签名，不查询数据库
+        other_token = create_access_token(subject=user.id, expires_delta=timedelta(minutes=5))
+        await get_user_by_token(other_token, db)
+        assert db.get.await_count == 1
+
+        # 用户被停用（ORM 更新触发失效）
+        user.is_active = False
+        _invalidate_user(None, None, user)
+        with pytest.raises(HTTPException) as exc:
+            await get_user_by_token(token, db)
+        assert exc.value.status_code == 400
+        assert db.get.await_count == 2
+
+    asyncio.run(run())
+
+def test_invalid_token_is_not_cached():
+    async def run():
+        user_cache.clear()
+        db = _mock_db(None)
+        for _ in range(2):
+            with pytest.raises(HTTPException) as exc:
+                await get_user_by_token("not-a-token", db)
+            assert exc.value.status_code == 401
+        assert user_cache.get_token_subject("not-a-token") is None
+
+        # 已过期的 Token 不会进入缓存
+        expired = create_access_token(subject=1, expires_delta=timedelta(seconds=-1))
+        with pytest.raises(HTTPException):
+            await get_user_by_token(expired, db)
+        assert user_cache.get_token_subject(expired) is None
+
+    asyncio.run(run())